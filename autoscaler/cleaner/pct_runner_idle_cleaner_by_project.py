@@ -2,12 +2,13 @@ from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from dateutil import parser as du_parser
-from time import sleep
 
-from autoscaler.core.constants import AUTOSCALER_RUNNER
+from autoscaler.core.constants import AUTOSCALER_RUNNER, RUNNER_DELETE_RETRIES
+from autoscaler.core.exceptions import AutoscalerHTTPError
 from autoscaler.core.help_classes import BitbucketRunnerStatuses
 from autoscaler.core.helpers import success
 from autoscaler.core.logger import logger, GroupNamePrefixAdapter
+from autoscaler.core.pipeline import Pipeline, Stage, start_rate_limiter
 from autoscaler.core.validators import Constants, NameUUIDData
 from autoscaler.services.bitbucket_by_project import BitbucketByProjectService
 from autoscaler.services.kubernetes import KubernetesService
@@ -36,26 +37,64 @@ class Cleaner:
     def get_runners(self, repository):
         return self.runner_service.get_bitbucket_runners(self.runner_data.workspace, repository)
 
-    def delete_runners(self, runners_to_delete, repository):
-        runners_uuid_to_delete = [r['uuid'] for r in runners_to_delete]
-
-        for runner_uuid in runners_uuid_to_delete:
+    def delete_bitbucket_runner(self, runner_uuid, repository):
+        try:
             self.runner_service.delete_bitbucket_runner(
                 workspace=self.runner_data.workspace,
                 runner_uuid=runner_uuid,
                 repository=repository,
             )
+        except AutoscalerHTTPError as e:
+            # deleted by the previous attempt with the response lost, e.g. timed out,
+            # so its Kubernetes job is still deleted on the next stage
+            if e.status_code != 404:
+                raise
 
-            # Remove curly brackets, because for kubernetes service runners names are without them.
-            self.kubernetes_service.delete_job(runner_uuid.strip('{}'), self.runner_data.namespace)
+            self.logger_adapter.warning(f"Runner UUID {runner_uuid} not found on Bitbucket, already deleted.")
 
-            success(
-                f"[{self.runner_data.name}] Successfully deleted runner UUID {runner_uuid} "
-                f"on workspace {self.runner_data.workspace.name}\n",
-                do_exit=False
-            )
+        return runner_uuid
+
+    def delete_kubernetes_job(self, runner_uuid):
+        # Remove curly brackets, because for kubernetes service runners names are without them.
+        self.kubernetes_service.delete_job(runner_uuid.strip('{}'), self.runner_data.namespace)
+
+        success(
+            f"[{self.runner_data.name}] Successfully deleted runner UUID {runner_uuid} "
+            f"on workspace {self.runner_data.workspace.name}\n",
+            do_exit=False
+        )
+
+        return runner_uuid
+
+    def delete_runners(self, runners_to_delete, repository):
+        runners_uuid_to_delete = [r['uuid'] for r in runners_to_delete]
 
-            sleep(self.runner_constants.default_sleep_time_runner_delete)
+        # Bitbucket runner and Kubernetes job of different runners are deleted at the same time
+        concurrency = self.runner_constants.runner_delete_concurrency
+        pipeline = Pipeline([
+            Stage(
+                'bitbucket',
+                lambda runner_uuid: self.delete_bitbucket_runner(runner_uuid, repository),
+                concurrency=concurrency,
+                retries=RUNNER_DELETE_RETRIES,
+                rate_limiter=start_rate_limiter(self.runner_constants.default_sleep_time_runner_delete, concurrency)
+            ),
+            Stage('kubernetes', self.delete_kubernetes_job, concurrency=concurrency, retries=RUNNER_DELETE_RETRIES),
+        ])
+
+        results = pipeline.run(runners_uuid_to_delete)
+
+        for result in results:
+            if not result.ok:
+                self.logger_adapter.error(
+                    f"Runner UUID {result.item} deletion failed on {result.stage} stage "
+                    f"after {result.attempts[result.stage]} attempts: {result.error}"
+                )
+
+        self.logger_adapter.info(f"Runners deletion summary: {Pipeline.summary(results)}")
+        self.logger_adapter.info(f"Runners deletion stages: {pipeline.metrics}")
+
+        return results
 
     def run(self):
         workflow, repositories = self.get_repositories()
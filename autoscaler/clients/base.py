@@ -1,9 +1,15 @@
 """Basic client API classes to be inherited from"""
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from json.decoder import JSONDecodeError
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import AuthBase
 
+import autoscaler.core.constants as constants
 from autoscaler.core.exceptions import AutoscalerHTTPError
 from autoscaler.core.logger import logger
 
@@ -17,11 +23,92 @@ class BearerAuth(AuthBase):
         return r
 
 
+class HTTPSessionManager:
+    """Keep-alive HTTP sessions shared by all API services of the process.
+
+    requests.Session is not thread-safe, so every thread gets its own session,
+    but all sessions are mounted on the same HTTPAdapter, which owns a thread-safe
+    urllib3 connection pool per host. Connections idle longer than keep_alive_timeout
+    are dropped instead of being reused, keep_alive_timeout=0 disables keep-alive.
+    """
+
+    def __init__(self, pool_connections=constants.HTTP_POOL_CONNECTIONS, pool_maxsize=constants.HTTP_POOL_MAXSIZE,
+                 keep_alive_timeout=constants.HTTP_KEEP_ALIVE_TIMEOUT):
+        self.keep_alive_timeout = keep_alive_timeout
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_used = None
+        # counters of the pools already closed, live pools are counted in stats()
+        self._closed_connections = 0
+        self._closed_requests = 0
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, url, headers=None, **kwargs):
+        if self.keep_alive_timeout > 0:
+            self._expire_idle_connections()
+        else:
+            headers = {**(headers or {}), 'Connection': 'close'}
+
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def _expire_idle_connections(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = self._last_used is not None and now - self._last_used > self.keep_alive_timeout
+            self._last_used = now
+
+        if expired:
+            logger.debug(f"HTTP connections idle for more than {self.keep_alive_timeout} seconds. Closing...")
+            self.close()
+
+    def _pools(self):
+        pools = self._adapter.poolmanager.pools
+        return [pool for pool in (pools.get(key) for key in pools.keys()) if pool is not None]
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools():
+                self._closed_connections += pool.num_connections
+                self._closed_requests += pool.num_requests
+            self._adapter.poolmanager.clear()
+
+    def stats(self):
+        with self._lock:
+            connections, requests_count = self._closed_connections, self._closed_requests
+            for pool in self._pools():
+                connections += pool.num_connections
+                requests_count += pool.num_requests
+
+        reused = max(requests_count - connections, 0)
+        return {
+            'requests': requests_count,
+            'connections': connections,
+            'reused': reused,
+            'reuse_ratio': round(reused / requests_count, 2) if requests_count else 0
+        }
+
+
+session_manager = HTTPSessionManager()
+
+
 class BaseAPIService:
     MAX_REQUEST_TIMEOUT = 5
     RETRY_AFTER_DEFAULT = 10
+    MAX_RETRIES = 3
     DEFAULT_HEADERS = {'User-Agent': 'Bitbucket Runners Autoscaler'}
     _auth = None
+    session_manager = session_manager
+    rate_limiter = None
 
     def make_http_request(self, url, method='get', json=None, headers=None, ignore_exc=None, **kwargs):
         if headers:
@@ -29,21 +116,66 @@ class BaseAPIService:
         else:
             headers = self.DEFAULT_HEADERS
 
-        with requests.request(method, url, auth=self._auth, json=json, headers=headers,
-                              timeout=self.MAX_REQUEST_TIMEOUT, **kwargs) as response:
-            logger.debug(f"{method.upper()} request to {url}")
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as exc:
-                logger.debug(f"Got {exc}. Status: {response.status_code}")
-                if ignore_exc is None or (response.status_code not in ignore_exc):
-                    raise AutoscalerHTTPError(response.text, status_code=response.status_code)
-
-                if ignore_exc and response.status_code in ignore_exc:
-                    logger.warning(f"Obtained status {response.status_code} for {url}. Ignoring...")
-
-            try:
-                data = response.json()
-            except JSONDecodeError:
-                data = response.text
-        return data, response.status_code
+        token_refreshed = False
+        for attempt in range(self.MAX_RETRIES + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            with self.session_manager.request(method, url, auth=self._auth, json=json, headers=headers,
+                                              timeout=self.MAX_REQUEST_TIMEOUT, **kwargs) as response:
+                logger.debug(f"{method.upper()} request to {url}")
+
+                if (
+                    response.status_code == 429
+                    and self.rate_limiter is not None
+                    and attempt < self.MAX_RETRIES
+                ):
+                    delay = self.rate_limiter.backoff(self.get_retry_after(response), attempt)
+                    logger.warning(f"Rate limit reached for {url}. Retrying in {round(delay, 2)} seconds...")
+                    continue
+
+                # the auth refreshed the token rejected with 401, send the request once again with the new one
+                if (
+                    response.status_code == 401
+                    and getattr(response, 'token_refreshed', False) is True
+                    and not token_refreshed
+                    and attempt < self.MAX_RETRIES
+                ):
+                    token_refreshed = True
+                    continue
+
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError as exc:
+                    logger.debug(f"Got {exc}. Status: {response.status_code}")
+                    if ignore_exc is None or (response.status_code not in ignore_exc):
+                        raise AutoscalerHTTPError(response.text, status_code=response.status_code)
+
+                    if ignore_exc and response.status_code in ignore_exc:
+                        logger.warning(f"Obtained status {response.status_code} for {url}. Ignoring...")
+
+                try:
+                    data = response.json()
+                except JSONDecodeError:
+                    data = response.text
+
+            return data, response.status_code
+
+    @staticmethod
+    def get_retry_after(response):
+        # Retry-After could be either delay in seconds or HTTP date
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None:
+            return None
+
+        try:
+            return max(float(retry_after), 0)
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
@@ -1,14 +1,20 @@
 """Module to interact with Bitbucket APIs:
     authentication, basic bitbucket api, bitbucket repositories, bitbucket workspaces
 """
+import math
 import os
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 from oauthlib.oauth2 import BackendApplicationClient
-from requests.auth import HTTPBasicAuth
+from requests.auth import AuthBase, HTTPBasicAuth
 from requests_oauthlib.oauth2_session import OAuth2Session
 
+import autoscaler.core.constants as constants
 from autoscaler.clients.base import BaseAPIService, BearerAuth
+from autoscaler.clients.rate_limiter import RateLimiter
 from autoscaler.core.exceptions import NotAuthorized
 from autoscaler.core.logger import logger
 
@@ -17,20 +23,95 @@ BITBUCKET_BASE_URL = 'https://api.bitbucket.org'
 ITEMS_PER_PAGE = 100
 
 
-class Auth:
+class OAuthTokenCache:
+    """Process-wide cache of the OAuth access token.
+
+    The token is refreshed REFRESH_MARGIN seconds before it expires. Refresh is single-flight:
+    the first thread fetches a new token, concurrent threads wait for it and reuse it.
+    """
     OAUTH_URL = 'https://bitbucket.org/site/oauth2/access_token'
+    REFRESH_MARGIN = 5 * 60  # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._credentials = None
+        self._access_token = None
+        self._refresh_at = 0
+
+    def get_token(self, client_id, secret):
+        with self._lock:
+            if (
+                self._access_token is None
+                or self._credentials != (client_id, secret)
+                or time.monotonic() >= self._refresh_at
+            ):
+                token = self.fetch_token(client_id, secret)
+                expires_in = token['expires_in']
+                self._credentials = (client_id, secret)
+                self._access_token = token['access_token']
+                self._refresh_at = time.monotonic() + expires_in - min(self.REFRESH_MARGIN, expires_in / 2)
+
+            return self._access_token
+
+    def invalidate(self, access_token):
+        # do not drop a token already refreshed by another thread
+        with self._lock:
+            if self._access_token == access_token:
+                self._access_token = None
+
+    def fetch_token(self, client_id, secret):
+        client = BackendApplicationClient(client_id=client_id)
+        oauth = OAuth2Session(client=client)
+        token = oauth.fetch_token(self.OAUTH_URL, client_id=client_id,
+                                  client_secret=secret)
+        logger.debug(f"Token expires in {token['expires_in']} seconds")
+        return token
+
+
+class OAuthBearerAuth(AuthBase):
+    """Bearer auth with the cached OAuth token.
+
+    On 401 the token is invalidated and the response is marked with `token_refreshed`, so the API client
+    sends the request again with a new token through the shared rate limiter and the 429 handling.
+    """
+
+    def __init__(self, client_id, secret, token_cache):
+        self.client_id = client_id
+        self.secret = secret
+        self.token_cache = token_cache
+
+    @property
+    def token(self):
+        return self.token_cache.get_token(self.client_id, self.secret)
+
+    def __call__(self, r):
+        r.headers['Authorization'] = f'Bearer {self.token}'
+        r.register_hook('response', self.handle_401)
+        return r
+
+    def handle_401(self, r, **kwargs):
+        if r.status_code != 401:
+            return r
+
+        logger.debug("Got 401 response. Refreshing OAuth token...")
+        self.token_cache.invalidate(r.request.headers['Authorization'][len('Bearer '):])
+        r.token_refreshed = True
+
+        return r
+
+
+class Auth:
+    token_cache = OAuthTokenCache()
 
     @classmethod
     def token_oauth(cls):
         client_id = os.getenv('BITBUCKET_OAUTH_CLIENT_ID')
         secret = os.getenv('BITBUCKET_OAUTH_CLIENT_SECRET')
 
-        client = BackendApplicationClient(client_id=client_id)
-        oauth = OAuth2Session(client=client)
-        token = oauth.fetch_token(Auth.OAUTH_URL, client_id=client_id,
-                                  client_secret=secret)
-        logger.debug(f"Token expires in {token['expires_in']} seconds")
-        return BearerAuth(token['access_token'])
+        return OAuthBearerAuth(client_id, secret, cls.token_cache)
 
     @classmethod
     def basic_auth(cls):
@@ -53,8 +134,16 @@ class BitbucketAPIService(BaseAPIService):
     MAX_REQUEST_TIMEOUT = 12
     INTERVAL_BEFORE_REQUESTS = 3
     _auth = None
+    rate_limiter = RateLimiter(
+        rate=constants.BITBUCKET_API_RATE,
+        burst=constants.BITBUCKET_API_BURST,
+        backoff_base=BaseAPIService.RETRY_AFTER_DEFAULT
+    )
+    MAX_CONCURRENT_PAGES = constants.BITBUCKET_MAX_CONCURRENT_PAGES
+
+    def __init__(self, auth=None, max_concurrent_pages=None):
+        self.max_concurrent_pages = max_concurrent_pages or self.MAX_CONCURRENT_PAGES
 
-    def __init__(self, auth=None):
         if os.getenv('BITBUCKET_OAUTH_CLIENT_ID') and os.getenv('BITBUCKET_OAUTH_CLIENT_SECRET'):
             self._auth = auth or Auth.token_oauth()
         elif os.getenv('BITBUCKET_USERNAME') and os.getenv('BITBUCKET_APP_PASSWORD'):
@@ -68,11 +157,47 @@ class BitbucketAPIService(BaseAPIService):
     def auth(self):
         return self._auth
 
+    @staticmethod
+    def get_page_url(url, page):
+        parsed_url = urllib.parse.urlsplit(url)
+        query = dict(urllib.parse.parse_qsl(parsed_url.query))
+        query['page'] = page
+        return parsed_url._replace(query=urllib.parse.urlencode(query, quote_via=urllib.parse.quote)).geturl()
+
+    def get_paginated_values(self, url):
+        """Get values of all pages of the paginated response.
+
+        When the first page reports the total `size`, the rest of pages are requested concurrently,
+        up to max_concurrent_pages at once. Otherwise, `next` links are followed one by one.
+        """
+        values = []
+        response, _ = self.make_http_request(url)
+        values.extend(response.get('values', []))
+
+        size, pagelen = response.get('size'), response.get('pagelen')
+        if self.max_concurrent_pages > 1 and response.get('next') and size and pagelen:
+            page = response.get('page', 1)
+            pages_urls = [self.get_page_url(url, n) for n in range(page + 1, math.ceil(size / pagelen) + 1)]
+            logger.debug(f"Fetching {len(pages_urls)} pages concurrently for {url}")
+
+            if pages_urls:
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrent_pages, len(pages_urls))) as executor:
+                    for response, _ in executor.map(self.make_http_request, pages_urls):
+                        values.extend(response.get('values', []))
+
+        # follow the rest of pages, i.e. added after the first page was fetched
+        url = response.get('next')
+        while url:
+            response, _ = self.make_http_request(url)
+            values.extend(response.get('values', []))
+            url = response.get('next')
+
+        return values
+
 
 class BitbucketRepository(BitbucketAPIService):
     MAX_REQUEST_TIMEOUT = 10
     BASE_URL = f'{BITBUCKET_BASE_URL}/2.0/repositories'
-    INTERVAL_BEFORE_REQUESTS = 5
 
     def get_repository(self, workspace, repo_slug, **kwargs):
         if kwargs:
@@ -88,17 +213,12 @@ class BitbucketRepository(BitbucketAPIService):
         filter_query = filter_query.replace('{', '').replace('}', '')
         logger.info(f"Fetching repositories for workspace {workspace} using filter: {filter_query}")
 
-        repositories = {
-            'values': []
-        }
         url = f'{self.BASE_URL}/{workspace}/?q={urllib.parse.quote(filter_query)}'
+        logger.info(f"Fetching repositories using this url: {url}")
 
-        while url:
-            logger.info(f"Fetching repositories using this url: {url}")
-            response, _ = self.make_http_request(url)
-            if 'values' in response:
-                repositories["values"].extend(response['values'])
-            url = response.get('next')
+        repositories = {
+            'values': self.get_paginated_values(url)
+        }
 
         return repositories
 
@@ -111,7 +231,6 @@ class BitbucketRepository(BitbucketAPIService):
 class BitbucketWorkspace(BitbucketAPIService):
     MAX_REQUEST_TIMEOUT = 10
     BASE_URL = f'{BITBUCKET_BASE_URL}/2.0/workspaces'
-    INTERVAL_BEFORE_REQUESTS = 5
 
     def get_workspace(self, workspace_name):
         workspace, _ = self.make_http_request(f'{self.BASE_URL}/{workspace_name}')
@@ -121,7 +240,6 @@ class BitbucketWorkspace(BitbucketAPIService):
 class BitbucketWorkspaceRunner(BitbucketAPIService):
     MAX_REQUEST_TIMEOUT = 10
     BASE_URL = f'{BITBUCKET_BASE_URL}/internal/workspaces'
-    INTERVAL_BEFORE_REQUESTS = 5
 
     def get_runner(self, workspace_uuid, runner_uuid):
         url = f'{self.BASE_URL}/{workspace_uuid}/pipelines-config/runners/{runner_uuid}'
@@ -129,15 +247,9 @@ class BitbucketWorkspaceRunner(BitbucketAPIService):
         return runner
 
     def get_runners(self, workspace_uuid):
-        runners = []
         url = f'{self.BASE_URL}/{workspace_uuid}/pipelines-config/runners?pagelen={ITEMS_PER_PAGE}'
 
-        while url:
-            runners_part, _ = self.make_http_request(url)
-            runners.extend(runners_part['values'])
-            url = runners_part.get('next')
-
-        return runners
+        return self.get_paginated_values(url)
 
     def create_runner(self, workspace_uuid, name, labels):
         url = f'{self.BASE_URL}/{workspace_uuid}/pipelines-config/runners'
@@ -160,7 +272,6 @@ class BitbucketWorkspaceRunner(BitbucketAPIService):
 class BitbucketRepositoryRunner(BitbucketAPIService):
     MAX_REQUEST_TIMEOUT = 10
     BASE_URL = f'{BITBUCKET_BASE_URL}/internal/repositories'
-    INTERVAL_BEFORE_REQUESTS = 5
 
     def get_runner(self, workspace_uuid, repo_uuid, runner_uuid):
         url = f'{self.BASE_URL}/{workspace_uuid}/{repo_uuid}/pipelines-config/runners/{runner_uuid}'
@@ -168,15 +279,9 @@ class BitbucketRepositoryRunner(BitbucketAPIService):
         return runner
 
     def get_runners(self, workspace_uuid, repo_uuid):
-        runners = []
         url = f'{self.BASE_URL}/{workspace_uuid}/{repo_uuid}/pipelines-config/runners?pagelen={ITEMS_PER_PAGE}'
 
-        while url:
-            runners_part, _ = self.make_http_request(url)
-            runners.extend(runners_part['values'])
-            url = runners_part.get('next')
-
-        return runners
+        return self.get_paginated_values(url)
 
     def create_runner(self, workspace_uuid, repo_uuid, name, labels):
         url = f'{self.BASE_URL}/{workspace_uuid}/{repo_uuid}/pipelines-config/runners'
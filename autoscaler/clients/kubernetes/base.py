@@ -1,27 +1,84 @@
 """Module to interact with Kubernetes APIs: running commands"""
+import hashlib
+import os
+import threading
+
 from jinja2 import FileSystemLoader, Environment
 from kubernetes import config as k8s_config, client as k8s_client
 from kubernetes.client import ApiException
 
 import autoscaler.core.exceptions as core_exc
+from autoscaler.clients.rate_limiter import RateLimiter
+from autoscaler.core import constants
 from autoscaler.core.constants import TEMPLATE_FILE_NAME, DEST_TEMPLATE_FILE_PATH
 
 
 class KubernetesSpecFileAPIService:
+    """Renders runner job spec files from the job template.
+
+    Compiled templates are cached by content hash and reused by all the runners.
+    The template file is read again only when its modification time or size changes,
+    and compiled again only when its content changes.
+    """
+    _lock = threading.Lock()
+    # template path -> (modification time, size, content hash)
+    _files = {}
+    # content hash -> compiled template
+    _templates = {}
 
     def __init__(self):
         pass
 
     @staticmethod
-    def generate_kube_spec_file(runner_data, template_filename=TEMPLATE_FILE_NAME):
-        # process template to k8s spec
-        template_loader = FileSystemLoader(DEST_TEMPLATE_FILE_PATH)
-        template_env = Environment(
-            loader=template_loader,
+    def get_environment():
+        return Environment(
+            loader=FileSystemLoader(DEST_TEMPLATE_FILE_PATH),
             variable_start_string="<%",
             variable_end_string="%>"
         )
-        job_template = template_env.get_template(template_filename)
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._files.clear()
+            cls._templates.clear()
+
+    @classmethod
+    def get_template(cls, template_filename=TEMPLATE_FILE_NAME):
+        template_path = os.path.join(DEST_TEMPLATE_FILE_PATH, template_filename)
+        stat = os.stat(template_path)
+        file_key = (stat.st_mtime_ns, stat.st_size)
+
+        with cls._lock:
+            cached = cls._files.get(template_path)
+            if cached is not None and cached[:2] == file_key and cached[2] in cls._templates:
+                return cls._templates[cached[2]]
+
+        with open(template_path) as f:
+            content = f.read()
+
+        content_hash = hashlib.sha256(content.encode()).hexdigest()
+
+        with cls._lock:
+            template = cls._templates.get(content_hash)
+            if template is None:
+                template = cls.get_environment().from_string(content)
+
+                # keep only templates of the currently known files
+                used_hashes = {h for path, (*_, h) in cls._files.items() if path != template_path}
+                for unused_hash in set(cls._templates) - used_hashes:
+                    del cls._templates[unused_hash]
+
+                cls._templates[content_hash] = template
+
+            cls._files[template_path] = (*file_key, content_hash)
+
+        return template
+
+    @classmethod
+    def generate_kube_spec_file(cls, runner_data, template_filename=TEMPLATE_FILE_NAME):
+        # process template to k8s spec
+        job_template = cls.get_template(template_filename)
 
         output = job_template.render(runner_data)
 
@@ -29,25 +86,100 @@ class KubernetesSpecFileAPIService:
 
 
 class KubernetesPythonAPIService:
+    """Kubernetes API calls sharing one API client per process.
+
+    The cluster config is loaded on the first call and the API client with its connection pool
+    is reused by all the services and threads, so next calls do not read the config again
+    and reuse open connections to the API server. Every call takes one request from
+    the shared QPS/burst budget.
+    """
+    _lock = threading.Lock()
+    _api_client = None
+    _core_v1 = None
+    _batch_v1 = None
+    _apps_v1 = None
+    _scheduling_v1 = None
+    rate_limiter = RateLimiter(rate=constants.KUBERNETES_API_QPS, burst=constants.KUBERNETES_API_BURST)
+
     def __init__(self):
-        self.load_config()
         self.client = k8s_client
 
     def load_config(self):
         k8s_config.load_incluster_config()
 
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            if KubernetesPythonAPIService._api_client is not None:
+                KubernetesPythonAPIService._api_client.close()
+
+            KubernetesPythonAPIService._api_client = None
+            KubernetesPythonAPIService._core_v1 = None
+            KubernetesPythonAPIService._batch_v1 = None
+            KubernetesPythonAPIService._apps_v1 = None
+            KubernetesPythonAPIService._scheduling_v1 = None
+
+    def get_api_client(self):
+        with self._lock:
+            if KubernetesPythonAPIService._api_client is None:
+                self.load_config()
+
+                configuration = k8s_client.Configuration.get_default_copy()
+                configuration.connection_pool_maxsize = constants.KUBERNETES_POOL_MAXSIZE
+
+                api_client = k8s_client.ApiClient(configuration)
+                KubernetesPythonAPIService._core_v1 = self.client.CoreV1Api(api_client)
+                KubernetesPythonAPIService._batch_v1 = self.client.BatchV1Api(api_client)
+                KubernetesPythonAPIService._apps_v1 = self.client.AppsV1Api(api_client)
+                KubernetesPythonAPIService._scheduling_v1 = self.client.SchedulingV1Api(api_client)
+                KubernetesPythonAPIService._api_client = api_client
+
+            return KubernetesPythonAPIService._api_client
+
+    def core_v1_api(self):
+        self.get_api_client()
+        self.rate_limiter.acquire()
+        return KubernetesPythonAPIService._core_v1
+
+    def batch_v1_api(self):
+        self.get_api_client()
+        self.rate_limiter.acquire()
+        return KubernetesPythonAPIService._batch_v1
+
+    def apps_v1_api(self):
+        self.get_api_client()
+        self.rate_limiter.acquire()
+        return KubernetesPythonAPIService._apps_v1
+
+    def scheduling_v1_api(self):
+        self.get_api_client()
+        self.rate_limiter.acquire()
+        return KubernetesPythonAPIService._scheduling_v1
+
     def create_secret(self, spec, namespace):
-        core_v1 = self.client.CoreV1Api()
-        resp = core_v1.create_namespaced_secret(body=spec, namespace=namespace)
+        core_v1 = self.core_v1_api()
+        try:
+            resp = core_v1.create_namespaced_secret(body=spec, namespace=namespace)
+        except ApiException as e:
+            if e.status == 404:
+                raise core_exc.NamespaceNotFoundError(str(e)) from e
+
+            raise
         return resp
 
     def create_job(self, spec, namespace):
-        batch_v1 = self.client.BatchV1Api()
-        resp = batch_v1.create_namespaced_job(body=spec, namespace=namespace)
+        batch_v1 = self.batch_v1_api()
+        try:
+            resp = batch_v1.create_namespaced_job(body=spec, namespace=namespace)
+        except ApiException as e:
+            if e.status == 404:
+                raise core_exc.NamespaceNotFoundError(str(e)) from e
+
+            raise
         return resp
 
     def delete_secret(self, runner_uuid, namespace):
-        core_v1 = self.client.CoreV1Api()
+        core_v1 = self.core_v1_api()
         try:
             core_v1.delete_namespaced_secret(
                 name=f"runner-oauth-credentials-{runner_uuid}",
@@ -64,7 +196,7 @@ class KubernetesPythonAPIService:
             raise core_exc.KubernetesSecretError(str(e)) from e
 
     def delete_job(self, runner_uuid, namespace):
-        batch_v1 = self.client.BatchV1Api()
+        batch_v1 = self.batch_v1_api()
         try:
             batch_v1.delete_namespaced_job(
                 name=f"runner-{runner_uuid}",
@@ -80,8 +212,60 @@ class KubernetesPythonAPIService:
 
             raise core_exc.KubernetesJobError(str(e)) from e
 
+    def create_priority_class(self, spec):
+        scheduling_v1 = self.scheduling_v1_api()
+        try:
+            scheduling_v1.create_priority_class(body=spec)
+        except ApiException as e:
+            # priority classes are not namespaced, it could be created by another autoscaler
+            if e.status != 409:
+                raise
+
+    def apply_deployment(self, spec, namespace):
+        apps_v1 = self.apps_v1_api()
+        try:
+            return apps_v1.patch_namespaced_deployment(name=spec['metadata']['name'], namespace=namespace, body=spec)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+
+        apps_v1 = self.apps_v1_api()
+        return apps_v1.create_namespaced_deployment(body=spec, namespace=namespace)
+
+    def apply_daemon_set(self, spec, namespace):
+        apps_v1 = self.apps_v1_api()
+        try:
+            return apps_v1.patch_namespaced_daemon_set(name=spec['metadata']['name'], namespace=namespace, body=spec)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+
+        apps_v1 = self.apps_v1_api()
+        return apps_v1.create_namespaced_daemon_set(body=spec, namespace=namespace)
+
+    def daemon_set_exists(self, name, namespace):
+        apps_v1 = self.apps_v1_api()
+        try:
+            apps_v1.read_namespaced_daemon_set(name=name, namespace=namespace)
+        except ApiException as e:
+            if e.status == 404:
+                return False
+
+            raise
+
+        return True
+
+    def list_nodes(self):
+        core_v1 = self.core_v1_api()
+        return core_v1.list_node().items
+
+    def list_active_pods(self):
+        # pods still holding node resources
+        core_v1 = self.core_v1_api()
+        return core_v1.list_pod_for_all_namespaces(field_selector='status.phase!=Succeeded,status.phase!=Failed').items
+
     def get_kubernetes_namespace(self, namespace):
-        core_v1 = self.client.CoreV1Api()
+        core_v1 = self.core_v1_api()
         try:
             core_v1.read_namespace(name=namespace)
         except ApiException as e:
@@ -91,7 +275,7 @@ class KubernetesPythonAPIService:
             raise core_exc.KubernetesNamespaceError(str(e)) from e
 
     def create_kubernetes_namespace(self, namespace):
-        core_v1 = self.client.CoreV1Api()
+        core_v1 = self.core_v1_api()
         try:
             core_v1.create_namespace(
                 k8s_client.V1Namespace(metadata=k8s_client.V1ObjectMeta(name=namespace))
@@ -0,0 +1,253 @@
+"""Local cache of runner Kubernetes objects kept up to date with watches"""
+import threading
+
+from kubernetes import watch as k8s_watch
+from kubernetes.client import ApiException
+
+from autoscaler.clients.kubernetes.base import KubernetesPythonAPIService
+from autoscaler.core import constants
+from autoscaler.core.logger import logger
+
+# Labels set on runner objects by the job template
+RUNNER_LABEL = 'runner_uuid'
+INDEX_LABELS = ('runner_uuid', 'account_uuid', 'runner_namespace')
+
+
+class Informer:
+    """Objects of one kind with the runner label in all namespaces.
+
+    The objects are listed once and then kept up to date with a watch started from the listed
+    resource version. When the watch expires (410 Gone) or fails, the objects are listed again.
+    Objects are indexed by INDEX_LABELS values, so they are found without requests to Kubernetes API.
+    """
+
+    def __init__(self, kind, get_list_func, watch_timeout=constants.KUBERNETES_INFORMER_WATCH_TIMEOUT,
+                 retry_interval=10, watch_factory=k8s_watch.Watch):
+        self.kind = kind
+        # returns the API method listing the objects, the API client is created lazily
+        self.get_list_func = get_list_func
+        self.watch_timeout = watch_timeout
+        self.retry_interval = retry_interval
+        self.watch_factory = watch_factory
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._synced = threading.Event()
+        self._thread = None
+        self._watch = None
+        # (namespace, name) -> object
+        self._objects = {}
+        # label -> label value -> {(namespace, name)}
+        self._index = {label: {} for label in INDEX_LABELS}
+        self.resource_version = None
+        self.lists_count = 0
+        self.events_count = 0
+
+    @staticmethod
+    def get_key(obj):
+        return obj.metadata.namespace, obj.metadata.name
+
+    @property
+    def synced(self):
+        return self._synced.is_set()
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, name=f'informer-{self.kind}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._watch is not None:
+            self._watch.stop()
+
+        if self._thread is not None:
+            self._thread.join(timeout=self.retry_interval)
+            self._thread = None
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                if self.resource_version is None:
+                    self.list()
+
+                self.watch()
+            except ApiException as e:
+                if e.status == 410:
+                    logger.debug(f"Kubernetes {self.kind} watch expired. Listing {self.kind} again...")
+                else:
+                    logger.warning(f"Kubernetes {self.kind} watch failed: {e}")
+                    self._stopped.wait(self.retry_interval)
+
+                self.resource_version = None
+            except Exception as e:
+                logger.warning(f"Kubernetes {self.kind} watch failed: {e}")
+                self.resource_version = None
+                self._stopped.wait(self.retry_interval)
+
+    def list(self):
+        response = self.get_list_func()(label_selector=RUNNER_LABEL)
+
+        with self._lock:
+            self._objects = {}
+            self._index = {label: {} for label in INDEX_LABELS}
+            for obj in response.items:
+                self._add(obj)
+
+            self.resource_version = response.metadata.resource_version
+            self.lists_count += 1
+
+        self._synced.set()
+        logger.debug(f"Kubernetes {self.kind} listed: {len(response.items)}")
+
+    def watch(self):
+        self._watch = self.watch_factory()
+
+        for event in self._watch.stream(
+            self.get_list_func(),
+            label_selector=RUNNER_LABEL,
+            resource_version=self.resource_version,
+            timeout_seconds=self.watch_timeout,
+            allow_watch_bookmarks=True,
+        ):
+            if self._stopped.is_set():
+                self._watch.stop()
+                break
+
+            self.handle_event(event)
+
+    def handle_event(self, event):
+        event_type, obj = event['type'], event['object']
+
+        with self._lock:
+            self.events_count += 1
+
+            if event_type == 'BOOKMARK':
+                self.resource_version = event['raw_object']['metadata']['resourceVersion']
+                return
+
+            self._remove(self.get_key(obj))
+            if event_type != 'DELETED':
+                self._add(obj)
+
+            self.resource_version = obj.metadata.resource_version
+
+    def _add(self, obj):
+        key = self.get_key(obj)
+        self._objects[key] = obj
+
+        for label, value in (obj.metadata.labels or {}).items():
+            if label in self._index:
+                self._index[label].setdefault(value, set()).add(key)
+
+    def _remove(self, key):
+        obj = self._objects.pop(key, None)
+        if obj is None:
+            return
+
+        for label, value in (obj.metadata.labels or {}).items():
+            keys = self._index.get(label, {}).get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[label][value]
+
+    def get_by_label(self, label, value):
+        with self._lock:
+            return [self._objects[key] for key in self._index[label].get(value, ())]
+
+    def count(self):
+        with self._lock:
+            return len(self._objects)
+
+
+class RunnersInformer:
+    """Runner Jobs and Pods cached locally.
+
+    Runners UUIDs are used without curly brackets, as in the objects labels.
+    """
+
+    def __init__(self, informers=None):
+        if informers is None:
+            api = KubernetesPythonAPIService()
+            informers = {
+                'jobs': Informer('jobs', lambda: api.batch_v1_api().list_job_for_all_namespaces),
+                'pods': Informer('pods', lambda: api.core_v1_api().list_pod_for_all_namespaces),
+            }
+
+        self.informers = informers
+
+    def start(self):
+        for informer in self.informers.values():
+            informer.start()
+
+    def stop(self):
+        for informer in self.informers.values():
+            informer.stop()
+
+    @property
+    def synced(self):
+        return all(informer.synced for informer in self.informers.values())
+
+    def wait_for_sync(self, timeout=None):
+        return all(informer.wait_for_sync(timeout) for informer in self.informers.values())
+
+    def get_jobs(self, runner_uuid):
+        return self.informers['jobs'].get_by_label('runner_uuid', runner_uuid)
+
+    def get_pods(self, runner_uuid):
+        return self.informers['pods'].get_by_label('runner_uuid', runner_uuid)
+
+    def get_namespace_pods(self, namespace):
+        return self.informers['pods'].get_by_label('runner_namespace', namespace)
+
+    def get_account_pods(self, account_uuid):
+        return self.informers['pods'].get_by_label('account_uuid', account_uuid)
+
+    def get_pod(self, runner_uuid):
+        # the latest pod of the runner job, previous ones could be left after restarts
+        pods = self.get_pods(runner_uuid)
+        if not pods:
+            return None
+
+        return max(pods, key=lambda pod: (pod.metadata.creation_timestamp is not None, pod.metadata.creation_timestamp))
+
+    def get_pod_phase(self, runner_uuid):
+        pod = self.get_pod(runner_uuid)
+        return pod.status.phase if pod is not None and pod.status is not None else None
+
+    def get_node_name(self, runner_uuid):
+        pod = self.get_pod(runner_uuid)
+        return pod.spec.node_name if pod is not None and pod.spec is not None else None
+
+    def get_pending_reasons(self, runner_uuid):
+        """Reasons the runner pod is not running yet, e.g. Unschedulable or ImagePullBackOff."""
+        pod = self.get_pod(runner_uuid)
+        if pod is None or pod.status is None or pod.status.phase != 'Pending':
+            return []
+
+        reasons = [
+            condition.reason for condition in pod.status.conditions or []
+            if condition.status == 'False' and condition.reason
+        ]
+        reasons.extend(
+            status.state.waiting.reason for status in pod.status.container_statuses or []
+            if status.state is not None and status.state.waiting is not None and status.state.waiting.reason
+        )
+
+        return reasons
+
+    def stats(self):
+        return {
+            **{kind: informer.count() for kind, informer in self.informers.items()},
+            'lists': sum(informer.lists_count for informer in self.informers.values()),
+            'events': sum(informer.events_count for informer in self.informers.values()),
+        }
+
+
+runners_informer = RunnersInformer()
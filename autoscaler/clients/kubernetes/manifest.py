@@ -0,0 +1,136 @@
+"""Runner job manifests built from a parsed template skeleton"""
+import re
+import threading
+
+import yaml
+
+from autoscaler.clients.kubernetes.base import KubernetesSpecFileAPIService
+from autoscaler.core.constants import TEMPLATE_FILE_NAME
+
+# Values substituted into the skeleton as is. Other values could change the YAML structure of the rendered text.
+SAFE_VALUE_PATTERN = re.compile(r'^[A-Za-z0-9_.+/=-]+$')
+
+
+class KubernetesManifestBuilder:
+    """Builds runner manifests without rendering and parsing YAML text for every runner.
+
+    The template is rendered once with placeholders instead of the runner values and parsed
+    into a skeleton. Runner values are substituted into a copy of the skeleton. Template conditions
+    depend on values being empty or not, so a skeleton is kept for every combination of empty values.
+
+    The first manifest built from a skeleton is compared with the manifest parsed from the rendered text.
+    If they differ, or a value could be parsed differently in the text (e.g. an unquoted number),
+    the text path is used instead.
+    """
+
+    PLACEHOLDER = '__autoscaler_placeholder_{}__'
+
+    def __init__(self, template_filename=TEMPLATE_FILE_NAME):
+        self.template_filename = template_filename
+        self._lock = threading.Lock()
+        self._resolver = yaml.resolver.Resolver()
+        # empty values combination -> (compiled template, skeleton or None if the text path is used, unquoted placeholders)
+        self._skeletons = {}
+        self.built_count = 0
+        self.fallback_count = 0
+
+    def render_text(self, runner_data):
+        return yaml.safe_load(KubernetesSpecFileAPIService.generate_kube_spec_file(runner_data, self.template_filename))
+
+    def get_placeholders(self, runner_data):
+        return {self.PLACEHOLDER.format(key): str(value) for key, value in runner_data.items() if value}
+
+    @staticmethod
+    def get_shape(runner_data):
+        return tuple(sorted((key, True if value else value) for key, value in runner_data.items()))
+
+    def get_skeleton(self, runner_data):
+        template = KubernetesSpecFileAPIService.get_template(self.template_filename)
+        shape = self.get_shape(runner_data)
+
+        with self._lock:
+            cached = self._skeletons.get(shape)
+            if cached is not None and cached[0] is template:
+                return cached[1], cached[2], False
+
+        skeleton_data = {key: self.PLACEHOLDER.format(key) if value else value for key, value in runner_data.items()}
+        skeleton_text = template.render(skeleton_data)
+        skeleton = yaml.safe_load(skeleton_text)
+        plain_placeholders = self.get_plain_placeholders(yaml.compose(skeleton_text, Loader=yaml.SafeLoader))
+
+        with self._lock:
+            self._skeletons[shape] = (template, skeleton, plain_placeholders)
+
+        return skeleton, plain_placeholders, True
+
+    @classmethod
+    def get_plain_placeholders(cls, node):
+        """Placeholders used as unquoted values. YAML could parse such a value as a number or boolean."""
+        if isinstance(node, yaml.ScalarNode):
+            return {node.value} if node.style is None and node.value.startswith('__autoscaler_placeholder_') else set()
+
+        if isinstance(node, yaml.MappingNode):
+            return set().union(*(cls.get_plain_placeholders(n) for pair in node.value for n in pair))
+
+        if isinstance(node, yaml.SequenceNode):
+            return set().union(*(cls.get_plain_placeholders(n) for n in node.value))
+
+        return set()
+
+    def is_string_value(self, value):
+        return self._resolver.resolve(yaml.ScalarNode, value, (True, False)) == self._resolver.DEFAULT_SCALAR_TAG
+
+    def substitute(self, node, placeholders):
+        if isinstance(node, dict):
+            return {self.substitute(k, placeholders): self.substitute(v, placeholders) for k, v in node.items()}
+
+        if isinstance(node, list):
+            return [self.substitute(item, placeholders) for item in node]
+
+        if isinstance(node, str) and '__autoscaler_placeholder_' in node:
+            for placeholder, value in placeholders.items():
+                node = node.replace(placeholder, value)
+
+        return node
+
+    def use_text(self, runner_data):
+        with self._lock:
+            self.fallback_count += 1
+
+        return self.render_text(runner_data)
+
+    def build(self, runner_data):
+        runner_data = dict(runner_data)
+        placeholders = self.get_placeholders(runner_data)
+
+        if not all(SAFE_VALUE_PATTERN.match(value) for value in placeholders.values()):
+            return self.use_text(runner_data)
+
+        skeleton, plain_placeholders, created = self.get_skeleton(runner_data)
+        if skeleton is None:
+            return self.use_text(runner_data)
+
+        if not all(self.is_string_value(placeholders[p]) for p in plain_placeholders if p in placeholders):
+            return self.use_text(runner_data)
+
+        manifest = self.substitute(skeleton, placeholders)
+
+        if created and manifest != self.render_text(runner_data):
+            # the template could not be represented as a skeleton, e.g. values used in expressions
+            with self._lock:
+                template, *_ = self._skeletons[self.get_shape(runner_data)]
+                self._skeletons[self.get_shape(runner_data)] = (template, None, set())
+
+            return self.use_text(runner_data)
+
+        with self._lock:
+            self.built_count += 1
+
+        return manifest
+
+    def stats(self):
+        with self._lock:
+            return {'built': self.built_count, 'fallback': self.fallback_count}
+
+
+manifest_builder = KubernetesManifestBuilder()
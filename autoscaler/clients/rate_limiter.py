@@ -0,0 +1,74 @@
+"""Token bucket rate limiter shared by API clients"""
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket shared by all threads of the process.
+
+    Every request takes one token, tokens are refilled with `rate` per second up to `burst`.
+    When API responds with 429, backoff() drains the bucket and pauses all the takers
+    for Retry-After seconds (or exponential backoff if the header is missing) plus jitter,
+    so all runner groups slow down together. With `rate` 0 requests are not throttled, only paused by backoff().
+    """
+
+    def __init__(self, rate, burst, backoff_base=10, jitter=0.2, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.backoff_base = backoff_base
+        self.jitter = jitter
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated_at = clock()
+        self._paused_until = self._updated_at
+        self.throttled_count = 0
+
+    def _refill(self, now):
+        if now > self._updated_at:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif not self.rate:
+                    return
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+
+                    wait = (1 - self._tokens) / self.rate
+
+            self._sleep(wait)
+
+    def backoff(self, retry_after=None, attempt=0):
+        delay = retry_after if retry_after is not None else self.backoff_base * 2 ** attempt
+        delay += random.uniform(0, delay * self.jitter)
+
+        with self._lock:
+            self.throttled_count += 1
+            self._paused_until = max(self._paused_until, self._clock() + delay)
+            # resume with a single request, the rest of the bucket is refilled over time
+            self._tokens = min(1, self.burst)
+            self._updated_at = self._paused_until
+
+        return delay
+
+    def budget(self):
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            return {
+                'tokens': int(self._tokens),
+                'burst': self.burst,
+                'paused_for': round(max(self._paused_until - now, 0), 2),
+                'throttled': self.throttled_count
+            }
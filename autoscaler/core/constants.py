@@ -10,15 +10,33 @@ DEFAULT_RUNNER_KUBERNETES_NAMESPACE = "bitbucket-runner-control-plane"
 # SLEEP TIME in seconds before the next runner setup
 DEFAULT_SLEEP_TIME_RUNNER_SETUP = 5  # seconds
 
+# Runners set up at the same time
+DEFAULT_RUNNER_SETUP_CONCURRENCY = 1
+
 # SLEEP TIME in seconds before the next runner delete
 DEFAULT_SLEEP_TIME_RUNNER_DELETE = 5  # seconds
 
+# Runners disabled or deleted at the same time
+DEFAULT_RUNNER_DELETE_CONCURRENCY = 1
+
 # SLEEP TIME in seconds before the next check runners statuses on Bitbucket Cloud
 BITBUCKET_RUNNER_API_POLLING_INTERVAL = 10 * 60  # seconds
 
+# Min SLEEP TIME in seconds before the next check of a busy or scaling group with adaptive polling
+BITBUCKET_RUNNER_API_POLLING_INTERVAL_MIN = 60  # seconds
+
 # RUNNER COOL DOWN PERIOD in seconds prevent delete fresh runners created less than period
 RUNNER_COOL_DOWN_PERIOD = 5 * 60  # seconds
 
+# Time in seconds of desired runners counts a group is scaled down to the max of. 0 disables the stabilization
+SCALE_DOWN_STABILIZATION_WINDOW = 0  # seconds
+
+# Time in seconds of scaling actions checked for flapping between scale up and down. 0 disables the detection
+FLAP_DETECTION_WINDOW = 0  # seconds
+
+# Changes of the scaling direction allowed within the flap detection window, more suppress the scale down
+FLAP_MAX_REVERSALS = 2
+
 # Max allowed groups for runner config map
 MAX_GROUPS_COUNT = 10
 
@@ -35,3 +53,98 @@ AUTOSCALER_RUNNER = 'autoscaler.created'
 DEFAULT_LABELS = frozenset({'self.hosted', 'linux', AUTOSCALER_RUNNER})
 
 DEST_TEMPLATE_FILE_PATH = os.getenv('DEST_TEMPLATE_PATH', default='/home/bitbucket/autoscaler/resources/')
+
+# Max connections kept open per host in the shared HTTP connection pool
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', default=MAX_GROUPS_COUNT))
+
+# Max hosts kept in the shared HTTP connection pool
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', default=4))
+
+# Time in seconds an idle keep-alive connection could be reused. 0 disables keep-alive
+HTTP_KEEP_ALIVE_TIMEOUT = int(os.getenv('HTTP_KEEP_ALIVE_TIMEOUT', default=60))  # seconds
+
+# Average Bitbucket API requests per second shared by all runner groups. 0 disables the throttling
+BITBUCKET_API_RATE = float(os.getenv('BITBUCKET_API_RATE', default=1 / 3))
+
+# Max burst of Bitbucket API requests shared by all runner groups before requests are throttled
+BITBUCKET_API_BURST = int(os.getenv('BITBUCKET_API_BURST', default=100))
+
+# Max pages of Bitbucket API paginated response fetched concurrently. 1 fetches pages one by one
+BITBUCKET_MAX_CONCURRENT_PAGES = int(os.getenv('BITBUCKET_MAX_CONCURRENT_PAGES', default=1))
+
+# Runners changes tracked in memory before the runners list is loaded again from Bitbucket API
+RUNNER_LEDGER_RESYNC_INTERVAL = int(os.getenv('RUNNER_LEDGER_RESYNC_INTERVAL', default=10))
+
+# Time in seconds a runner created but not ONLINE yet is counted as capacity being provisioned
+RUNNER_PROVISIONING_PERIOD = int(os.getenv('RUNNER_PROVISIONING_PERIOD', default=10 * 60))  # seconds
+
+# Attempts to disable a runner after the first failed one
+RUNNER_DISABLE_RETRIES = int(os.getenv('RUNNER_DISABLE_RETRIES', default=2))
+
+# Attempts to delete a runner or its Kubernetes job after the first failed one
+RUNNER_DELETE_RETRIES = int(os.getenv('RUNNER_DELETE_RETRIES', default=2))
+
+# Max connections to Kubernetes API server kept open in the shared connection pool
+KUBERNETES_POOL_MAXSIZE = int(os.getenv('KUBERNETES_POOL_MAXSIZE', default=MAX_GROUPS_COUNT))
+
+# Average Kubernetes API requests per second shared by all runner groups
+KUBERNETES_API_QPS = float(os.getenv('KUBERNETES_API_QPS', default=5))
+
+# Max burst of Kubernetes API requests shared by all runner groups before requests are throttled
+KUBERNETES_API_BURST = int(os.getenv('KUBERNETES_API_BURST', default=10))
+
+# Build runners manifests from the parsed job template instead of rendering and parsing YAML text for every runner
+KUBERNETES_MANIFEST_BUILDER = os.getenv('KUBERNETES_MANIFEST_BUILDER', default='false').lower() == 'true'
+
+# File the resolved workspace and repository UUIDs are saved to, so they are not requested again after restart.
+# Empty value keeps them in memory only
+UUID_CACHE_FILE = os.getenv('UUID_CACHE_FILE', default=os.path.join(DEST_TEMPLATE_FILE_PATH, 'uuid_cache.json'))
+
+# Time in seconds a resolved workspace or repository UUID is reused
+UUID_CACHE_TTL = int(os.getenv('UUID_CACHE_TTL', default=6 * 60 * 60))  # seconds
+
+# Time in seconds a workspace or repository not found is not requested again
+UUID_CACHE_NEGATIVE_TTL = int(os.getenv('UUID_CACHE_NEGATIVE_TTL', default=5 * 60))  # seconds
+
+# Keep runner Jobs and Pods cached locally with Kubernetes API watches
+KUBERNETES_INFORMER = os.getenv('KUBERNETES_INFORMER', default='false').lower() == 'true'
+
+# Time in seconds a Kubernetes API watch request is kept open before it is started again
+KUBERNETES_INFORMER_WATCH_TIMEOUT = int(os.getenv('KUBERNETES_INFORMER_WATCH_TIMEOUT', default=5 * 60))  # seconds
+
+# Time in seconds to wait for the Kubernetes objects to be listed on startup
+KUBERNETES_INFORMER_SYNC_TIMEOUT = int(os.getenv('KUBERNETES_INFORMER_SYNC_TIMEOUT', default=30))  # seconds
+
+# Create only as many runners as the cluster nodes could schedule now
+KUBERNETES_CAPACITY_GATE = os.getenv('KUBERNETES_CAPACITY_GATE', default='false').lower() == 'true'
+
+# Keep low-priority placeholder pods reserving nodes capacity for the next runners of every group
+RUNNER_HEADROOM = os.getenv('RUNNER_HEADROOM', default='false').lower() == 'true'
+
+# Time in seconds of scale ups history used to size the placeholders of a group
+RUNNER_HEADROOM_WINDOW = int(os.getenv('RUNNER_HEADROOM_WINDOW', default=60 * 60))  # seconds
+
+# Max placeholder pods of a group
+RUNNER_HEADROOM_MAX = int(os.getenv('RUNNER_HEADROOM_MAX', default=5))
+
+# Priority of the placeholder pods, lower than the runner pods priority, so runner pods preempt them
+RUNNER_HEADROOM_PRIORITY = int(os.getenv('RUNNER_HEADROOM_PRIORITY', default=-10))
+
+# Image of the placeholder pods containers
+RUNNER_HEADROOM_IMAGE = os.getenv('RUNNER_HEADROOM_IMAGE', default='registry.k8s.io/pause:3.9')
+
+# Keep a DaemonSet pulling the images of the job template on every runner node
+KUBERNETES_IMAGE_PREPULL = os.getenv('KUBERNETES_IMAGE_PREPULL', default='false').lower() == 'true'
+
+# Namespace of the images pre-pull DaemonSet
+KUBERNETES_IMAGE_PREPULL_NAMESPACE = os.getenv('KUBERNETES_IMAGE_PREPULL_NAMESPACE', default='bitbucket-runner-control-plane')
+
+# Max time in seconds between checks of the runner groups schedule and the config file changes
+GROUP_SCHEDULER_TICK_INTERVAL = int(os.getenv('GROUP_SCHEDULER_TICK_INTERVAL', default=5))  # seconds
+
+# File the busy and idle runners history of the groups is saved to, so forecasts survive restarts.
+# Empty value keeps it in memory only
+RUNNERS_HISTORY_FILE = os.getenv('RUNNERS_HISTORY_FILE', default=os.path.join(DEST_TEMPLATE_FILE_PATH, 'runners_history.json'))
+
+# Time in seconds busy and idle runners samples are kept for the forecasts
+RUNNERS_HISTORY_RETENTION = int(os.getenv('RUNNERS_HISTORY_RETENTION', default=2 * 24 * 60 * 60))  # seconds
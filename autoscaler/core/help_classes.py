@@ -13,6 +13,8 @@ class SEnum(Enum):
 class Strategies(Enum):
     PCT_RUNNER_IDLE = 'percentageRunnersIdle'
     PCT_RUNNER_IDLE_BY_PROJECT = 'percentageRunnersIdleByProject'
+    PREDICTIVE_RUNNERS_IDLE = 'predictiveRunnersIdle'
+    TARGET_TRACKING = 'targetTracking'
 
 
 class BitbucketRunnerStatuses(SEnum):
@@ -87,6 +87,14 @@ def string_to_base64string(string, encoding='utf-8'):
     return base64.b64encode(bytes(string, encoding)).decode(encoding)
 
 
+def get_group_key(name, labels):
+    """Key of the runner group kept between the attempts.
+
+    Group names are not unique, labels are, so the key is the name with the sorted labels.
+    """
+    return f"{name}[{','.join(sorted(labels))}]"
+
+
 def read_yaml_file(config_path):
     try:
         with open(config_path, 'r') as f:
@@ -0,0 +1,109 @@
+"""Busy and idle runners counts of the groups over time, used to forecast the demand."""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from autoscaler.core import constants
+from autoscaler.core.logger import logger
+
+
+class RunnersHistory:
+    """Samples of busy and idle runners counts by group key, kept for `retention` seconds.
+
+    Scaler instances are created again on every attempt, so samples are kept per group key.
+    Samples are saved to `file_path` after every change and loaded on the first read, so daily
+    seasonality is not lost when the process restarts. Empty `file_path` keeps the samples in memory only.
+    """
+
+    def __init__(self, file_path=constants.RUNNERS_HISTORY_FILE, retention=constants.RUNNERS_HISTORY_RETENTION,
+                 clock=time.time):
+        self.file_path = file_path
+        self.retention = retention
+        # wall clock time, samples are compared with the same time of the previous day
+        self._clock = clock
+        self._lock = threading.Lock()
+        # group key -> [[time, busy, idle]] ordered by time
+        self._samples = None
+
+    def _get_samples(self):
+        if self._samples is None:
+            self._samples = self.load_file()
+
+        return self._samples
+
+    def add(self, key, busy, idle):
+        with self._lock:
+            now = self._clock()
+            samples = self._get_samples().setdefault(key, [])
+            samples.append([now, busy, idle])
+            samples[:] = [sample for sample in samples if sample[0] > now - self.retention]
+            self.save()
+
+    def get(self, key, since=None, until=None):
+        """Samples of the group as (time, busy, idle), within [since, until] if given."""
+        with self._lock:
+            return [
+                tuple(sample) for sample in self._get_samples().get(key, [])
+                if (since is None or sample[0] >= since) and (until is None or sample[0] <= until)
+            ]
+
+    def get_ewma(self, key, alpha, window=None):
+        """Exponentially weighted moving average of the busy runners count, None without samples.
+
+        Only samples of the last `window` seconds are averaged if given.
+        """
+        since = self._clock() - window if window is not None else None
+        ewma = None
+        for _, busy, _ in self.get(key, since=since):
+            ewma = busy if ewma is None else alpha * busy + (1 - alpha) * ewma
+
+        return ewma
+
+    def get_seasonal(self, key, ahead, window, period=24 * 60 * 60):
+        """Average busy runners count one `period` before `ahead` seconds from now, within `window` seconds around it."""
+        at = self._clock() + ahead - period
+        samples = self.get(key, since=at - window, until=at + window)
+        if not samples:
+            return None
+
+        return sum(busy for _, busy, _ in samples) / len(samples)
+
+    def load_file(self):
+        if not self.file_path or not os.path.exists(self.file_path):
+            return {}
+
+        try:
+            with open(self.file_path) as f:
+                samples = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Runners history file {self.file_path} not loaded: {e}")
+            return {}
+
+        expired_before = self._clock() - self.retention
+        return {key: [s for s in key_samples if s[0] > expired_before] for key, key_samples in samples.items()}
+
+    def save(self):
+        if not self.file_path:
+            return
+
+        # write a temporary file and rename it, so a process stopped while writing does not leave a broken file
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.file_path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._samples, f)
+            os.replace(tmp_path, self.file_path)
+        except OSError as e:
+            logger.warning(f"Runners history file {self.file_path} not saved: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def clear(self):
+        with self._lock:
+            self._samples = {}
+            self.save()
+
+
+runners_history = RunnersHistory()
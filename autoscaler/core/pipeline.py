@@ -0,0 +1,136 @@
+"""Multi-stage pipeline with bounded concurrency per stage."""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from autoscaler.clients.rate_limiter import RateLimiter
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Any], Any]
+    concurrency: int = 1
+    # attempts after the first failed one, only for idempotent steps
+    retries: int = 0
+    # limits how often the stage starts a new task
+    rate_limiter: RateLimiter | None = None
+
+
+@dataclass
+class TaskResult:
+    item: Any
+    value: Any = None
+    stage: str | None = None
+    error: Exception | None = None
+    attempts: dict = field(default_factory=dict)
+    started_at: float = 0
+    finished_at: float = 0
+    skipped: bool = False
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def duration(self):
+        return self.finished_at - self.started_at
+
+
+class Pipeline:
+    """Runs every item through the stages in order.
+
+    Each stage has its own thread pool, so an item goes to the next stage as soon as
+    the previous one completes it, while other items are still in the previous stage.
+    A stage receives the value returned by the previous one (the item for the first stage).
+    A stage returning None finishes the task as skipped. A failed task is not passed further;
+    its result keeps the stage name and the error, the other tasks are not affected.
+    """
+
+    def __init__(self, stages, clock=time.monotonic):
+        self.stages = stages
+        self._clock = clock
+        self.metrics = {stage.name: {'succeeded': 0, 'failed': 0, 'retried': 0, 'duration': 0.0} for stage in stages}
+
+    def _call(self, stage, value):
+        if stage.rate_limiter is not None:
+            stage.rate_limiter.acquire()
+
+        started_at = self._clock()
+        try:
+            return stage.func(value)
+        finally:
+            self.metrics[stage.name]['duration'] += self._clock() - started_at
+
+    def run(self, items):
+        results = [TaskResult(item=item, started_at=self._clock()) for item in items]
+        executors = [ThreadPoolExecutor(max_workers=max(stage.concurrency, 1)) for stage in self.stages]
+        pending = {}
+
+        def submit(stage_index, result, value):
+            stage = self.stages[stage_index]
+            result.stage = stage.name
+            result.attempts[stage.name] = result.attempts.get(stage.name, 0) + 1
+            future = executors[stage_index].submit(self._call, stage, value)
+            pending[future] = (stage_index, result, value)
+
+        try:
+            if self.stages:
+                for result in results:
+                    submit(0, result, result.item)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage_index, result, value = pending.pop(future)
+                    stage = self.stages[stage_index]
+                    metrics = self.metrics[stage.name]
+
+                    try:
+                        result.value = future.result()
+                    except Exception as e:
+                        if result.attempts[stage.name] <= stage.retries:
+                            metrics['retried'] += 1
+                            submit(stage_index, result, value)
+                            continue
+
+                        metrics['failed'] += 1
+                        result.error = e
+                        result.finished_at = self._clock()
+                        continue
+
+                    metrics['succeeded'] += 1
+
+                    if result.value is None:
+                        result.skipped = stage_index + 1 < len(self.stages)
+                        result.finished_at = self._clock()
+                    elif stage_index + 1 < len(self.stages):
+                        submit(stage_index + 1, result, result.value)
+                    else:
+                        result.finished_at = self._clock()
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+        return results
+
+    @staticmethod
+    def summary(results):
+        durations = [r.duration for r in results if r.ok and not r.skipped]
+        return {
+            'succeeded': len(durations),
+            'failed': len([r for r in results if not r.ok]),
+            'skipped': len([r for r in results if r.skipped]),
+            'avg_duration': round(sum(durations) / len(durations), 2) if durations else 0,
+            'max_duration': round(max(durations), 2) if durations else 0,
+        }
+
+
+def start_rate_limiter(interval, concurrency):
+    """Starts up to `concurrency` tasks at once, then a task every `interval / concurrency` seconds on average."""
+    if interval <= 0:
+        return None
+
+    concurrency = max(concurrency, 1)
+    return RateLimiter(rate=concurrency / interval, burst=concurrency)
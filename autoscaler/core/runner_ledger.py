@@ -0,0 +1,88 @@
+"""In-memory runners list kept up to date by the autoscaler's own changes."""
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+from autoscaler.core import constants
+from autoscaler.core.help_classes import BitbucketRunnerStatuses
+
+
+class RunnerLedger:
+    """Runners of one workspace or repository tracked between authoritative listings.
+
+    The ledger is seeded with the runners listing of the attempt and then updated from the
+    create and disable responses, so runners count checks do not download the whole list again.
+    After `resync_interval` updates the next read loads the list from Bitbucket again,
+    which picks up changes done outside the autoscaler.
+    """
+
+    def __init__(self, load, resync_interval=constants.RUNNER_LEDGER_RESYNC_INTERVAL):
+        self._load = load
+        self.resync_interval = resync_interval
+        self._lock = threading.Lock()
+        self._runners = None
+        self._updates_count = 0
+        self.resync_count = 0
+
+    def seed(self, runners):
+        with self._lock:
+            self._runners = {r['uuid']: r for r in runners}
+            self._updates_count = 0
+
+    def resync(self):
+        self.seed(self._load())
+        self.resync_count += 1
+
+    def get_runners(self):
+        with self._lock:
+            stale = self._runners is None or self._updates_count >= self.resync_interval
+
+        if stale:
+            self.resync()
+
+        with self._lock:
+            return list(self._runners.values())
+
+    def count(self):
+        return len(self.get_runners())
+
+    def stats(self):
+        return dict(Counter([r['state'].get('status') for r in self.get_runners()]))
+
+    def _update(self, runner_uuid, runner):
+        with self._lock:
+            if self._runners is None:
+                # not seeded yet, the first read loads the list anyway
+                return
+
+            if runner is None:
+                self._runners.pop(runner_uuid, None)
+            else:
+                self._runners[runner_uuid] = runner
+
+            self._updates_count += 1
+
+    def add_runner(self, runner_uuid, labels):
+        self._update(runner_uuid, {
+            'uuid': runner_uuid,
+            'labels': list(labels),
+            'state': {'status': BitbucketRunnerStatuses.UNREGISTERED.name},
+            'created_on': datetime.now(timezone.utc).isoformat(),
+        })
+
+    def disable_runner(self, runner_uuid):
+        with self._lock:
+            runner = (self._runners or {}).get(runner_uuid)
+
+        if runner is None:
+            self._update(runner_uuid, None)
+            return
+
+        # disabled runners still count against the runners limit until deleted
+        self._update(runner_uuid, {
+            **runner,
+            'state': {**runner['state'], 'status': BitbucketRunnerStatuses.DISABLED.name},
+        })
+
+    def delete_runner(self, runner_uuid):
+        self._update(runner_uuid, None)
@@ -0,0 +1,195 @@
+"""Runner groups started on their own timers."""
+import time
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from autoscaler.core.logger import logger, GroupNamePrefixAdapter
+
+
+@dataclass
+class PollingActivity:
+    """Load of a group observed by its run, used to choose the time to its next run."""
+    scale_up_threshold: float
+    busy_ratio: float = 0
+    # runners created or disabled by the run, or runners still being provisioned
+    in_flight: bool = False
+
+    def observe(self, busy_ratio, in_flight=False):
+        # groups with several repositories report the busiest one
+        self.busy_ratio = max(self.busy_ratio, busy_ratio)
+        self.in_flight = self.in_flight or in_flight
+
+
+@dataclass(frozen=True)
+class AdaptiveInterval:
+    """Interval between group runs chosen by the activity the previous run observed.
+
+    A group scaling or with the busy ratio within `near_threshold` of its scale up threshold is polled
+    every `min_interval` seconds. A stable or idle group backs off by `backoff_multiplier` up to `max_interval`.
+    """
+    min_interval: float
+    max_interval: float
+    near_threshold: float = 0.1
+    backoff_multiplier: float = 2
+
+    def clamp(self, interval):
+        return max(min(interval, self.max_interval), min(self.min_interval, self.max_interval))
+
+    def next_interval(self, interval, activity):
+        if not isinstance(activity, PollingActivity):
+            return self.clamp(interval)
+
+        if activity.in_flight or activity.busy_ratio >= activity.scale_up_threshold - self.near_threshold:
+            return self.clamp(self.min_interval)
+
+        return self.clamp(interval * self.backoff_multiplier)
+
+
+@dataclass
+class ScheduledGroup:
+    name: str
+    interval: float
+    func: Callable[[], Any]
+    next_run_at: float
+    adaptive: AdaptiveInterval | None = None
+    future: Any = None
+    started_at: float | None = None
+    runs_count: int = 0
+    overruns_count: int = 0
+
+
+class GroupScheduler:
+    """Starts every runner group `interval` seconds after its previous start.
+
+    Groups do not wait for each other, so a slow group does not delay the next attempts of the others.
+    The interval of a group is also the deadline of its run. A run still going when the group is due
+    is an overrun: the attempt is skipped, and the group is started on its first due time after the run completes.
+    Errors of a run, including exits of a failed validation, are raised when the run is collected.
+
+    A group with an AdaptiveInterval gets the interval to its next run when its run is collected,
+    from the PollingActivity the run returned.
+    """
+
+    def __init__(self, executor, clock=time.monotonic):
+        self.executor = executor
+        self._clock = clock
+        self._groups = {}
+
+    def schedule(self, groups):
+        """Sets the groups to run, as key -> (name, interval, func). A new group is due at once.
+
+        Group names are not unique, so groups are identified by a key, e.g. the name with the labels.
+        The interval is seconds or an AdaptiveInterval.
+        """
+        now = self._clock()
+
+        for key in set(self._groups) - set(groups):
+            logger.info(f"Group {self._groups[key].name} removed from the schedule.")
+            del self._groups[key]
+
+        for key, (name, interval, func) in groups.items():
+            adaptive = None
+            if isinstance(interval, AdaptiveInterval):
+                adaptive = interval
+
+            group = self._groups.get(key)
+            if group is None:
+                if adaptive is not None:
+                    interval = adaptive.clamp(adaptive.min_interval)
+
+                self._groups[key] = ScheduledGroup(
+                    name=name, interval=interval, func=func, next_run_at=now, adaptive=adaptive
+                )
+                continue
+
+            if adaptive is not None:
+                # the current interval chosen by the activity, within the new bounds
+                interval = adaptive.clamp(group.interval)
+
+            if group.interval != interval and group.started_at is not None:
+                group.next_run_at = group.started_at + interval
+
+            group.interval = interval
+            group.adaptive = adaptive
+            group.func = func
+
+    def collect(self, group):
+        if group.future is None or not group.future.done():
+            return
+
+        future, group.future = group.future, None
+        activity = future.result()
+
+        if group.adaptive is None:
+            return
+
+        interval = group.adaptive.next_interval(group.interval, activity)
+        if interval != group.interval:
+            GroupNamePrefixAdapter(logger, {'name': group.name}).info(
+                f"Polling interval changed from {group.interval} to {interval} seconds."
+            )
+            group.interval = interval
+
+        group.next_run_at = group.started_at + interval
+
+    def run_pending(self):
+        """Starts the groups due now. Returns the names of the started groups."""
+        started = []
+
+        for group in self._groups.values():
+            self.collect(group)
+
+            now = self._clock()
+            if now < group.next_run_at:
+                continue
+
+            logger_adapter = GroupNamePrefixAdapter(logger, {'name': group.name})
+
+            if group.future is not None:
+                group.overruns_count += 1
+                skipped = 0
+                while group.next_run_at <= now:
+                    group.next_run_at += group.interval
+                    skipped += 1
+
+                logger_adapter.warning(
+                    f"Previous attempt is running for {round(now - group.started_at)} seconds, "
+                    f"longer than the interval {group.interval} seconds. Attempts skipped: {skipped}"
+                )
+                continue
+
+            group.future = self.executor.submit(group.func)
+            group.started_at = now
+            group.next_run_at = now + group.interval
+            group.runs_count += 1
+            started.append(group.name)
+
+            logger_adapter.info(f"Autoscaler next attempt in {group.interval} seconds...")
+
+        return started
+
+    def get_wait_time(self):
+        """Seconds until the first group is due."""
+        if not self._groups:
+            return None
+
+        return max(min(group.next_run_at for group in self._groups.values()) - self._clock(), 0)
+
+    def wait(self):
+        """Waits for the running groups to complete."""
+        wait([group.future for group in self._groups.values() if group.future is not None])
+
+        for group in self._groups.values():
+            self.collect(group)
+
+    def stats(self):
+        return {
+            group.name: {
+                'interval': group.interval,
+                'runs': group.runs_count,
+                'overruns': group.overruns_count,
+                'running': group.future is not None,
+            }
+            for group in self._groups.values()
+        }
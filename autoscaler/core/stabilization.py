@@ -0,0 +1,118 @@
+"""Scaling decisions of the groups kept between the attempts to stop scaling down too early"""
+import threading
+import time
+from collections import Counter, deque
+
+SCALE_UP = 'up'
+SCALE_DOWN = 'down'
+
+
+class ScalingDecisions:
+    """Desired runners counts of every group within the scale down stabilization window.
+
+    Scaler instances are created again on every attempt, so the decisions are kept per group key.
+    A group is scaled down only to the max desired runners count within the window,
+    as the Kubernetes Horizontal Pod Autoscaler does, so a single idle attempt does not disable runners.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # group key -> deque of (time, desired runners count)
+        self._decisions = {}
+
+    def record(self, group_key, desired_runners_count, window):
+        """Records the desired runners count of the group for `window` seconds."""
+        if window <= 0:
+            return
+
+        with self._lock:
+            now = self._clock()
+            decisions = self._decisions.setdefault(group_key, deque())
+            decisions.append((now, desired_runners_count))
+            while decisions[0][0] <= now - window:
+                decisions.popleft()
+
+    def get_stabilized(self, group_key, window):
+        """Max desired runners count recorded within `window` seconds, None if there is none."""
+        if window <= 0:
+            return None
+
+        with self._lock:
+            expired_before = self._clock() - window
+            return max(
+                (count for recorded_at, count in self._decisions.get(group_key, ()) if recorded_at > expired_before),
+                default=None
+            )
+
+    def clear(self):
+        with self._lock:
+            self._decisions.clear()
+
+
+class FlapDetector:
+    """Scaling actions of every group, to suppress the scale downs of a group flapping between scale up and down.
+
+    A group is flapping when its scaling actions within the window change the direction more than
+    `max_reversals` times with the next scale down. Only scale downs are suppressed: the runners disabled
+    would be created again on the next scale up, while suppressed scale ups would make pipelines wait.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # group key -> deque of (time, SCALE_UP or SCALE_DOWN)
+        self._actions = {}
+        self._suppressed = Counter()
+
+    def _expire(self, actions, window):
+        expired_before = self._clock() - window
+        while actions and actions[0][0] <= expired_before:
+            actions.popleft()
+
+    @staticmethod
+    def count_reversals(actions):
+        return sum(1 for previous, action in zip(actions, actions[1:]) if previous != action)
+
+    def add(self, group_key, action, window):
+        if window <= 0:
+            return
+
+        with self._lock:
+            actions = self._actions.setdefault(group_key, deque())
+            actions.append((self._clock(), action))
+            self._expire(actions, window)
+
+    def suppress_scale_down(self, group_key, window, max_reversals):
+        """True if the scale down of the group should be suppressed, otherwise the scale down is recorded."""
+        if window <= 0:
+            return False
+
+        with self._lock:
+            actions = self._actions.setdefault(group_key, deque())
+            self._expire(actions, window)
+
+            reversals = self.count_reversals([action for _, action in actions] + [SCALE_DOWN])
+            if reversals > max_reversals:
+                self._suppressed[group_key] += 1
+                return True
+
+            actions.append((self._clock(), SCALE_DOWN))
+            return False
+
+    def get_suppressed_count(self, group_key):
+        with self._lock:
+            return self._suppressed[group_key]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._suppressed)
+
+    def clear(self):
+        with self._lock:
+            self._actions.clear()
+            self._suppressed.clear()
+
+
+scaling_decisions = ScalingDecisions()
+flap_detector = FlapDetector()
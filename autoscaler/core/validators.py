@@ -2,7 +2,7 @@ import os
 from abc import ABC
 from typing import Any, Optional, List, Dict, Literal
 
-from pydantic import conlist, conset, root_validator, validator, Extra
+from pydantic import confloat, conint, conlist, conset, root_validator, validator, Extra
 from pydantic_yaml import YamlModel
 
 import autoscaler.core.constants as constants
@@ -47,11 +47,31 @@ def validate_kubernetes_manifest(template_filename):
     )
 
 
+def prefetch_groups_uuids(groups):
+    # resolve workspaces and repositories of all the groups concurrently, before groups are validated one by one
+    BitbucketService.prefetch_workspace_repository_uuids(
+        (group['workspace'], group.get('repository'))
+        for group in groups
+        if isinstance(group, dict)
+        and isinstance(group.get('workspace'), str)
+        and isinstance(group.get('repository'), (str, type(None)))
+    )
+
+
 class Constants(YamlModel):
     default_sleep_time_runner_setup: int = constants.DEFAULT_SLEEP_TIME_RUNNER_SETUP
     default_sleep_time_runner_delete: int = constants.DEFAULT_SLEEP_TIME_RUNNER_DELETE
     runner_api_polling_interval: int = constants.BITBUCKET_RUNNER_API_POLLING_INTERVAL
+    # poll busy or scaling groups every runner_api_polling_interval_min seconds,
+    # back off up to runner_api_polling_interval while they are stable
+    adaptive_polling: bool = False
+    runner_api_polling_interval_min: conint(gt=0) = constants.BITBUCKET_RUNNER_API_POLLING_INTERVAL_MIN
     runner_cool_down_period: int = constants.RUNNER_COOL_DOWN_PERIOD
+    scale_down_stabilization_window: conint(ge=0) = constants.SCALE_DOWN_STABILIZATION_WINDOW
+    flap_detection_window: conint(ge=0) = constants.FLAP_DETECTION_WINDOW
+    flap_max_reversals: conint(gt=0) = constants.FLAP_MAX_REVERSALS
+    runner_setup_concurrency: int = constants.DEFAULT_RUNNER_SETUP_CONCURRENCY
+    runner_delete_concurrency: int = constants.DEFAULT_RUNNER_DELETE_CONCURRENCY
 
 
 class NameUUIDData(YamlModel):
@@ -73,6 +93,37 @@ class PctRunnersIdleParameters(YamlModel):
     scale_down_multiplier: float
 
 
+class PredictiveRunnersIdleParameters(PctRunnersIdleParameters):
+    # seconds ahead the demand is forecast, about the polling interval plus the runner start time
+    forecast_horizon: conint(gt=0) = 600
+    # weight of the latest busy runners count in the moving average
+    ewma_alpha: confloat(gt=0, le=1) = 0.3
+    # weight of the busy runners count at the same time of the previous day
+    seasonality_weight: confloat(ge=0, le=1) = 0.5
+    # seconds around the same time of the previous day averaged for the seasonality
+    seasonality_window: conint(gt=0) = 900
+
+    @validator('scale_up_threshold')
+    @classmethod
+    def scale_up_threshold_positive(cls, scale_up_threshold):
+        # the desired runners count keeps the forecast busy runners ratio at the scale up threshold
+        if scale_up_threshold <= 0:
+            raise ValueError('scale_up_threshold should be greater than 0.')
+        return scale_up_threshold
+
+
+class TargetTrackingParameters(YamlModel):
+    min: int
+    max: int
+    # desired busy runners ratio, the runners count is set to busy / target_utilization
+    target_utilization: confloat(gt=0, le=1)
+    # busy runners ratio within the tolerance of the target is not scaled
+    tolerance: confloat(ge=0, lt=1) = 0.1
+    # max runners created and disabled on one attempt, not limited if not set
+    max_surge: Optional[conint(gt=0)] = None
+    max_unavailable: Optional[conint(gt=0)] = None
+
+
 class KubernetesJobResources(YamlModel):
     requests: MemoryCPUData = MemoryCPUData.parse_obj(dict())
     limits: MemoryCPUData = MemoryCPUData.parse_obj(dict())
@@ -90,7 +141,12 @@ class GroupMeta(YamlModel):
     repository: Optional[str] = None
 
     class Strategy:
-        supported_strategies = (Strategies.PCT_RUNNER_IDLE.value, Strategies.PCT_RUNNER_IDLE_BY_PROJECT.value)
+        supported_strategies = (
+            Strategies.PCT_RUNNER_IDLE.value,
+            Strategies.PCT_RUNNER_IDLE_BY_PROJECT.value,
+            Strategies.PREDICTIVE_RUNNERS_IDLE.value,
+            Strategies.TARGET_TRACKING.value,
+        )
 
     @validator('strategy')
     @classmethod
@@ -129,6 +185,8 @@ class GroupData(GroupMeta):
     labels: conset(str, min_items=1)
     parameters: Dict
     resources: KubernetesJobResources = KubernetesJobResources.parse_obj(dict())
+    # overrides constants.runner_api_polling_interval for the group
+    runner_api_polling_interval: Optional[conint(gt=0)] = None
 
     @validator('labels')
     @classmethod
@@ -148,6 +206,12 @@ class GroupData(GroupMeta):
         if strategy == Strategies.PCT_RUNNER_IDLE_BY_PROJECT.value:
             parameters = PctRunnersIdleParameters.parse_obj(parameters)
 
+        if strategy == Strategies.PREDICTIVE_RUNNERS_IDLE.value:
+            parameters = PredictiveRunnersIdleParameters.parse_obj(parameters)
+
+        if strategy == Strategies.TARGET_TRACKING.value:
+            parameters = TargetTrackingParameters.parse_obj(parameters)
+
         return parameters
 
 
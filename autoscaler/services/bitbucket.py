@@ -1,8 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
 from autoscaler.clients.bitbucket.base import BitbucketRepository, BitbucketRepositoryRunner, BitbucketWorkspace, BitbucketWorkspaceRunner
+from autoscaler.core import constants
+from autoscaler.core.exceptions import AutoscalerHTTPError
 from autoscaler.core.logger import logger, GroupNamePrefixAdapter
 from autoscaler.core.helpers import string_to_base64string
+from autoscaler.services.runners_snapshot import RunnersSnapshot
+from autoscaler.services.uuid_cache import UUIDCache
 
 
 @dataclass
@@ -15,10 +20,27 @@ class BitbucketServiceData:
 
 
 class BitbucketService:
-    def __init__(self, group_name):
+    # workspace and repository UUIDs shared by all the groups
+    uuid_cache = UUIDCache()
+
+    def __init__(self, group_name, runners_snapshot: RunnersSnapshot | None = None):
         self.logger_adapter = GroupNamePrefixAdapter(logger, {'name': group_name})
+        self.runners_snapshot = runners_snapshot
 
     def get_bitbucket_runners(self, workspace, repository=None):
+        if self.runners_snapshot is None:
+            return self.fetch_bitbucket_runners(workspace, repository)
+
+        return self.runners_snapshot.get(
+            RunnersSnapshot.get_key(workspace, repository),
+            lambda: self.fetch_bitbucket_runners(workspace, repository)
+        )
+
+    def invalidate_runners_snapshot(self, workspace, repository=None):
+        if self.runners_snapshot is not None:
+            self.runners_snapshot.invalidate(RunnersSnapshot.get_key(workspace, repository))
+
+    def fetch_bitbucket_runners(self, workspace, repository=None):
         msg = f"Getting runners on Bitbucket workspace: {workspace.name}"
 
         if repository:
@@ -53,6 +75,8 @@ class BitbucketService:
 
             self.logger_adapter.info(f"{create_complete_msg}")
 
+        self.invalidate_runners_snapshot(workspace, repository)
+
         self.logger_adapter.debug(data)
 
         runner_data = BitbucketServiceData(
@@ -81,6 +105,8 @@ class BitbucketService:
             workspace_runner_api = BitbucketWorkspaceRunner()
             workspace_runner_api.delete_runner(workspace.uuid, runner_uuid)
 
+        self.invalidate_runners_snapshot(workspace, repository)
+
     def disable_bitbucket_runner(self, workspace, runner_uuid, repository=None):
         msg = f"Starting to disable runner {runner_uuid} from Bitbucket workspace: {workspace.name}"
 
@@ -95,22 +121,56 @@ class BitbucketService:
             workspace_runner_api = BitbucketWorkspaceRunner()
             workspace_runner_api.disable_runner(workspace.uuid, runner_uuid)
 
-    @staticmethod
-    def get_bitbucket_workspace_repository_uuids(workspace_name, repository_name):
-        workspace_api = BitbucketWorkspace()
-        workspace_response = workspace_api.get_workspace(workspace_name)
-        workspace_data = {
-            'uuid': workspace_response['uuid'],
-            'name': workspace_response['slug']
-        }
+        self.invalidate_runners_snapshot(workspace, repository)
 
-        repository_data = None
-        if repository_name:
-            repository_api = BitbucketRepository()
-            repository_response = repository_api.get_repository(workspace_name, repository_name)
-            repository_data = {
+    @classmethod
+    def get_workspace_data(cls, workspace_name):
+        def load():
+            workspace_response = BitbucketWorkspace().get_workspace(workspace_name)
+            return {
+                'uuid': workspace_response['uuid'],
+                'name': workspace_response['slug']
+            }
+
+        return cls.uuid_cache.get(f'workspace:{workspace_name}', load)
+
+    @classmethod
+    def get_repository_data(cls, workspace_name, repository_name):
+        def load():
+            repository_response = BitbucketRepository().get_repository(workspace_name, repository_name)
+            return {
                 'uuid': repository_response['uuid'],
                 'name': repository_response['slug']
             }
 
+        return cls.uuid_cache.get(f'repository:{workspace_name}/{repository_name}', load)
+
+    @classmethod
+    def get_bitbucket_workspace_repository_uuids(cls, workspace_name, repository_name):
+        workspace_data = cls.get_workspace_data(workspace_name)
+
+        repository_data = None
+        if repository_name:
+            repository_data = cls.get_repository_data(workspace_name, repository_name)
+
         return workspace_data, repository_data
+
+    @classmethod
+    def prefetch_workspace_repository_uuids(cls, names):
+        """Resolves UUIDs of (workspace name, repository name or None) pairs concurrently.
+
+        Errors are ignored here, they are raised again when the groups are validated.
+        """
+        def prefetch(workspace_name, repository_name):
+            try:
+                cls.get_bitbucket_workspace_repository_uuids(workspace_name, repository_name)
+            except AutoscalerHTTPError as e:
+                logger.debug(f"UUIDs of workspace {workspace_name} repository {repository_name} not resolved: {e}")
+
+        names = set(names)
+        if not names:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(len(names), constants.MAX_GROUPS_COUNT)) as executor:
+            for future in [executor.submit(prefetch, *pair) for pair in names]:
+                future.result()
@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 
-from autoscaler.clients.bitbucket.base import BitbucketRepository, BitbucketRepositoryRunner, BitbucketWorkspace, BitbucketWorkspaceRunner
+from autoscaler.clients.bitbucket.base import BitbucketRepository, BitbucketRepositoryRunner, BitbucketWorkspaceRunner
 from autoscaler.core.logger import logger, GroupNamePrefixAdapter
 from autoscaler.core.helpers import string_to_base64string
+from autoscaler.services.bitbucket import BitbucketService
+from autoscaler.services.runners_snapshot import RunnersSnapshot
 
 
 @dataclass
@@ -19,10 +21,24 @@ class RepositoryData:
     name: str
 
 class BitbucketByProjectService:
-    def __init__(self, group_name):
+    def __init__(self, group_name, runners_snapshot: RunnersSnapshot | None = None):
         self.logger_adapter = GroupNamePrefixAdapter(logger, {'name': group_name})
+        self.runners_snapshot = runners_snapshot
 
     def get_bitbucket_runners(self, workspace, repository=None):
+        if self.runners_snapshot is None:
+            return self.fetch_bitbucket_runners(workspace, repository)
+
+        return self.runners_snapshot.get(
+            RunnersSnapshot.get_key(workspace, repository),
+            lambda: self.fetch_bitbucket_runners(workspace, repository)
+        )
+
+    def invalidate_runners_snapshot(self, workspace, repository=None):
+        if self.runners_snapshot is not None:
+            self.runners_snapshot.invalidate(RunnersSnapshot.get_key(workspace, repository))
+
+    def fetch_bitbucket_runners(self, workspace, repository=None):
         msg = f"Getting runners on Bitbucket workspace: {workspace.name}"
 
         if repository:
@@ -57,6 +73,8 @@ class BitbucketByProjectService:
 
             self.logger_adapter.info(f"{create_complete_msg}")
 
+        self.invalidate_runners_snapshot(workspace, repository)
+
         self.logger_adapter.debug(data)
 
         runner_data = BitbucketByProjectServiceData(
@@ -85,6 +103,8 @@ class BitbucketByProjectService:
             workspace_runner_api = BitbucketWorkspaceRunner()
             workspace_runner_api.delete_runner(workspace.uuid, runner_uuid)
 
+        self.invalidate_runners_snapshot(workspace, repository)
+
     def disable_bitbucket_runner(self, workspace, runner_uuid, repository=None):
         msg = f"Starting to disable runner {runner_uuid} from Bitbucket workspace: {workspace.name}"
 
@@ -99,14 +119,12 @@ class BitbucketByProjectService:
             workspace_runner_api = BitbucketWorkspaceRunner()
             workspace_runner_api.disable_runner(workspace.uuid, runner_uuid)
 
+        self.invalidate_runners_snapshot(workspace, repository)
+
     @staticmethod
     def get_bitbucket_workspace_repository_uuids(workspace_name, project_uuid):
-        workspace_api = BitbucketWorkspace()
-        workspace_response = workspace_api.get_workspace(workspace_name)
-        workspace_data = {
-            'uuid': workspace_response['uuid'],
-            'name': workspace_response['slug']
-        }
+        # repositories of the project are requested every time, they change when the description is updated
+        workspace_data = BitbucketService.get_workspace_data(workspace_name)
 
         repositories = []
         repository_api = BitbucketRepository()
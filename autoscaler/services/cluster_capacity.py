@@ -0,0 +1,151 @@
+import math
+
+from kubernetes.utils import parse_quantity
+
+from autoscaler.clients.kubernetes.informer import RUNNER_LABEL
+from autoscaler.services.placeholders import PLACEHOLDER_LABEL
+
+RESOURCES = ('cpu', 'memory')
+
+
+class ClusterCapacity:
+    """Free resources of the cluster nodes, to check how many runner pods could be scheduled.
+
+    Free resources of a node are its allocatable resources minus requests of the pods scheduled to it.
+    Only ready, schedulable nodes matching the pod nodeSelector, with all NoSchedule and NoExecute taints
+    tolerated by the pod, are counted. Runner pods not scheduled yet take the capacity first, only of the nodes
+    they could be scheduled to, so pending runners of another node pool do not take the capacity of the pod.
+    Placeholder pods are preempted by runner pods, so their requests are counted as free.
+    """
+
+    def __init__(self, nodes, pods):
+        self.nodes = nodes
+        self.pods = [pod for pod in pods if PLACEHOLDER_LABEL not in (pod.metadata.labels or {})]
+
+    @staticmethod
+    def get_containers_requests(containers):
+        requests = dict.fromkeys(RESOURCES, 0)
+        for container in containers or []:
+            container_requests = (container.get('resources') or {}).get('requests') or {}
+            for resource in RESOURCES:
+                if resource in container_requests:
+                    requests[resource] += parse_quantity(str(container_requests[resource]))
+
+        return requests
+
+    @classmethod
+    def get_pod_requests(cls, pod_spec):
+        """Resources requested by the pod spec. Init containers run one by one before the containers."""
+        requests = cls.get_containers_requests(pod_spec.get('containers'))
+        for init_container in pod_spec.get('initContainers') or []:
+            init_requests = cls.get_containers_requests([init_container])
+            requests = {resource: max(requests[resource], init_requests[resource]) for resource in RESOURCES}
+
+        return requests
+
+    @staticmethod
+    def to_pod_spec(pod):
+        # the same structure as the pod spec of the job template
+        return {
+            'nodeSelector': pod.spec.node_selector or {},
+            'tolerations': [
+                {'key': t.key, 'operator': t.operator, 'value': t.value, 'effect': t.effect}
+                for t in pod.spec.tolerations or []
+            ],
+            'containers': [
+                {'resources': {'requests': (c.resources.requests if c.resources else None) or {}}}
+                for c in pod.spec.containers or []
+            ],
+            'initContainers': [
+                {'resources': {'requests': (c.resources.requests if c.resources else None) or {}}}
+                for c in pod.spec.init_containers or []
+            ],
+        }
+
+    @staticmethod
+    def is_node_ready(node):
+        if node.spec is not None and node.spec.unschedulable:
+            return False
+
+        conditions = (node.status.conditions or []) if node.status is not None else []
+        return any(condition.type == 'Ready' and condition.status == 'True' for condition in conditions)
+
+    @staticmethod
+    def is_taint_tolerated(taint, tolerations):
+        for toleration in tolerations:
+            if toleration.get('effect') and toleration['effect'] != taint.effect:
+                continue
+
+            if toleration.get('operator') == 'Exists':
+                if not toleration.get('key') or toleration['key'] == taint.key:
+                    return True
+            elif toleration.get('key') == taint.key and toleration.get('value') == taint.value:
+                return True
+
+        return False
+
+    def is_node_matched(self, node, pod_spec):
+        labels = node.metadata.labels or {}
+        node_selector = pod_spec.get('nodeSelector') or {}
+        if any(labels.get(key) != str(value) for key, value in node_selector.items()):
+            return False
+
+        tolerations = pod_spec.get('tolerations') or []
+        return all(
+            self.is_taint_tolerated(taint, tolerations)
+            for taint in (node.spec.taints if node.spec is not None else None) or []
+            if taint.effect in ('NoSchedule', 'NoExecute')
+        )
+
+    def get_free_resources(self, node, node_pods):
+        allocatable = node.status.allocatable or {}
+        free = {resource: parse_quantity(allocatable.get(resource, '0')) for resource in RESOURCES}
+        free['pods'] = int(allocatable.get('pods', 0)) - len(node_pods)
+
+        for pod in node_pods:
+            requests = self.get_pod_requests(self.to_pod_spec(pod))
+            for resource in RESOURCES:
+                free[resource] -= requests[resource]
+
+        return free
+
+    @staticmethod
+    def count_node_fits(free, requests):
+        fits = [free['pods']] + [
+            math.floor(free[resource] / requests[resource]) for resource in RESOURCES if requests[resource] > 0
+        ]
+        return max(min(fits), 0)
+
+    def count_fits(self, pod_spec):
+        """Count of pods with the spec that could be scheduled to the cluster nodes now."""
+        requests = self.get_pod_requests(pod_spec)
+
+        pods_by_node = {}
+        for pod in self.pods:
+            pods_by_node.setdefault(pod.spec.node_name, []).append(pod)
+
+        nodes = [node for node in self.nodes if self.is_node_ready(node)]
+        free_by_node = {
+            node.metadata.name: self.get_free_resources(node, pods_by_node.get(node.metadata.name, []))
+            for node in nodes
+        }
+
+        # unscheduled runner pods take the free resources of the first node matching their own spec
+        for pod in pods_by_node.get(None, []):
+            if RUNNER_LABEL not in (pod.metadata.labels or {}):
+                continue
+
+            runner_pod_spec = self.to_pod_spec(pod)
+            runner_requests = self.get_pod_requests(runner_pod_spec)
+            for node in nodes:
+                free = free_by_node[node.metadata.name]
+                if self.is_node_matched(node, runner_pod_spec) and self.count_node_fits(free, runner_requests) > 0:
+                    for resource in RESOURCES:
+                        free[resource] -= runner_requests[resource]
+                    free['pods'] -= 1
+                    break
+
+        return sum(
+            self.count_node_fits(free_by_node[node.metadata.name], requests)
+            for node in nodes if self.is_node_matched(node, pod_spec)
+        )
@@ -0,0 +1,163 @@
+"""DaemonSet pulling the runner images on the nodes before runners are scheduled to them"""
+import yaml
+from kubernetes.client import ApiException
+
+from autoscaler.clients.kubernetes.base import KubernetesPythonAPIService, KubernetesSpecFileAPIService
+from autoscaler.core import constants
+from autoscaler.core.logger import logger
+from autoscaler.services.cluster_capacity import ClusterCapacity
+
+PREPULL_NAME = 'runner-image-prepull'
+PREPULL_LABEL = 'runner_image_prepull'
+
+# values rendered to the job template, only images and scheduling of the runner pod are used
+TEMPLATE_DATA = {
+    'runner_uuid': 'image-prepull',
+    'account_uuid': 'image-prepull',
+    'repository_uuid': None,
+    'runner_namespace': 'image-prepull',
+}
+
+
+def normalize_image(image):
+    """Full image reference, as nodes report their images, e.g. docker:dind is docker.io/library/docker:dind."""
+    name, _, digest = image.partition('@')
+
+    parts = name.split('/')
+    if len(parts) == 1:
+        parts = ['docker.io', 'library'] + parts
+    elif '.' not in parts[0] and ':' not in parts[0] and parts[0] != 'localhost':
+        parts = ['docker.io'] + parts
+
+    name = '/'.join(parts)
+    if digest:
+        return f"{name}@{digest}"
+
+    if ':' not in parts[-1]:
+        name = f"{name}:latest"
+
+    return name
+
+
+def get_template_pod_spec(template_filename=constants.TEMPLATE_FILE_NAME):
+    runner_spec = yaml.safe_load(
+        KubernetesSpecFileAPIService.generate_kube_spec_file(TEMPLATE_DATA, template_filename=template_filename)
+    )
+    job_spec = next(item for item in runner_spec['items'] if item['kind'] == 'Job')
+
+    return job_spec['spec']['template']['spec']
+
+
+def get_images(pod_spec):
+    """Images of the pod containers with their pull policy, in the pod spec order."""
+    images = {}
+    for container in (pod_spec.get('initContainers') or []) + (pod_spec.get('containers') or []):
+        if container.get('image') and container['image'] not in images:
+            images[container['image']] = container.get('imagePullPolicy')
+
+    return images
+
+
+def get_prepull_spec(pod_spec, pause_image=constants.RUNNER_HEADROOM_IMAGE):
+    """DaemonSet with an init container exiting at once for every image, so the node pulls all of them."""
+    labels = {PREPULL_LABEL: PREPULL_NAME}
+    requests = {'cpu': '10m', 'memory': '16Mi'}
+
+    init_containers = []
+    for i, (image, pull_policy) in enumerate(get_images(pod_spec).items()):
+        init_container = {
+            'name': f"prepull-{i}",
+            'image': image,
+            'command': ['sh', '-c', 'true'],
+            'resources': {'requests': requests},
+        }
+        if pull_policy:
+            init_container['imagePullPolicy'] = pull_policy
+
+        init_containers.append(init_container)
+
+    daemon_set_pod_spec = {
+        'initContainers': init_containers,
+        'containers': [{'name': 'pause', 'image': pause_image, 'resources': {'requests': requests}}],
+        'terminationGracePeriodSeconds': 0,
+    }
+    for key in ('nodeSelector', 'tolerations', 'affinity', 'imagePullSecrets'):
+        if pod_spec.get(key):
+            daemon_set_pod_spec[key] = pod_spec[key]
+
+    return {
+        'apiVersion': 'apps/v1',
+        'kind': 'DaemonSet',
+        'metadata': {'name': PREPULL_NAME, 'labels': labels},
+        'spec': {
+            'selector': {'matchLabels': labels},
+            'template': {'metadata': {'labels': labels}, 'spec': daemon_set_pod_spec},
+        },
+    }
+
+
+class ImagePrepull:
+    """Images of the job template pulled on the runner nodes in advance.
+
+    The DaemonSet is reconciled on every config check: it is applied again when the job template changes,
+    when the previous apply failed or when the DaemonSet was deleted, so its images always match the runner pod.
+    Nodes are matched with the runner pod nodeSelector and tolerations, as the runner pods are.
+    """
+
+    def __init__(self, namespace=constants.KUBERNETES_IMAGE_PREPULL_NAMESPACE):
+        self.namespace = namespace
+        self.kube_python_api = KubernetesPythonAPIService()
+        self._pod_spec = None
+        self._applied_spec = None
+
+    def reconcile(self, template_filename=constants.TEMPLATE_FILE_NAME):
+        self._pod_spec = get_template_pod_spec(template_filename)
+        spec = get_prepull_spec(self._pod_spec)
+
+        try:
+            if spec == self._applied_spec and self.kube_python_api.daemon_set_exists(PREPULL_NAME, self.namespace):
+                return
+
+            self.kube_python_api.apply_daemon_set(spec, self.namespace)
+        except ApiException as e:
+            logger.warning(f"Runner images pre-pull DaemonSet not updated: {e.status} {e.reason}")
+            return
+
+        self._applied_spec = spec
+        logger.info(f"Runner images pre-pull DaemonSet updated: {list(get_images(self._pod_spec))}")
+
+    def get_nodes_readiness(self):
+        """Images of the job template missing on every ready runner node, by node name."""
+        nodes = self.kube_python_api.list_nodes()
+        cluster_capacity = ClusterCapacity(nodes, [])
+        images = {image: normalize_image(image) for image in get_images(self._pod_spec)}
+
+        readiness = {}
+        for node in nodes:
+            if not cluster_capacity.is_node_ready(node) or not cluster_capacity.is_node_matched(node, self._pod_spec):
+                continue
+
+            node_images = {
+                normalize_image(name) for node_image in node.status.images or [] for name in node_image.names or []
+            }
+            readiness[node.metadata.name] = [image for image, name in images.items() if name not in node_images]
+
+        return readiness
+
+    def report(self):
+        if self._pod_spec is None:
+            return
+
+        try:
+            readiness = self.get_nodes_readiness()
+        except ApiException as e:
+            logger.warning(f"Runner images readiness not checked: {e.status} {e.reason}")
+            return
+
+        not_ready = {node: missing for node, missing in readiness.items() if missing}
+        logger.info(f"Runner images ready on nodes: {len(readiness) - len(not_ready)}/{len(readiness)}")
+        if not_ready:
+            logger.info(f"Runner images missing on nodes: {not_ready}")
+
+
+image_prepull = ImagePrepull()
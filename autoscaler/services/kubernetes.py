@@ -1,10 +1,17 @@
+import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, asdict
 
 import yaml
+from kubernetes.client import ApiException
 
 import autoscaler.core.exceptions as core_exc
 from autoscaler.clients.kubernetes.base import KubernetesPythonAPIService, KubernetesSpecFileAPIService
+from autoscaler.clients.kubernetes.informer import runners_informer
+from autoscaler.clients.kubernetes.manifest import manifest_builder
+from autoscaler.core import constants
+from autoscaler.services.cluster_capacity import ClusterCapacity
+from autoscaler.services.placeholders import get_placeholder_spec, get_priority_class_spec
 from autoscaler.core.logger import logger, GroupNamePrefixAdapter
 
 
@@ -40,6 +47,15 @@ class KubernetesServiceInterface(ABC):
     def delete_job(self, runner_uuid, namespace):
         raise NotImplementedError
 
+    def get_runners_informer(self):
+        return None
+
+    def get_schedulable_runners_count(self, data):
+        return None
+
+    def set_placeholders(self, group_key, data, replicas):
+        pass
+
 
 class KubernetesInMemoryService(KubernetesServiceInterface):
 
@@ -62,16 +78,65 @@ class KubernetesInMemoryService(KubernetesServiceInterface):
 
 
 class KubernetesService(KubernetesServiceInterface):
+    """Runner jobs in Kubernetes.
+
+    Namespaces found or created are shared by all the groups, so the next attempts do not request them again.
+    A namespace is requested again only when a runner job could not be created in it because it was not found.
+    The placeholders priority class is created once per process as well.
+    """
+    _namespaces_lock = threading.Lock()
+    _namespaces_locks = {}
+    _namespaces = set()
+    _priority_class_lock = threading.Lock()
+    _priority_class_created = False
+
     def __init__(self, group_name):
+        self.group_name = group_name
         self.logger_adapter = GroupNamePrefixAdapter(logger, {'name': group_name})
+        self.kube_python_api = KubernetesPythonAPIService()
+
+    @staticmethod
+    def get_runners_informer():
+        """Runner Jobs and Pods cached locally, None if the informer is disabled or not synced yet."""
+        if constants.KUBERNETES_INFORMER and runners_informer.synced:
+            return runners_informer
+
+        return None
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._namespaces_lock:
+            cls._namespaces.clear()
+
+        with cls._priority_class_lock:
+            cls._priority_class_created = False
+
+    @classmethod
+    def invalidate_namespace(cls, namespace):
+        with cls._namespaces_lock:
+            cls._namespaces.discard(namespace)
 
     def init(self, namespace):
-        kube_python_api = KubernetesPythonAPIService()
+        with self._namespaces_lock:
+            namespace_lock = self._namespaces_locks.setdefault(namespace, threading.Lock())
 
+        # groups sharing a namespace wait for the first one, so the namespace is not created twice
+        with namespace_lock:
+            with self._namespaces_lock:
+                if namespace in self._namespaces:
+                    self.logger_adapter.debug(f"Namespace {namespace} found in cache.")
+                    return
+
+            self.init_namespace(namespace)
+
+            with self._namespaces_lock:
+                self._namespaces.add(namespace)
+
+    def init_namespace(self, namespace):
         self.logger_adapter.info(f"Getting {namespace} namespace in Kubernetes...")
         found = True
         try:
-            kube_python_api.get_kubernetes_namespace(namespace=namespace)
+            self.kube_python_api.get_kubernetes_namespace(namespace=namespace)
         except core_exc.NamespaceNotFoundError:
             self.logger_adapter.info(f"Namespace {namespace} not found.")
             found = False
@@ -80,42 +145,94 @@ class KubernetesService(KubernetesServiceInterface):
 
         if not found:
             self.logger_adapter.info(f"Creating {namespace} namespace in Kubernetes...")
-            kube_python_api.create_kubernetes_namespace(namespace=namespace)
+            self.kube_python_api.create_kubernetes_namespace(namespace=namespace)
             self.logger_adapter.info(f"Namespace {namespace} created.")
 
-    def setup_job(self, data: KubernetesServiceData):
-        self.logger_adapter.info("Starting to setup the Kubernetes job ...")
+    def get_runner_spec(self, data: KubernetesServiceData):
+        if constants.KUBERNETES_MANIFEST_BUILDER:
+            runner_spec = manifest_builder.build(data)
+
+            self.logger_adapter.debug(runner_spec)
+        else:
+            runner_job_spec = KubernetesSpecFileAPIService.generate_kube_spec_file(data)
+
+            self.logger_adapter.debug(runner_job_spec)
 
-        runner_job_spec = KubernetesSpecFileAPIService.generate_kube_spec_file(data)
+            runner_spec = yaml.safe_load(runner_job_spec)
 
-        self.logger_adapter.debug(runner_job_spec)
+        return runner_spec
 
-        runner_spec = yaml.safe_load(runner_job_spec)
+    def get_schedulable_runners_count(self, data: KubernetesServiceData):
+        """Count of runner pods the cluster nodes could schedule now, None if nodes could not be listed."""
+        pod_spec = self.get_runner_spec(data)['items'][1]['spec']['template']['spec']
+
+        try:
+            cluster_capacity = ClusterCapacity(self.kube_python_api.list_nodes(), self.kube_python_api.list_active_pods())
+        except ApiException as e:
+            self.logger_adapter.warning(f"Cluster capacity not checked: {e.status} {e.reason}")
+            return None
+
+        return cluster_capacity.count_fits(pod_spec)
+
+    def init_priority_class(self):
+        with self._priority_class_lock:
+            if KubernetesService._priority_class_created:
+                return
+
+            self.kube_python_api.create_priority_class(get_priority_class_spec())
+            KubernetesService._priority_class_created = True
+
+    def set_placeholders(self, group_key, data: KubernetesServiceData, replicas):
+        """Keep `replicas` low-priority pods of the runner size in the group namespace, preempted by runner pods."""
+        pod_spec = self.get_runner_spec(data)['items'][1]['spec']['template']['spec']
+
+        try:
+            self.init_priority_class()
+            self.kube_python_api.apply_deployment(
+                get_placeholder_spec(group_key, pod_spec, replicas), data.runner_namespace
+            )
+        except ApiException as e:
+            self.logger_adapter.warning(f"Runner placeholders not updated: {e.status} {e.reason}")
+            return
+
+        self.logger_adapter.info(f"Runner placeholders: {replicas}")
+
+    def setup_job(self, data: KubernetesServiceData):
+        self.logger_adapter.info("Starting to setup the Kubernetes job ...")
+
+        runner_spec = self.get_runner_spec(data)
         job_secret_spec = runner_spec['items'][0]
         job_spec = runner_spec['items'][1]
 
-        kube_python_api = KubernetesPythonAPIService()
+        try:
+            self.create_job(job_secret_spec, job_spec, data.runner_namespace)
+        except core_exc.NamespaceNotFoundError:
+            # the namespace was deleted after it was cached
+            self.logger_adapter.warning(f"Namespace {data.runner_namespace} not found. Creating it again...")
+            self.invalidate_namespace(data.runner_namespace)
+            self.init(data.runner_namespace)
 
-        secret = kube_python_api.create_secret(job_secret_spec, data.runner_namespace)
+            self.create_job(job_secret_spec, job_spec, data.runner_namespace)
+
+    def create_job(self, job_secret_spec, job_spec, namespace):
+        secret = self.kube_python_api.create_secret(job_secret_spec, namespace)
         self.logger_adapter.info(f"Secret created. status={secret.metadata.name}")
 
-        job = kube_python_api.create_job(job_spec, data.runner_namespace)
+        job = self.kube_python_api.create_job(job_spec, namespace)
         self.logger_adapter.info(f"Job created. status={job.metadata.name}")
 
     def delete_job(self, runner_uuid, namespace):
         self.logger_adapter.info(f"Starting to delete job for runner {runner_uuid} from namespace {namespace}")
 
-        kube_python_api = KubernetesPythonAPIService()
-
         try:
-            kube_python_api.delete_job(runner_uuid, namespace)
+            self.kube_python_api.delete_job(runner_uuid, namespace)
         except core_exc.JobNotFoundError as e:
             self.logger_adapter.warning(f"Warning: {str(e)}")
         except core_exc.KubernetesJobError as e:
             raise e
 
         try:
-            kube_python_api.delete_secret(runner_uuid, namespace)
+            self.kube_python_api.delete_secret(runner_uuid, namespace)
         except core_exc.SecretNotFoundError as e:
             self.logger_adapter.warning(f"Warning: {str(e)}")
         except core_exc.KubernetesSecretError as e:
@@ -0,0 +1,109 @@
+"""Low-priority placeholder pods keeping nodes capacity reserved for the next runners"""
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+
+from autoscaler.core import constants
+
+PLACEHOLDER_LABEL = 'runner_placeholder'
+PRIORITY_CLASS_NAME = 'runners-autoscaler-placeholder'
+
+
+class ScaleUpHistory:
+    """Runners requested by the scale ups of every group within the last `window` seconds.
+
+    Scaler instances are created again on every attempt, so the history is kept per group key.
+    The placeholders of a group are sized for its largest recent scale up.
+    """
+
+    def __init__(self, window=constants.RUNNER_HEADROOM_WINDOW, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._lock = threading.Lock()
+        # group key -> deque of (time, runners count)
+        self._scale_ups = {}
+
+    def _expire(self, scale_ups):
+        expired_before = self._clock() - self.window
+        while scale_ups and scale_ups[0][0] <= expired_before:
+            scale_ups.popleft()
+
+    def add(self, group_key, count):
+        if count <= 0:
+            return
+
+        with self._lock:
+            scale_ups = self._scale_ups.setdefault(group_key, deque())
+            scale_ups.append((self._clock(), count))
+            self._expire(scale_ups)
+
+    def get_headroom(self, group_key):
+        with self._lock:
+            scale_ups = self._scale_ups.get(group_key)
+            if not scale_ups:
+                return 0
+
+            self._expire(scale_ups)
+            return max((count for _, count in scale_ups), default=0)
+
+    def clear(self):
+        with self._lock:
+            self._scale_ups.clear()
+
+
+def get_placeholder_name(group_key):
+    # group keys are not valid Kubernetes names, keep them readable with a hash suffix of the name and labels to stay unique
+    slug = re.sub(r'[^a-z0-9-]+', '-', group_key.lower()).strip('-')[:30].strip('-')
+    group_hash = hashlib.sha256(group_key.encode()).hexdigest()[:8]
+
+    return f"runner-placeholder-{slug}-{group_hash}" if slug else f"runner-placeholder-{group_hash}"
+
+
+def get_priority_class_spec(priority=constants.RUNNER_HEADROOM_PRIORITY):
+    return {
+        'apiVersion': 'scheduling.k8s.io/v1',
+        'kind': 'PriorityClass',
+        'metadata': {'name': PRIORITY_CLASS_NAME},
+        'value': priority,
+        'globalDefault': False,
+        'preemptionPolicy': 'Never',
+        'description': 'Placeholder pods of runners autoscaler, preempted by runner pods.',
+    }
+
+
+def get_placeholder_spec(group_key, runner_pod_spec, replicas, image=constants.RUNNER_HEADROOM_IMAGE):
+    """Deployment of pause pods requesting the same resources on the same nodes as the runner pod."""
+    name = get_placeholder_name(group_key)
+    labels = {PLACEHOLDER_LABEL: name}
+
+    pod_spec = {
+        'priorityClassName': PRIORITY_CLASS_NAME,
+        'terminationGracePeriodSeconds': 0,
+        'containers': [
+            {
+                'name': f"placeholder-{i}",
+                'image': image,
+                'resources': {'requests': dict((container.get('resources') or {}).get('requests') or {})},
+            }
+            for i, container in enumerate(runner_pod_spec.get('containers') or [])
+        ],
+    }
+    for key in ('nodeSelector', 'tolerations', 'affinity'):
+        if runner_pod_spec.get(key):
+            pod_spec[key] = runner_pod_spec[key]
+
+    return {
+        'apiVersion': 'apps/v1',
+        'kind': 'Deployment',
+        'metadata': {'name': name, 'labels': labels},
+        'spec': {
+            'replicas': replicas,
+            'selector': {'matchLabels': labels},
+            'template': {'metadata': {'labels': labels}, 'spec': pod_spec},
+        },
+    }
+
+
+scale_up_history = ScaleUpHistory()
@@ -0,0 +1,63 @@
+import threading
+import time
+
+
+class RunnersSnapshot:
+    """Bitbucket runners lists shared by runner groups.
+
+    Lists are keyed by (workspace uuid, repository uuid), so groups targeting the same
+    workspace or repository download the runners list once. Concurrent readers of the same key
+    wait for a single load. A list is reused for `ttl` seconds, not expired if `ttl` is None.
+    A key is invalidated when runners are created, disabled or deleted in it, so the next reader gets a fresh list.
+    """
+
+    def __init__(self, ttl=None, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys_locks = {}
+        # key -> (loaded time, runners)
+        self._runners = {}
+        self._generations = {}
+        self.loads_count = 0
+        self.hits_count = 0
+
+    @staticmethod
+    def get_key(workspace, repository=None):
+        return workspace.uuid, repository.uuid if repository else None
+
+    def get(self, key, load):
+        with self._lock:
+            key_lock = self._keys_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._runners:
+                    loaded_at, runners = self._runners[key]
+                    if self.ttl is None or self._clock() - loaded_at < self.ttl:
+                        self.hits_count += 1
+                        return list(runners)
+
+                    del self._runners[key]
+
+                generation = self._generations.get(key, 0)
+
+            loaded_at = self._clock()
+            runners = load()
+
+            with self._lock:
+                self.loads_count += 1
+                # keep the list only if it was not invalidated while loading
+                if self._generations.get(key, 0) == generation:
+                    self._runners[key] = loaded_at, runners
+
+        return list(runners)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._runners.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'loads': self.loads_count, 'hits': self.hits_count}
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from autoscaler.core import constants
+from autoscaler.core.exceptions import AutoscalerHTTPError
+from autoscaler.core.logger import logger
+
+
+class UUIDCache:
+    """Workspace and repository UUIDs resolved from their names with Bitbucket API.
+
+    Resolved UUIDs are kept for `ttl` seconds. Names not found (404) are kept for `negative_ttl` seconds,
+    so a misspelled name in the config does not request Bitbucket API on every config parse.
+    Other errors are not cached. Concurrent readers of the same name wait for a single request.
+
+    The cache is saved to `file_path` after every change and loaded on the first read,
+    so the resolved UUIDs survive the process restart. Empty `file_path` keeps the cache in memory only.
+    """
+
+    def __init__(self, file_path=constants.UUID_CACHE_FILE,
+                 ttl=constants.UUID_CACHE_TTL, negative_ttl=constants.UUID_CACHE_NEGATIVE_TTL, clock=time.time):
+        self.file_path = file_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # wall clock time, entries expiration time is saved to the file
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys_locks = {}
+        # key -> {'data': resolved data or None, 'error': error message, 'status_code': error status code, 'expires_at': time}
+        self._entries = None
+        self.loads_count = 0
+        self.hits_count = 0
+
+    def get(self, key, load):
+        with self._lock:
+            key_lock = self._keys_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._get_entries().get(key)
+                if entry is not None and entry['expires_at'] > self._clock():
+                    self.hits_count += 1
+                    return self.get_value(entry)
+
+            try:
+                data = load()
+            except AutoscalerHTTPError as e:
+                if e.status_code != 404:
+                    raise
+
+                entry = {'data': None, 'error': str(e), 'status_code': e.status_code,
+                         'expires_at': self._clock() + self.negative_ttl}
+            else:
+                entry = {'data': data, 'expires_at': self._clock() + self.ttl}
+
+            with self._lock:
+                self.loads_count += 1
+                self._get_entries()[key] = entry
+                self.save()
+
+        return self.get_value(entry)
+
+    @staticmethod
+    def get_value(entry):
+        if entry['data'] is None:
+            raise AutoscalerHTTPError(entry['error'], status_code=entry['status_code'])
+
+        return dict(entry['data'])
+
+    def _get_entries(self):
+        if self._entries is None:
+            self._entries = self.load_file()
+
+        return self._entries
+
+    def load_file(self):
+        if not self.file_path or not os.path.exists(self.file_path):
+            return {}
+
+        try:
+            with open(self.file_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"UUID cache file {self.file_path} not loaded: {e}")
+            return {}
+
+        now = self._clock()
+        return {key: entry for key, entry in entries.items() if entry['expires_at'] > now}
+
+    def save(self):
+        if not self.file_path:
+            return
+
+        # write a temporary file and rename it, so a process stopped while writing does not leave a broken file
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.file_path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.file_path)
+        except OSError as e:
+            logger.warning(f"UUID cache file {self.file_path} not saved: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self.save()
+
+    def stats(self):
+        with self._lock:
+            return {'loads': self.loads_count, 'hits': self.hits_count}
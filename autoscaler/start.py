@@ -1,21 +1,35 @@
+import filecmp
+import hashlib
+import json
 import os
 import shutil
-from concurrent.futures import ThreadPoolExecutor, wait
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic, sleep
 
+import yaml
 from pydantic import ValidationError
 
 import autoscaler.core.constants as constants
 import autoscaler.core.validators as validators
+from autoscaler.clients.base import session_manager
+from autoscaler.clients.bitbucket.base import BitbucketAPIService
+from autoscaler.clients.kubernetes.informer import runners_informer
 from autoscaler.core.helpers import enable_debug, fail
 from autoscaler.core.help_classes import Strategies
 from autoscaler.core.logger import logger
+from autoscaler.core.scheduler import AdaptiveInterval, GroupScheduler
+from autoscaler.core.stabilization import flap_detector
 from autoscaler.core.exceptions import AutoscalerHTTPError
 from autoscaler.services.kubernetes import KubernetesService
 from autoscaler.services.bitbucket import BitbucketService
 from autoscaler.services.bitbucket_by_project import BitbucketByProjectService
+from autoscaler.services.image_prepull import image_prepull
+from autoscaler.services.runners_snapshot import RunnersSnapshot
 from autoscaler.strategy.pct_runners_idle import PctRunnersIdleScaler
 from autoscaler.strategy.pct_runners_idle_by_project import PctRunnersIdleByProjectScaler
+from autoscaler.strategy.predictive_runners_idle import PredictiveRunnersIdleScaler
+from autoscaler.strategy.target_tracking import TargetTrackingScaler
 
 
 class StartPoller:
@@ -23,71 +37,217 @@ class StartPoller:
         self.config_file_path = config_file_path
         self.template_file_path = template_file_path
         self.poll = poll
+        # file path -> (modification time, size, content hash) at the previous read
+        self._files = {}
+        # group definition from the config file -> validated group
+        self._groups = {}
+        self._runners_data = None
+        # runners lists shared by the groups started on the same scheduler tick
+        self._runners_snapshot = RunnersSnapshot(ttl=constants.GROUP_SCHEDULER_TICK_INTERVAL)
 
     def start(self):
         enable_debug()
         # validate Authorization
         validators.validate_auth()
 
+        if constants.KUBERNETES_INFORMER:
+            self.start_informer()
+
         with ThreadPoolExecutor(max_workers=constants.MAX_GROUPS_COUNT) as executor:
+            scheduler = GroupScheduler(executor)
+            stats_logged_at = None
+
             while True:
                 autoscaler_runners, runner_constants = self.read_config()
 
-                futures = []
-                for runner_data in autoscaler_runners:
-                    if runner_data.strategy == Strategies.PCT_RUNNER_IDLE.value:
-                        kubernetes_service = KubernetesService(runner_data.name)
+                # checked on every tick, so a failed apply or a deleted DaemonSet is applied again
+                if constants.KUBERNETES_IMAGE_PREPULL:
+                    image_prepull.reconcile()
 
-                        runner_service = BitbucketService(runner_data.name)
+                # runners lists are shared by groups targeting the same workspace or repository started together
+                scheduler.schedule({
+                    (runner_data.name, frozenset(runner_data.labels)): (
+                        runner_data.name,
+                        self.get_polling_interval(runner_data, runner_constants),
+                        partial(self.process_group, runner_data, runner_constants, self._runners_snapshot)
+                    )
+                    for runner_data in autoscaler_runners
+                })
 
-                        pctRunnersIdleScaler = PctRunnersIdleScaler(runner_data, runner_constants, kubernetes_service, runner_service)
+                scheduler.run_pending()
 
-                        futures.append(executor.submit(pctRunnersIdleScaler.process))
-                    if runner_data.strategy == Strategies.PCT_RUNNER_IDLE_BY_PROJECT.value:
-                        kubernetes_service = KubernetesService(runner_data.name)
+                # Added for testing.
+                if not self.poll:
+                    scheduler.wait()
+                    self.log_stats(scheduler)
+                    break
 
-                        runner_service = BitbucketByProjectService(runner_data.name)
+                now = monotonic()
+                if stats_logged_at is None or now - stats_logged_at >= runner_constants.runner_api_polling_interval:
+                    self.log_stats(scheduler)
+                    stats_logged_at = now
 
-                        autoscaler = PctRunnersIdleByProjectScaler(runner_data, runner_constants, kubernetes_service, runner_service)
+                sleep(min(scheduler.get_wait_time(), constants.GROUP_SCHEDULER_TICK_INTERVAL))
 
-                        futures.append(executor.submit(autoscaler.process))
+    @staticmethod
+    def get_polling_interval(runner_data, runner_constants):
+        interval = runner_data.runner_api_polling_interval or runner_constants.runner_api_polling_interval
 
-                wait(futures)
-                for fut in futures:
-                    fut.result()
+        if runner_constants.adaptive_polling:
+            return AdaptiveInterval(min_interval=runner_constants.runner_api_polling_interval_min, max_interval=interval)
 
-                logger.info(
-                    f"Autoscaler next attempt in {runner_constants.runner_api_polling_interval} seconds...\n")
+        return interval
 
-                sleep(runner_constants.runner_api_polling_interval)
+    @staticmethod
+    def process_group(runner_data, runner_constants, runners_snapshot):
+        # returns the group activity for the adaptive polling interval
+        if runner_data.strategy == Strategies.PCT_RUNNER_IDLE.value:
+            kubernetes_service = KubernetesService(runner_data.name)
 
-                # Added for testing.
-                if not self.poll:
-                    break
+            runner_service = BitbucketService(runner_data.name, runners_snapshot)
 
-    def read_config(self):
-        logger.info(f"Config file provided {self.config_file_path}.")
+            pctRunnersIdleScaler = PctRunnersIdleScaler(runner_data, runner_constants, kubernetes_service, runner_service)
 
-        # read runners parameter from the config file
-        validators.validate_config(self.config_file_path, self.template_file_path)
+            return pctRunnersIdleScaler.process()
+        if runner_data.strategy == Strategies.PCT_RUNNER_IDLE_BY_PROJECT.value:
+            kubernetes_service = KubernetesService(runner_data.name)
+
+            runner_service = BitbucketByProjectService(runner_data.name, runners_snapshot)
 
+            autoscaler = PctRunnersIdleByProjectScaler(runner_data, runner_constants, kubernetes_service, runner_service)
+
+            return autoscaler.process()
+        if runner_data.strategy == Strategies.PREDICTIVE_RUNNERS_IDLE.value:
+            kubernetes_service = KubernetesService(runner_data.name)
+
+            runner_service = BitbucketService(runner_data.name, runners_snapshot)
+
+            autoscaler = PredictiveRunnersIdleScaler(runner_data, runner_constants, kubernetes_service, runner_service)
+
+            return autoscaler.process()
+        if runner_data.strategy == Strategies.TARGET_TRACKING.value:
+            kubernetes_service = KubernetesService(runner_data.name)
+
+            runner_service = BitbucketService(runner_data.name, runners_snapshot)
+
+            autoscaler = TargetTrackingScaler(runner_data, runner_constants, kubernetes_service, runner_service)
+
+            return autoscaler.process()
+
+    def log_stats(self, scheduler):
+        logger.info(f"Groups schedule stats: {scheduler.stats()}")
+        logger.info(f"Runners snapshot stats: {self._runners_snapshot.stats()}")
+        logger.info(f"HTTP connections stats: {session_manager.stats()}")
+        logger.info(f"UUID cache stats: {BitbucketService.uuid_cache.stats()}")
+        logger.info(f"Bitbucket API rate limit budget: {BitbucketAPIService.rate_limiter.budget()}")
+        if flap_detector.stats():
+            logger.info(f"Scale downs suppressed by flap detection: {flap_detector.stats()}")
+        if constants.KUBERNETES_INFORMER:
+            logger.info(f"Kubernetes informer stats: {runners_informer.stats()}")
+        if constants.KUBERNETES_IMAGE_PREPULL:
+            image_prepull.report()
+
+    @staticmethod
+    def start_informer():
+        runners_informer.start()
+
+        if runners_informer.wait_for_sync(constants.KUBERNETES_INFORMER_SYNC_TIMEOUT):
+            logger.info(f"Kubernetes informer synced: {runners_informer.stats()}")
+        else:
+            logger.warning("Kubernetes informer not synced yet. Runner objects are not available until it is synced.")
+
+    def copy_template(self):
         destination_path = os.path.join(constants.DEST_TEMPLATE_FILE_PATH, constants.TEMPLATE_FILE_NAME)
+
+        # keep the copy untouched while the mounted template is not changed, so the compiled template is reused
+        if os.path.exists(destination_path) and filecmp.cmp(self.template_file_path, destination_path, shallow=False):
+            logger.debug(f'File {self.template_file_path} not changed')
+            return
+
         shutil.copy(self.template_file_path, destination_path)
         logger.info(f'File {self.template_file_path} copied to {destination_path}')
 
+    def file_changed(self, file_path):
+        """Checks whether the file content changed since the previous check.
+
+        The file is read and hashed only when its modification time or size changes.
+        """
+        stat = os.stat(file_path)
+        file_key = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._files.get(file_path)
+        if cached is not None and cached[:2] == file_key:
+            return False
+
+        with open(file_path, 'rb') as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+
+        self._files[file_path] = (*file_key, content_hash)
+
+        return cached is None or cached[2] != content_hash
+
+    def parse_config(self):
+        """Parses the config file, validating only the groups changed since the previous parse.
+
+        Group validation resolves workspace and repository UUIDs with Bitbucket API,
+        so the groups not changed are reused as is.
+        """
+        with open(self.config_file_path) as f:
+            config = yaml.safe_load(f)
+
+        groups = config.get('groups') if isinstance(config, dict) else None
+        if not isinstance(groups, list):
+            return validators.RunnerData.parse_obj(config)
+
+        definitions = [json.dumps(group, sort_keys=True, default=str) for group in groups]
+        reused_count = len([definition for definition in definitions if definition in self._groups])
+
+        validators.prefetch_groups_uuids(
+            [group for definition, group in zip(definitions, groups) if definition not in self._groups]
+        )
+
+        runners_data = validators.RunnerData.parse_obj({
+            **config,
+            'groups': [self._groups.get(definition, group) for definition, group in zip(definitions, groups)]
+        })
+
+        self._groups = dict(zip(definitions, runners_data.groups))
+        logger.info(f"Autoscaler groups validated: {len(groups) - reused_count}, reused: {reused_count}")
+
+        return runners_data
+
+    def read_config(self):
+        # read runners parameter from the config file
+        validators.validate_config(self.config_file_path, self.template_file_path)
+
+        config_changed = self.file_changed(self.config_file_path)
+        template_changed = self.file_changed(self.template_file_path)
+
+        if self._runners_data is not None and not config_changed and not template_changed:
+            logger.debug(f"Config file {self.config_file_path} and template {self.template_file_path} not changed.")
+            return self._runners_data.groups, self._runners_data.constants
+
+        logger.info(f"Config file provided {self.config_file_path}.")
+
+        if template_changed:
+            self.copy_template()
+
         try:
-            runners_data = validators.RunnerData.parse_file(self.config_file_path)
-            validators.validate_kubernetes_manifest(constants.TEMPLATE_FILE_NAME)
+            if config_changed or self._runners_data is None:
+                self._runners_data = self.parse_config()
+
+            if template_changed:
+                validators.validate_kubernetes_manifest(constants.TEMPLATE_FILE_NAME)
         except ValidationError as e:
             fail(e)
         except AutoscalerHTTPError as e:
             fail(f'Unauthorized. Check your bitbucket credentials. {e}')
         else:
-            logger.info(f"Autoscaler config: {runners_data}")
+            logger.info(f"Autoscaler config: {self._runners_data}")
 
-            logger.info(f"Autoscaler runners: {runners_data.groups}")
+            logger.info(f"Autoscaler runners: {self._runners_data.groups}")
 
-            return runners_data.groups, runners_data.constants
+            return self._runners_data.groups, self._runners_data.constants
 
 
 def main():
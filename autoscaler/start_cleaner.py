@@ -1,10 +1,13 @@
 from concurrent.futures import ThreadPoolExecutor, wait
 from time import sleep
 
+import yaml
 from pydantic import ValidationError
 
 import autoscaler.core.constants as constants
 import autoscaler.core.validators as validators
+from autoscaler.clients.base import session_manager
+from autoscaler.clients.bitbucket.base import BitbucketAPIService
 from autoscaler.cleaner.pct_runner_idle_cleaner import Cleaner
 from autoscaler.core.exceptions import AutoscalerHTTPError
 from autoscaler.core.help_classes import Strategies
@@ -31,7 +34,11 @@ class StartCleaner:
 
                 futures = []
                 for runner_data in autoscaler_runners:
-                    if runner_data.strategy == Strategies.PCT_RUNNER_IDLE.value:
+                    if runner_data.strategy in (
+                        Strategies.PCT_RUNNER_IDLE.value,
+                        Strategies.PREDICTIVE_RUNNERS_IDLE.value,
+                        Strategies.TARGET_TRACKING.value,
+                    ):
                         kubernetes_service = KubernetesService(runner_data.name)
 
                         runner_service = BitbucketService(runner_data.name)
@@ -44,6 +51,10 @@ class StartCleaner:
                 for fut in futures:
                     fut.result()
 
+                logger.info(f"HTTP connections stats: {session_manager.stats()}")
+                logger.info(f"UUID cache stats: {BitbucketService.uuid_cache.stats()}")
+                logger.info(f"Bitbucket API rate limit budget: {BitbucketAPIService.rate_limiter.budget()}")
+
                 logger.info(
                     f"Cleaner next attempt in {runner_constants.runner_api_polling_interval} seconds...\n")
 
@@ -60,7 +71,13 @@ class StartCleaner:
         validators.validate_config(self.config_file_path)
 
         try:
-            runners_data = validators.RunnerCleanerData.parse_file(self.config_file_path)
+            with open(self.config_file_path) as f:
+                config = yaml.safe_load(f)
+
+            if isinstance(config, dict) and isinstance(config.get('groups'), list):
+                validators.prefetch_groups_uuids(config['groups'])
+
+            runners_data = validators.RunnerCleanerData.parse_obj(config)
         except ValidationError as e:
             fail(e)
         except AutoscalerHTTPError as e:
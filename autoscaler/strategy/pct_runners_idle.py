@@ -1,18 +1,27 @@
 import math
+import threading
+from abc import abstractmethod
 from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from dateutil import parser as du_parser
-from time import sleep
 from typing import Set
 
-from autoscaler.core.exceptions import KubernetesNamespaceError, CannotCreateNamespaceError
+from autoscaler.core.constants import (
+    KUBERNETES_CAPACITY_GATE, RUNNER_DISABLE_RETRIES, RUNNER_HEADROOM, RUNNER_HEADROOM_MAX, RUNNER_PROVISIONING_PERIOD
+)
+from autoscaler.core.exceptions import AutoscalerHTTPError, KubernetesNamespaceError, CannotCreateNamespaceError
 from autoscaler.core.help_classes import BitbucketRunnerStatuses
-from autoscaler.core.helpers import success, fail
+from autoscaler.core.helpers import get_group_key, success, fail
 from autoscaler.core.interfaces import Strategy
 from autoscaler.core.logger import logger, GroupNamePrefixAdapter
+from autoscaler.core.pipeline import Pipeline, Stage, start_rate_limiter
+from autoscaler.core.runner_ledger import RunnerLedger
+from autoscaler.core.scheduler import PollingActivity
+from autoscaler.core.stabilization import SCALE_UP, flap_detector, scaling_decisions
 from autoscaler.core.validators import Constants, NameUUIDData, PctRunnersIdleParameters, KubernetesJobResources
 from autoscaler.services.kubernetes import KubernetesService, KubernetesServiceData
+from autoscaler.services.placeholders import scale_up_history
 from autoscaler.services.bitbucket import BitbucketService, BitbucketServiceData
 
 
@@ -33,32 +42,53 @@ class PctRunnersIdleData:
     resources: KubernetesJobResources
 
 
-class PctRunnersIdleScaler(Strategy):
-    def __init__(self, runner_data: PctRunnersIdleData, runner_constants: Constants, kubernetes_service=None, runner_service=None):
+class RunnersScaler(Strategy):
+    """Runners provisioning and disabling shared by the scaling strategies.
+
+    Runners are created and disabled in `self.repository` (None for workspace runners) and counted against
+    the Bitbucket runners limit with `self.runner_ledger`. Strategies scaling several repositories of a group
+    select them one by one, the runners of one repository are created and disabled before the next one is selected.
+    """
+
+    def __init__(self, runner_data, runner_constants: Constants, kubernetes_service, runner_service):
         self.runner_data = runner_data
         self.runner_constants = runner_constants
         self.kubernetes_service = kubernetes_service if kubernetes_service else KubernetesService(runner_data.name)
-        self.runner_service = runner_service if runner_service else BitbucketService(runner_data.name)
+        self.runner_service = runner_service
         self.logger_adapter = GroupNamePrefixAdapter(logger, {'name': runner_data.name})
-
-    @staticmethod
-    def convert_bitbucket_data_to_k8s_data(bitbucket_data: BitbucketServiceData, namespace: str, resources: KubernetesJobResources) -> KubernetesServiceData:
-        """
-        Bitbucket workspace, repository and runners uuids have curly brackets i.e {some-uuid} format.
-        Kubernetes labels does not allow to use curly brackets for values so this method reformat
-        bitbucket data to kubernetes data without curly brackets and also add data for namespace.
-        """
+        # scaling history of the group is kept between the attempts by the group key, group names are not unique
+        self.group_key = get_group_key(runner_data.name, runner_data.labels)
+        self.repository = None
+        self.runner_ledger = None
+        self.runners_limit_lock = threading.Lock()
+        self.registering_runners_count = 0
+        self.polling_activity = PollingActivity(scale_up_threshold=self.get_scale_up_threshold())
+
+    def get_scale_up_threshold(self):
+        # busy runners ratio the group is scaled up above
+        return float(self.runner_data.parameters.scale_up_threshold)
+
+    @abstractmethod
+    def get_kubernetes_data(self, bitbucket_data) -> KubernetesServiceData:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_runners_location(self) -> str | None:
+        raise NotImplementedError
+
+    def get_template_kubernetes_data(self, runner_uuid):
+        # runner data used only to render the pod spec with the group resources and nodeSelector
         return KubernetesServiceData(
-            account_uuid=bitbucket_data.account_uuid.strip('{}'),
-            repository_uuid=bitbucket_data.repository_uuid.strip('{}') if bitbucket_data.repository_uuid else None,
-            runner_uuid=bitbucket_data.runner_uuid.strip('{}'),
-            oauth_client_id_base64=bitbucket_data.oauth_client_id_base64,
-            oauth_client_secret_base64=bitbucket_data.oauth_client_secret_base64,
-            runner_namespace=namespace,
-            requests_memory=resources.requests.memory,
-            requests_cpu=resources.requests.cpu,
-            limits_memory=resources.limits.memory,
-            limits_cpu=resources.limits.cpu
+            account_uuid=self.runner_data.workspace.uuid.strip('{}'),
+            repository_uuid=self.repository.uuid.strip('{}') if self.repository else None,
+            runner_uuid=runner_uuid,
+            oauth_client_id_base64='',
+            oauth_client_secret_base64='',
+            runner_namespace=self.runner_data.namespace,
+            requests_memory=self.runner_data.resources.requests.memory,
+            requests_cpu=self.runner_data.resources.requests.cpu,
+            limits_memory=self.runner_data.resources.limits.memory,
+            limits_cpu=self.runner_data.resources.limits.cpu
         )
 
     def validate(self):
@@ -76,60 +106,166 @@ class PctRunnersIdleScaler(Strategy):
         self.validate()
 
         self.run()
+        self.update_headroom()
 
-    def get_runners(self):
-        # TODO optimize GET requests with filters by labels
-        return self.runner_service.get_bitbucket_runners(self.runner_data.workspace, self.runner_data.repository)
+        return self.polling_activity
 
-    def create_runner(self, count_number):
-        runners = self.get_runners()
+    def register_runner(self, count_number):
+        # check runners count before add new runner, including runners being registered at the moment
+        with self.runners_limit_lock:
+            runners = self.runner_ledger.get_runners()
 
-        if runners:
-            runners_stats = dict(Counter([r['state'].get('status') for r in runners]))
-            self.logger_adapter.debug(runners_stats)
+            if runners:
+                self.logger_adapter.debug(self.runner_ledger.stats())
 
-        # check runners count before add new runner
-        if len(runners) >= MAX_RUNNERS_COUNT:
-            msg = f"Max Runners count limit reached {len(runners)} per workspace {self.runner_data.workspace.name}"
-            if self.runner_data.repository:
-                msg = f"{msg} repository: {self.runner_data.repository.name}"
+            runners_count = len(runners) + self.registering_runners_count
+            if runners_count >= MAX_RUNNERS_COUNT:
+                msg = f"Max Runners count limit reached {runners_count} per workspace {self.runner_data.workspace.name}"
+                if self.repository:
+                    msg = f"{msg} repository: {self.repository.name}"
 
-            self.logger_adapter.warning(msg)
-            self.logger_adapter.warning(
-                "No new runners will be created! Check your runners. Check you runner's config file.")
+                self.logger_adapter.warning(msg)
+                self.logger_adapter.warning(
+                    "No new runners will be created! Check your runners. Check you runner's config file.")
 
-            return
+                return None
+
+            self.registering_runners_count += 1
 
         self.logger_adapter.info(f"Runner #{count_number + 1} for namespace: {self.runner_data.namespace} setup...")
 
-        bitbucket_data = self.runner_service.create_bitbucket_runner(
-            workspace=self.runner_data.workspace,
-            name=self.runner_data.name,
-            labels=self.runner_data.labels,
-            repository=self.runner_data.repository
+        try:
+            bitbucket_data = self.runner_service.create_bitbucket_runner(
+                workspace=self.runner_data.workspace,
+                name=self.runner_data.name,
+                labels=self.runner_data.labels,
+                repository=self.repository
+            )
+
+            self.runner_ledger.add_runner(bitbucket_data.runner_uuid, self.runner_data.labels)
+        finally:
+            with self.runners_limit_lock:
+                self.registering_runners_count -= 1
+
+        return bitbucket_data
+
+    def setup_runner_job(self, bitbucket_data):
+        self.kubernetes_service.setup_job(self.get_kubernetes_data(bitbucket_data))
+
+        success(
+            f"[{self.runner_data.name}] Successfully setup runner UUID {bitbucket_data.runner_uuid} "
+            f"on workspace {self.runner_data.workspace.name}\n",
+            do_exit=False
         )
 
-        kubernetes_data = self.convert_bitbucket_data_to_k8s_data(
-            bitbucket_data,
-            self.runner_data.namespace,
-            self.runner_data.resources
+    def limit_to_cluster_capacity(self, count_runners_to_create):
+        """Runners to create capped by the runner pods the cluster nodes could schedule now."""
+        if not KUBERNETES_CAPACITY_GATE or count_runners_to_create <= 0:
+            return count_runners_to_create
+
+        schedulable_count = self.kubernetes_service.get_schedulable_runners_count(
+            self.get_template_kubernetes_data('cluster-capacity-check')
         )
 
-        self.kubernetes_service.setup_job(kubernetes_data)
+        if schedulable_count is None or schedulable_count >= count_runners_to_create:
+            return count_runners_to_create
+
+        self.logger_adapter.warning(
+            f"Cluster capacity is enough for {schedulable_count} of {count_runners_to_create} new runners. "
+            f"Runners blocked by cluster capacity: {count_runners_to_create - schedulable_count}"
+        )
+
+        return schedulable_count
+
+    def update_headroom(self):
+        """Keep placeholder pods for the largest recent scale up of the group, so the next runners start on ready nodes."""
+        if not RUNNER_HEADROOM:
+            return
+
+        headroom = min(scale_up_history.get_headroom(self.group_key), RUNNER_HEADROOM_MAX, self.runner_data.parameters.max)
+
+        self.kubernetes_service.set_placeholders(self.group_key, self.get_template_kubernetes_data('placeholder'), headroom)
+
+    def record_desired_runners_count(self, desired_runners_count):
+        # desired runners counts are kept for the scale down stabilization window of the next attempts
+        scaling_decisions.record(
+            self.group_key, desired_runners_count, self.runner_constants.scale_down_stabilization_window
+        )
+
+    def get_stabilized_runners_count(self, desired_runners_count):
+        # max desired runners count within the scale down stabilization window, the group is not scaled down below it
+        stabilized_runners_count = scaling_decisions.get_stabilized(
+            self.group_key, self.runner_constants.scale_down_stabilization_window
+        )
+        if stabilized_runners_count is None:
+            return desired_runners_count
+
+        return max(desired_runners_count, stabilized_runners_count)
+
+    def log_scale_down_stabilized(self, desired_runners_count, stabilized_runners_count):
+        self.logger_adapter.info(
+            f"Scale down to {desired_runners_count} runners limited to {stabilized_runners_count} runners, "
+            f"the max desired runners count "
+            f"within the last {self.runner_constants.scale_down_stabilization_window} seconds."
+        )
+
+    def create_runners(self, count_runners_to_create):
+        scale_up_history.add(self.group_key, count_runners_to_create)
+        if count_runners_to_create > 0:
+            flap_detector.add(self.group_key, SCALE_UP, self.runner_constants.flap_detection_window)
+        self.polling_activity.observe(0, in_flight=count_runners_to_create > 0)
+        count_runners_to_create = self.limit_to_cluster_capacity(count_runners_to_create)
+
+        concurrency = self.runner_constants.runner_setup_concurrency
+        pipeline = Pipeline([
+            Stage(
+                'bitbucket',
+                self.register_runner,
+                concurrency=concurrency,
+                rate_limiter=start_rate_limiter(self.runner_constants.default_sleep_time_runner_setup, concurrency)
+            ),
+            Stage('kubernetes', self.setup_runner_job, concurrency=concurrency),
+        ])
+
+        results = pipeline.run(range(count_runners_to_create))
+
+        for result in results:
+            if not result.ok:
+                self.logger_adapter.error(
+                    f"Runner #{result.item + 1} setup failed on {result.stage} stage: {result.error}")
+
+        self.logger_adapter.info(f"Runners provisioning summary: {Pipeline.summary(results)}")
+        self.logger_adapter.debug(f"Runners provisioning stages: {pipeline.metrics}")
+
+    def disable_runner(self, runner_uuid):
+        try:
+            self.runner_service.disable_bitbucket_runner(
+                workspace=self.runner_data.workspace,
+                runner_uuid=runner_uuid,
+                repository=self.repository
+            )
+        except AutoscalerHTTPError as e:
+            # deleted by the cleaner or by the previous attempt, the runner does not take jobs anymore
+            if e.status_code != 404:
+                raise
+
+            self.logger_adapter.warning(f"Runner UUID {runner_uuid} not found on Bitbucket, already deleted.")
+
+        self.runner_ledger.disable_runner(runner_uuid)
 
         success(
-            f"[{self.runner_data.name}] Successfully setup runner UUID {bitbucket_data.runner_uuid} "
+            f"[{self.runner_data.name}] Successfully disabled runner UUID {runner_uuid} "
             f"on workspace {self.runner_data.workspace.name}\n",
             do_exit=False
         )
 
-        sleep(self.runner_constants.default_sleep_time_runner_setup)
+        return runner_uuid
 
     def disable_runners(self, runners_idle):
         # disable only idle runners
         if len(runners_idle) < 1:
             self.logger_adapter.warning("Nothing to disable... All runners are BUSY (running jobs).")
-            return
+            return {}
 
         # disable only old runners
         runners_uuid_to_disable = [
@@ -137,6 +273,17 @@ class PctRunnersIdleScaler(Strategy):
                 seconds=self.runner_constants.runner_cool_down_period) < datetime.now(timezone.utc)
         ]
 
+        if runners_uuid_to_disable and flap_detector.suppress_scale_down(
+            self.group_key, self.runner_constants.flap_detection_window, self.runner_constants.flap_max_reversals
+        ):
+            self.logger_adapter.warning(
+                f"Scale down suppressed. Scaling actions are flapping between scale up and scale down "
+                f"more than {self.runner_constants.flap_max_reversals} times "
+                f"within {self.runner_constants.flap_detection_window} seconds. "
+                f"Scale downs suppressed: {flap_detector.get_suppressed_count(self.group_key)}"
+            )
+            return {}
+
         if runners_uuid_to_disable:
             self.logger_adapter.warning(
                 f"Runners count {len(runners_uuid_to_disable)} with the next UUID will be disabled:"
@@ -149,27 +296,69 @@ class PctRunnersIdleScaler(Strategy):
                 f"{self.runner_constants.runner_cool_down_period} sec ago."
             )
 
-        for runner_uuid in runners_uuid_to_disable:
-            self.runner_service.disable_bitbucket_runner(
-                workspace=self.runner_data.workspace,
-                runner_uuid=runner_uuid,
-                repository=self.runner_data.repository
-            )
+        concurrency = self.runner_constants.runner_delete_concurrency
+        pipeline = Pipeline([
+            Stage(
+                'bitbucket',
+                self.disable_runner,
+                concurrency=concurrency,
+                retries=RUNNER_DISABLE_RETRIES,
+                rate_limiter=start_rate_limiter(self.runner_constants.default_sleep_time_runner_delete, concurrency)
+            ),
+        ])
 
-            success(
-                f"[{self.runner_data.name}] Successfully disabled runner UUID {runner_uuid} "
-                f"on workspace {self.runner_data.workspace.name}\n",
-                do_exit=False
-            )
+        self.polling_activity.observe(0, in_flight=bool(runners_uuid_to_disable))
+        results = pipeline.run(runners_uuid_to_disable)
 
-            sleep(self.runner_constants.default_sleep_time_runner_delete)
+        summary = {r.item: 'disabled' if r.ok else f'failed: {r.error}' for r in results}
+        for result in results:
+            if not result.ok:
+                self.logger_adapter.error(
+                    f"Runner UUID {result.item} disabling failed after {result.attempts['bitbucket']} attempts: "
+                    f"{result.error}"
+                )
 
-    def run(self):
-        runners = self.get_runners()
+        self.logger_adapter.info(f"Runners disabling summary: {summary}")
+
+        return summary
+
+    def get_pending_runners(self, runners):
+        """Runners created recently but not ONLINE yet, e.g. their pods are Pending or pulling images.
+
+        With the Kubernetes informer enabled, runners whose pods already failed are not counted.
+        """
+        provisioning_since = datetime.now(timezone.utc) - timedelta(seconds=RUNNER_PROVISIONING_PERIOD)
+        pending_runners = [
+            r for r in runners if
+            set(r['labels']) == self.runner_data.labels
+            and r['state']['status'] in (BitbucketRunnerStatuses.UNREGISTERED.name, BitbucketRunnerStatuses.OFFLINE.name)
+            and du_parser.isoparse(r['created_on']) > provisioning_since
+        ]
+
+        runners_informer = self.kubernetes_service.get_runners_informer()
+        if runners_informer is None:
+            return pending_runners
 
+        # runner pods are labeled with runner UUID without curly brackets
+        pending_runners = [
+            r for r in pending_runners
+            if runners_informer.get_pod_phase(r['uuid'].strip('{}')) not in ('Failed', 'Succeeded')
+        ]
+
+        pending_reasons = Counter(
+            reason for r in pending_runners for reason in runners_informer.get_pending_reasons(r['uuid'].strip('{}'))
+        )
+        if pending_reasons:
+            self.logger_adapter.info(f"PENDING runners reasons: {dict(pending_reasons)}")
+
+        return pending_runners
+
+    def get_group_runners(self, runners):
+        """ONLINE, IDLE, BUSY and PENDING runners with the group labels."""
         msg = f"Found {len(runners)} runners on workspace {self.runner_data.workspace.name}"
-        if self.runner_data.repository:
-            msg = f"{msg} repository: {self.runner_data.repository.name}"
+        runners_location = self.get_runners_location()
+        if runners_location:
+            msg = f"{msg} {runners_location}"
 
         self.logger_adapter.info(msg)
 
@@ -193,52 +382,109 @@ class PctRunnersIdleScaler(Strategy):
         self.logger_adapter.info(f"Found IDLE runners with labels {self.runner_data.labels}: {len(runners_idle)}")
         self.logger_adapter.debug(runners_idle)
 
-        runners_scale_threshold = len(runners_busy) / len(online_runners) if online_runners else 0
+        pending_runners = self.get_pending_runners(runners)
+
+        self.logger_adapter.info(f"Found PENDING runners with labels {self.runner_data.labels}: {len(pending_runners)}")
+        self.logger_adapter.debug(pending_runners)
+
+        return online_runners, runners_idle, runners_busy, pending_runners
+
+
+class PctRunnersIdleScaler(RunnersScaler):
+    def __init__(self, runner_data: PctRunnersIdleData, runner_constants: Constants, kubernetes_service=None, runner_service=None):
+        super().__init__(
+            runner_data, runner_constants, kubernetes_service,
+            runner_service if runner_service else BitbucketService(runner_data.name)
+        )
+        self.repository = runner_data.repository
+        self.runner_ledger = RunnerLedger(self.get_runners)
+
+    @staticmethod
+    def convert_bitbucket_data_to_k8s_data(bitbucket_data: BitbucketServiceData, namespace: str, resources: KubernetesJobResources) -> KubernetesServiceData:
+        """
+        Bitbucket workspace, repository and runners uuids have curly brackets i.e {some-uuid} format.
+        Kubernetes labels does not allow to use curly brackets for values so this method reformat
+        bitbucket data to kubernetes data without curly brackets and also add data for namespace.
+        """
+        return KubernetesServiceData(
+            account_uuid=bitbucket_data.account_uuid.strip('{}'),
+            repository_uuid=bitbucket_data.repository_uuid.strip('{}') if bitbucket_data.repository_uuid else None,
+            runner_uuid=bitbucket_data.runner_uuid.strip('{}'),
+            oauth_client_id_base64=bitbucket_data.oauth_client_id_base64,
+            oauth_client_secret_base64=bitbucket_data.oauth_client_secret_base64,
+            runner_namespace=namespace,
+            requests_memory=resources.requests.memory,
+            requests_cpu=resources.requests.cpu,
+            limits_memory=resources.limits.memory,
+            limits_cpu=resources.limits.cpu
+        )
+
+    def get_kubernetes_data(self, bitbucket_data):
+        return self.convert_bitbucket_data_to_k8s_data(bitbucket_data, self.runner_data.namespace, self.runner_data.resources)
+
+    def get_runners_location(self):
+        return f"repository: {self.repository.name}" if self.repository else None
+
+    def get_runners(self):
+        # TODO optimize GET requests with filters by labels
+        return self.runner_service.get_bitbucket_runners(self.runner_data.workspace, self.runner_data.repository)
+
+    def run(self):
+        runners = self.get_runners()
+        self.runner_ledger.seed(runners)
+
+        online_runners, runners_idle, runners_busy, pending_runners = self.get_group_runners(runners)
+
+        # runners being provisioned are counted as idle capacity, so the same load does not scale up again
+        runners_capacity = len(online_runners) + len(pending_runners)
+
+        runners_scale_threshold = len(runners_busy) / runners_capacity if runners_capacity else 0
+        self.polling_activity.observe(runners_scale_threshold, in_flight=bool(pending_runners))
         self.logger_adapter.info(f'Current runners threshold: {round(runners_scale_threshold, 2)}')
 
         msg_autoscaler = (
             f"Runners Autoscaler. "
             f"min: {self.runner_data.parameters.min}, "
             f"max: {self.runner_data.parameters.max}, "
-            f"current: {len(online_runners)}"
+            f"current: {len(online_runners)}, "
+            f"pending: {len(pending_runners)}"
         )
 
-        if not online_runners and self.runner_data.parameters.min > 0:
+        if not runners_capacity and self.runner_data.parameters.min > 0:
             # create new runners from 0
             count_runners_to_create = self.runner_data.parameters.min
+            self.record_desired_runners_count(count_runners_to_create)
 
             msg_autoscaler = (
                 f"{msg_autoscaler}, "
                 f"desired: {count_runners_to_create}. "
                 f"Changing the desired capacity "
-                f"from {len(online_runners)} to {count_runners_to_create}.\n"
+                f"from {runners_capacity} to {count_runners_to_create}.\n"
             )
             self.logger_adapter.info(msg_autoscaler)
 
-            for i in range(count_runners_to_create):
-                # Do not try to create new runners when total number of runners
-                # reached max allowed by API. Still show the message warning
-                # when total number of runners is equal the MAX_RUNNERS_COUNT.
-                if len(runners) + i > MAX_RUNNERS_COUNT:
-                    break
-
-                self.create_runner(i)
+            # Do not try to create new runners when total number of runners
+            # reached max allowed by API. Still show the message warning
+            # when total number of runners is equal the MAX_RUNNERS_COUNT.
+            self.create_runners(min(count_runners_to_create, MAX_RUNNERS_COUNT - len(runners) + 1))
 
         # TODO add max_runners per repo or max_runners per workspace
-        elif (runners_scale_threshold > float(self.runner_data.parameters.scale_up_threshold) or len(online_runners) < self.runner_data.parameters.min) \
-                and len(online_runners) <= self.runner_data.parameters.max \
+        elif (runners_scale_threshold > float(self.runner_data.parameters.scale_up_threshold) or runners_capacity < self.runner_data.parameters.min) \
+                and runners_capacity <= self.runner_data.parameters.max \
                 and len(runners) <= MAX_RUNNERS_COUNT:
 
             # TODO validate scaleDownFactor > 1
             desired_runners_count = math.ceil(
-                len(online_runners) * self.runner_data.parameters.scale_up_multiplier
+                runners_capacity * self.runner_data.parameters.scale_up_multiplier
             )
             if desired_runners_count <= self.runner_data.parameters.max:
-                count_runners_to_create = desired_runners_count - len(online_runners)
+                count_runners_to_create = desired_runners_count - runners_capacity
             else:
-                count_runners_to_create = self.runner_data.parameters.max - len(online_runners)
+                count_runners_to_create = self.runner_data.parameters.max - runners_capacity
                 desired_runners_count = self.runner_data.parameters.max
 
+            self.record_desired_runners_count(desired_runners_count)
+
             if count_runners_to_create == 0:
                 self.logger_adapter.info(f"Max runners count: {self.runner_data.parameters.max} reached.")
                 return
@@ -247,18 +493,14 @@ class PctRunnersIdleScaler(Strategy):
                 f"{msg_autoscaler}, "
                 f"desired: {desired_runners_count}. "
                 f"Changing the desired capacity "
-                f"from {len(online_runners)} to {desired_runners_count}.\n"
+                f"from {runners_capacity} to {desired_runners_count}.\n"
             )
             self.logger_adapter.info(msg_autoscaler)
 
-            for i in range(count_runners_to_create):
-                # Do not try to create new runners when total number of runners
-                # reached max allowed by API. Still show the message warning
-                # when total number of runners is equal the MAX_RUNNERS_COUNT.
-                if len(runners) + i > MAX_RUNNERS_COUNT:
-                    break
-
-                self.create_runner(i)
+            # Do not try to create new runners when total number of runners
+            # reached max allowed by API. Still show the message warning
+            # when total number of runners is equal the MAX_RUNNERS_COUNT.
+            self.create_runners(min(count_runners_to_create, MAX_RUNNERS_COUNT - len(runners) + 1))
 
         elif runners_scale_threshold < float(self.runner_data.parameters.scale_down_threshold) and \
                 len(runners_idle) > self.runner_data.parameters.min:
@@ -274,6 +516,20 @@ class PctRunnersIdleScaler(Strategy):
                 count_runners_to_disable = len(runners_idle) - self.runner_data.parameters.min
                 desired_runners_count = self.runner_data.parameters.min
 
+            # do not scale down below the desired runners count of the recent attempts
+            scale_down_runners_count = runners_capacity - count_runners_to_disable
+            self.record_desired_runners_count(scale_down_runners_count)
+            stabilized_runners_count = self.get_stabilized_runners_count(scale_down_runners_count)
+            if stabilized_runners_count > scale_down_runners_count:
+                self.log_scale_down_stabilized(scale_down_runners_count, stabilized_runners_count)
+                count_runners_to_disable = max(runners_capacity - stabilized_runners_count, 0)
+                desired_runners_count = len(runners_idle) - count_runners_to_disable
+
+            if count_runners_to_disable == 0:
+                self.logger_adapter.info(msg_autoscaler)
+                self.logger_adapter.warning("Nothing to do...\n")
+                return
+
             runners_idle_to_disable = runners_idle[:count_runners_to_disable]
 
             msg_autoscaler = (
@@ -288,6 +544,8 @@ class PctRunnersIdleScaler(Strategy):
             self.disable_runners(runners_idle_to_disable)
 
         else:
+            self.record_desired_runners_count(runners_capacity)
+
             # show message to user that ok
             self.logger_adapter.info(msg_autoscaler)
             self.logger_adapter.warning("Nothing to do...\n")
@@ -0,0 +1,115 @@
+import math
+from dataclasses import dataclass
+
+from autoscaler.core.history import runners_history
+from autoscaler.strategy.pct_runners_idle import MAX_RUNNERS_COUNT, PctRunnersIdleScaler
+
+
+@dataclass
+class Forecast:
+    busy_now: int
+    ewma: float
+    # busy runners at the same time of the previous day, None without samples
+    seasonal: float | None
+    # busy runners expected within the forecast horizon
+    busy: float
+
+
+class PredictiveRunnersIdleScaler(PctRunnersIdleScaler):
+    """Scales the runners to the busy runners count forecast `forecast_horizon` seconds ahead.
+
+    Busy and idle runners counts of every attempt are kept in the runners history. The forecast is the moving
+    average of the busy runners count over the last `forecast_horizon` seconds blended with the busy runners count
+    at the same time of the previous day, and never less than the busy runners count now. The desired runners count keeps
+    the forecast busy runners ratio at `scale_up_threshold`, so runners are created ahead of a burst seen
+    the previous day. Idle runners are disabled only while the busy runners ratio is below `scale_down_threshold`.
+    """
+
+    def get_history_key(self):
+        # labels are unique for every group, names are not
+        return ','.join(sorted(self.runner_data.labels))
+
+    def get_forecast(self, busy_now):
+        parameters = self.runner_data.parameters
+        key = self.get_history_key()
+
+        ewma = runners_history.get_ewma(key, parameters.ewma_alpha, window=parameters.forecast_horizon)
+        seasonal = runners_history.get_seasonal(key, parameters.forecast_horizon, parameters.seasonality_window)
+
+        busy = ewma
+        if seasonal is not None:
+            busy = (1 - parameters.seasonality_weight) * ewma + parameters.seasonality_weight * seasonal
+
+        return Forecast(busy_now=busy_now, ewma=ewma, seasonal=seasonal, busy=max(busy, busy_now))
+
+    def get_desired_runners_count(self, forecast):
+        parameters = self.runner_data.parameters
+        desired_runners_count = math.ceil(round(forecast.busy / float(parameters.scale_up_threshold), 6))
+
+        return min(max(desired_runners_count, parameters.min), parameters.max)
+
+    def run(self):
+        runners = self.get_runners()
+        self.runner_ledger.seed(runners)
+
+        online_runners, runners_idle, runners_busy, pending_runners = self.get_group_runners(runners)
+
+        # runners being provisioned are counted as idle capacity, so the same load does not scale up again
+        runners_capacity = len(online_runners) + len(pending_runners)
+
+        runners_scale_threshold = len(runners_busy) / runners_capacity if runners_capacity else 0
+        self.polling_activity.observe(runners_scale_threshold, in_flight=bool(pending_runners))
+        self.logger_adapter.info(f'Current runners threshold: {round(runners_scale_threshold, 2)}')
+
+        runners_history.add(self.get_history_key(), len(runners_busy), len(runners_idle))
+
+        forecast = self.get_forecast(len(runners_busy))
+        desired_runners_count = self.get_desired_runners_count(forecast)
+
+        seasonal = round(forecast.seasonal, 2) if forecast.seasonal is not None else None
+        msg_autoscaler = (
+            f"Predictive Runners Autoscaler. "
+            f"min: {self.runner_data.parameters.min}, "
+            f"max: {self.runner_data.parameters.max}, "
+            f"current: {len(online_runners)}, "
+            f"pending: {len(pending_runners)}, "
+            f"busy: {forecast.busy_now}, "
+            f"forecast: {round(forecast.busy, 2)} busy in {self.runner_data.parameters.forecast_horizon} seconds "
+            f"(ewma: {round(forecast.ewma, 2)}, seasonal: {seasonal}), "
+            f"desired: {desired_runners_count}."
+        )
+
+        if desired_runners_count > runners_capacity and len(runners) <= MAX_RUNNERS_COUNT:
+            self.record_desired_runners_count(desired_runners_count)
+
+            count_runners_to_create = desired_runners_count - runners_capacity
+
+            self.logger_adapter.info(f"{msg_autoscaler} Action: create {count_runners_to_create} runners.\n")
+
+            # Do not try to create new runners when total number of runners
+            # reached max allowed by API. Still show the message warning
+            # when total number of runners is equal the MAX_RUNNERS_COUNT.
+            self.create_runners(min(count_runners_to_create, MAX_RUNNERS_COUNT - len(runners) + 1))
+
+        elif desired_runners_count < runners_capacity and runners_idle and \
+                runners_scale_threshold < float(self.runner_data.parameters.scale_down_threshold):
+            self.record_desired_runners_count(desired_runners_count)
+
+            # do not scale down below the desired runners count of the recent attempts
+            stabilized_runners_count = self.get_stabilized_runners_count(desired_runners_count)
+            if stabilized_runners_count > desired_runners_count:
+                self.log_scale_down_stabilized(desired_runners_count, stabilized_runners_count)
+
+            count_runners_to_disable = min(len(runners_idle), runners_capacity - stabilized_runners_count)
+            if count_runners_to_disable <= 0:
+                self.logger_adapter.info(f"{msg_autoscaler} Action: nothing to do.\n")
+                return
+
+            self.logger_adapter.info(f"{msg_autoscaler} Action: disable {count_runners_to_disable} runners.\n")
+
+            self.disable_runners(runners_idle[:count_runners_to_disable])
+
+        else:
+            self.record_desired_runners_count(desired_runners_count)
+
+            self.logger_adapter.info(f"{msg_autoscaler} Action: nothing to do.\n")
@@ -0,0 +1,93 @@
+import math
+
+from autoscaler.strategy.pct_runners_idle import MAX_RUNNERS_COUNT, PctRunnersIdleScaler
+
+
+class TargetTrackingScaler(PctRunnersIdleScaler):
+    """Scales the runners to keep the busy runners ratio at `target_utilization` in one step.
+
+    As the Kubernetes Horizontal Pod Autoscaler, the desired runners count is the busy runners count divided by
+    `target_utilization`, within min and max. The busy runners ratio within `tolerance` of the target is not scaled.
+    Runners created and disabled on one attempt are limited by `max_surge` and `max_unavailable`,
+    the rest are created or disabled on the next attempts. Only idle runners are disabled.
+    """
+
+    def get_scale_up_threshold(self):
+        return float(self.runner_data.parameters.target_utilization)
+
+    def get_desired_runners_count(self, runners_busy_count, runners_capacity):
+        parameters = self.runner_data.parameters
+
+        utilization = runners_busy_count / runners_capacity if runners_capacity else 0
+        if runners_capacity and abs(utilization / parameters.target_utilization - 1) <= parameters.tolerance:
+            desired_runners_count = runners_capacity
+        else:
+            desired_runners_count = math.ceil(round(runners_busy_count / parameters.target_utilization, 6))
+
+        return min(max(desired_runners_count, parameters.min), parameters.max)
+
+    def run(self):
+        runners = self.get_runners()
+        self.runner_ledger.seed(runners)
+
+        online_runners, runners_idle, runners_busy, pending_runners = self.get_group_runners(runners)
+
+        # runners being provisioned are counted as idle capacity, so the same load does not scale up again
+        runners_capacity = len(online_runners) + len(pending_runners)
+
+        runners_scale_threshold = len(runners_busy) / runners_capacity if runners_capacity else 0
+        self.polling_activity.observe(runners_scale_threshold, in_flight=bool(pending_runners))
+        self.logger_adapter.info(f'Current runners threshold: {round(runners_scale_threshold, 2)}')
+
+        parameters = self.runner_data.parameters
+        desired_runners_count = self.get_desired_runners_count(len(runners_busy), runners_capacity)
+
+        msg_autoscaler = (
+            f"Target Tracking Runners Autoscaler. "
+            f"min: {parameters.min}, "
+            f"max: {parameters.max}, "
+            f"current: {len(online_runners)}, "
+            f"pending: {len(pending_runners)}, "
+            f"busy: {len(runners_busy)}, "
+            f"target: {parameters.target_utilization}, "
+            f"desired: {desired_runners_count}."
+        )
+
+        if desired_runners_count > runners_capacity and len(runners) <= MAX_RUNNERS_COUNT:
+            self.record_desired_runners_count(desired_runners_count)
+
+            count_runners_to_create = desired_runners_count - runners_capacity
+            if parameters.max_surge is not None:
+                count_runners_to_create = min(count_runners_to_create, parameters.max_surge)
+
+            self.logger_adapter.info(f"{msg_autoscaler} Action: create {count_runners_to_create} runners.\n")
+
+            # Do not try to create new runners when total number of runners
+            # reached max allowed by API. Still show the message warning
+            # when total number of runners is equal the MAX_RUNNERS_COUNT.
+            self.create_runners(min(count_runners_to_create, MAX_RUNNERS_COUNT - len(runners) + 1))
+
+        elif desired_runners_count < runners_capacity and runners_idle:
+            self.record_desired_runners_count(desired_runners_count)
+
+            # do not scale down below the desired runners count of the recent attempts
+            stabilized_runners_count = self.get_stabilized_runners_count(desired_runners_count)
+            if stabilized_runners_count > desired_runners_count:
+                self.log_scale_down_stabilized(desired_runners_count, stabilized_runners_count)
+
+            count_runners_to_disable = min(max(runners_capacity - stabilized_runners_count, 0), len(runners_idle))
+            if parameters.max_unavailable is not None:
+                count_runners_to_disable = min(count_runners_to_disable, parameters.max_unavailable)
+
+            if count_runners_to_disable == 0:
+                self.logger_adapter.info(f"{msg_autoscaler} Action: nothing to do.\n")
+                return
+
+            self.logger_adapter.info(f"{msg_autoscaler} Action: disable {count_runners_to_disable} runners.\n")
+
+            self.disable_runners(runners_idle[:count_runners_to_disable])
+
+        else:
+            self.record_desired_runners_count(desired_runners_count)
+
+            self.logger_adapter.info(f"{msg_autoscaler} Action: nothing to do.\n")
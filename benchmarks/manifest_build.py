@@ -0,0 +1,48 @@
+"""Micro-benchmark of runner manifest building.
+
+Compares the rendered YAML text parsed for every runner with the manifest built from
+the parsed template skeleton (KUBERNETES_MANIFEST_BUILDER=true).
+
+Usage: python -m benchmarks.manifest_build [runners count]
+"""
+import shutil
+import sys
+import tempfile
+import timeit
+from unittest import mock
+
+import yaml
+
+from autoscaler.clients.kubernetes.base import KubernetesSpecFileAPIService
+from autoscaler.clients.kubernetes.manifest import KubernetesManifestBuilder
+from benchmarks.template_render import RUNNER_DATA, write_job_template
+
+
+def build_from_text():
+    return yaml.safe_load(KubernetesSpecFileAPIService.generate_kube_spec_file(RUNNER_DATA))
+
+
+def main(runners_count):
+    template_dir = tempfile.mkdtemp()
+    try:
+        write_job_template(template_dir)
+
+        with mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', template_dir):
+            builder = KubernetesManifestBuilder()
+            assert builder.build(RUNNER_DATA) == build_from_text()
+
+            results = {
+                'text and YAML parse': timeit.timeit(build_from_text, number=runners_count),
+                'skeleton': timeit.timeit(lambda: builder.build(RUNNER_DATA), number=runners_count),
+            }
+
+            assert builder.stats()['fallback'] == 0
+    finally:
+        shutil.rmtree(template_dir)
+
+    for name, seconds in results.items():
+        print(f'{name:>20}: {runners_count / seconds:10.0f} manifests/s ({seconds * 1000 / runners_count:.3f} ms per runner)')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,79 @@
+"""Micro-benchmark of runner job spec rendering.
+
+Compares rendering with a template compiled for every runner (previous behaviour)
+with rendering from the compiled templates cache.
+
+Usage: python -m benchmarks.template_render [runners count]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from unittest import mock
+
+import yaml
+from jinja2 import Environment, FileSystemLoader
+
+from autoscaler.clients.kubernetes.base import KubernetesSpecFileAPIService
+from autoscaler.core.constants import TEMPLATE_FILE_NAME
+
+CONFIG_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'runners-autoscaler-cm-job.template.yaml')
+
+RUNNER_DATA = {
+    'account_uuid': 'account-uuid',
+    'repository_uuid': 'repository-uuid',
+    'runner_uuid': 'runner-uuid',
+    'oauth_client_id_base64': 'b2F1dGgtY2xpZW50LWlk',
+    'oauth_client_secret_base64': 'b2F1dGgtY2xpZW50LXNlY3JldA==',
+    'runner_namespace': 'runner-namespace',
+    'requests_memory': '4Gi',
+    'requests_cpu': '1000m',
+    'limits_memory': '4Gi',
+    'limits_cpu': '1000m',
+}
+
+
+def write_job_template(template_dir):
+    """Write the job template shipped in the ConfigMap to `template_dir`."""
+    with open(CONFIG_MAP_PATH) as f:
+        template = yaml.safe_load(f)['data'][TEMPLATE_FILE_NAME]
+
+    with open(os.path.join(template_dir, TEMPLATE_FILE_NAME), 'w') as f:
+        f.write(template)
+
+
+def render_compiled_per_runner(template_dir):
+    template_env = Environment(
+        loader=FileSystemLoader(template_dir),
+        variable_start_string="<%",
+        variable_end_string="%>"
+    )
+    return template_env.get_template(TEMPLATE_FILE_NAME).render(RUNNER_DATA)
+
+
+def render_cached():
+    return KubernetesSpecFileAPIService.generate_kube_spec_file(RUNNER_DATA)
+
+
+def main(runners_count):
+    template_dir = tempfile.mkdtemp()
+    try:
+        write_job_template(template_dir)
+
+        with mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', template_dir):
+            assert render_compiled_per_runner(template_dir) == render_cached()
+
+            results = {
+                'compiled per runner': timeit.timeit(lambda: render_compiled_per_runner(template_dir), number=runners_count),
+                'cached': timeit.timeit(render_cached, number=runners_count),
+            }
+    finally:
+        shutil.rmtree(template_dir)
+
+    for name, seconds in results.items():
+        print(f'{name:>20}: {runners_count / seconds:10.0f} renders/s ({seconds * 1000 / runners_count:.3f} ms per runner)')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 from unittest import TestCase, mock
 
 import pytest
@@ -6,13 +8,18 @@ import requests_mock
 import requests_oauthlib
 
 from autoscaler.clients.bitbucket.base import (
-    Auth, BitbucketAPIService, BitbucketRepository, BitbucketRepositoryRunner,
+    Auth, OAuthTokenCache, BitbucketAPIService, BitbucketRepository, BitbucketRepositoryRunner,
     BitbucketWorkspace, BitbucketWorkspaceRunner, ITEMS_PER_PAGE)
-from autoscaler.core.exceptions import NotAuthorized
+from autoscaler.clients.rate_limiter import RateLimiter
+from autoscaler.core.exceptions import AutoscalerHTTPError, NotAuthorized
+from tests.helpers import FakeClock, register_rate_limited_uri
 
 
 class BitbucketAPIServiceTestCase(TestCase):
 
+    def setUp(self):
+        Auth.token_cache.clear()
+
     @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
     def test_init_bitbucket_service_basic_auth(self):
         api = BitbucketAPIService()
@@ -40,6 +47,180 @@ class BitbucketAPIServiceTestCase(TestCase):
             BitbucketAPIService()
 
 
+@mock.patch.dict(os.environ, {'BITBUCKET_OAUTH_CLIENT_ID': 'test', 'BITBUCKET_OAUTH_CLIENT_SECRET': 'test'})
+class OAuthTokenCacheTestCase(TestCase):
+
+    def setUp(self):
+        Auth.token_cache.clear()
+
+    @mock.patch.object(requests_oauthlib.oauth2_session.OAuth2Session, 'fetch_token')
+    def test_token_shared_across_services(self, mock_fetch_token):
+        mock_fetch_token.return_value = {'access_token': 'token1', 'expires_in': 7200}
+
+        self.assertEqual(BitbucketWorkspaceRunner().auth.token, 'token1')
+        self.assertEqual(BitbucketRepositoryRunner().auth.token, 'token1')
+        mock_fetch_token.assert_called_once()
+
+    @mock.patch('time.monotonic')
+    @mock.patch.object(requests_oauthlib.oauth2_session.OAuth2Session, 'fetch_token')
+    def test_token_refreshed_ahead_of_expiry(self, mock_fetch_token, mock_monotonic):
+        mock_fetch_token.side_effect = [
+            {'access_token': 'token1', 'expires_in': 3600},
+            {'access_token': 'token2', 'expires_in': 3600},
+        ]
+        auth = Auth.token_oauth()
+
+        mock_monotonic.return_value = 0
+        self.assertEqual(auth.token, 'token1')
+        mock_monotonic.return_value = 3600 - OAuthTokenCache.REFRESH_MARGIN - 1
+        self.assertEqual(auth.token, 'token1')
+        mock_monotonic.return_value = 3600 - OAuthTokenCache.REFRESH_MARGIN
+        self.assertEqual(auth.token, 'token2')
+
+    @mock.patch.object(requests_oauthlib.oauth2_session.OAuth2Session, 'fetch_token')
+    def test_token_single_flight(self, mock_fetch_token):
+        def slow_fetch_token(*args, **kwargs):
+            time.sleep(0.1)
+            return {'access_token': 'token1', 'expires_in': 7200}
+
+        mock_fetch_token.side_effect = slow_fetch_token
+        tokens = []
+
+        threads = [threading.Thread(target=lambda: tokens.append(Auth.token_oauth().token)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(tokens, ['token1'] * 5)
+        mock_fetch_token.assert_called_once()
+
+    @requests_mock.Mocker()
+    @mock.patch.object(requests_oauthlib.oauth2_session.OAuth2Session, 'fetch_token')
+    def test_token_refetched_on_unauthorized(self, requests, mock_fetch_token):
+        mock_fetch_token.side_effect = [
+            {'access_token': 'expired', 'expires_in': 7200},
+            {'access_token': 'fresh', 'expires_in': 7200},
+        ]
+        requests.register_uri('GET', f'{BitbucketWorkspace.BASE_URL}/foo', [
+            {'status_code': 401, 'text': 'Unauthorized'},
+            {'status_code': 200, 'json': {'slug': 'foo'}},
+        ])
+
+        result = BitbucketWorkspace().get_workspace('foo')
+
+        self.assertEqual(result, {'slug': 'foo'})
+        self.assertEqual(mock_fetch_token.call_count, 2)
+        self.assertEqual(requests.request_history[1].headers['Authorization'], 'Bearer fresh')
+
+    @requests_mock.Mocker()
+    @mock.patch.object(requests_oauthlib.oauth2_session.OAuth2Session, 'fetch_token')
+    def test_token_refetched_on_unauthorized_rate_limited(self, requests, mock_fetch_token):
+        mock_fetch_token.side_effect = [
+            {'access_token': 'expired', 'expires_in': 7200},
+            {'access_token': 'fresh', 'expires_in': 7200},
+            {'access_token': 'fresher', 'expires_in': 7200},
+        ]
+        requests.register_uri('GET', f'{BitbucketWorkspace.BASE_URL}/foo', [
+            {'status_code': 401, 'text': 'Unauthorized'},
+            {'status_code': 429, 'text': 'Rate limit for this resource has been exceeded'},
+            {'status_code': 401, 'text': 'Unauthorized'},
+        ])
+        rate_limiter = mock.Mock(backoff=mock.Mock(return_value=0))
+
+        with mock.patch.object(BitbucketAPIService, 'rate_limiter', rate_limiter):
+            with pytest.raises(AutoscalerHTTPError) as e:
+                BitbucketWorkspace().get_workspace('foo')
+
+        # the request with the new token takes the rate limit budget and backs off on 429,
+        # and is not resent with a new token again
+        self.assertEqual(e.value.status_code, 401)
+        self.assertEqual(rate_limiter.acquire.call_count, 3)
+        rate_limiter.backoff.assert_called_once()
+        self.assertEqual(
+            [r.headers['Authorization'] for r in requests.request_history],
+            ['Bearer expired', 'Bearer fresh', 'Bearer fresh']
+        )
+
+
+@mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
+class BitbucketAPIServicePaginationTestCase(TestCase):
+
+    def test_get_page_url(self):
+        self.assertEqual(
+            BitbucketAPIService.get_page_url('https://fake_url/?q=project.uuid%3D%22foo%22&pagelen=10', 3),
+            'https://fake_url/?q=project.uuid%3D%22foo%22&pagelen=10&page=3'
+        )
+
+    @requests_mock.Mocker()
+    def test_get_paginated_values_concurrently(self, requests):
+        url = f'{BitbucketWorkspaceRunner.BASE_URL}/foo/pipelines-config/runners'
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2',
+            json={'values': [1, 2], 'size': 5, 'pagelen': 2, 'page': 1, 'next': f'{url}?pagelen=2&page=2'},
+            complete_qs=True
+        )
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2&page=2',
+            json={'values': [3, 4], 'size': 5, 'pagelen': 2, 'page': 2, 'next': f'{url}?pagelen=2&page=3'},
+            complete_qs=True
+        )
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2&page=3',
+            json={'values': [5], 'size': 5, 'pagelen': 2, 'page': 3},
+            complete_qs=True
+        )
+
+        service = BitbucketWorkspaceRunner(max_concurrent_pages=4)
+        result = service.get_paginated_values(f'{url}?pagelen=2')
+
+        self.assertEqual(result, [1, 2, 3, 4, 5])
+        self.assertEqual(requests.call_count, 3)
+
+    @requests_mock.Mocker()
+    def test_get_paginated_values_new_page_appeared(self, requests):
+        url = f'{BitbucketWorkspaceRunner.BASE_URL}/foo/pipelines-config/runners'
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2',
+            json={'values': [1, 2], 'size': 3, 'pagelen': 2, 'page': 1, 'next': f'{url}?pagelen=2&page=2'},
+            complete_qs=True
+        )
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2&page=2',
+            json={'values': [3, 4], 'size': 5, 'pagelen': 2, 'page': 2, 'next': f'{url}?pagelen=2&page=3'},
+            complete_qs=True
+        )
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2&page=3',
+            json={'values': [5], 'size': 5, 'pagelen': 2, 'page': 3},
+            complete_qs=True
+        )
+
+        service = BitbucketWorkspaceRunner(max_concurrent_pages=4)
+        result = service.get_paginated_values(f'{url}?pagelen=2')
+
+        self.assertEqual(result, [1, 2, 3, 4, 5])
+
+    @requests_mock.Mocker()
+    def test_get_paginated_values_without_size(self, requests):
+        url = f'{BitbucketWorkspaceRunner.BASE_URL}/foo/pipelines-config/runners'
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2',
+            json={'values': [1, 2], 'next': f'{url}?pagelen=2&page=2'},
+            complete_qs=True
+        )
+        requests.register_uri(
+            'GET', f'{url}?pagelen=2&page=2',
+            json={'values': [3]},
+            complete_qs=True
+        )
+
+        service = BitbucketWorkspaceRunner(max_concurrent_pages=4)
+        result = service.get_paginated_values(f'{url}?pagelen=2')
+
+        self.assertEqual(result, [1, 2, 3])
+
+
 class AuthTestCase(TestCase):
 
     @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': ''})
@@ -137,6 +318,24 @@ class BitbucketWorkspaceRunnerTestCase(TestCase):
             ['foo', 'bar', 'baz', 'foo2', 'bar2', 'baz2']
         )
 
+    @requests_mock.Mocker()
+    @mock.patch('random.uniform', return_value=0)
+    def test_get_runners_rate_limited(self, requests, mock_uniform):
+        url = f'{BitbucketWorkspaceRunner.BASE_URL}/foo/pipelines-config/runners'
+        register_rate_limited_uri(
+            requests, 'GET', f'{url}?pagelen={ITEMS_PER_PAGE}', limited=1, retry_after=30,
+            json={'values': ['foo', 'bar', 'baz']}
+        )
+        clock = FakeClock()
+
+        with mock.patch.object(BitbucketWorkspaceRunner, 'rate_limiter',
+                               RateLimiter(rate=1, burst=5, clock=clock, sleep=clock.sleep)):
+            service = BitbucketWorkspaceRunner()
+            result = service.get_runners('foo')
+
+        self.assertEqual(result, ['foo', 'bar', 'baz'])
+        self.assertEqual(clock.sleeps, [30])
+
     @mock.patch.object(BitbucketWorkspaceRunner, 'make_http_request')
     def test_create_runner(self, create_runner_request):
         create_runner_request.return_value = (
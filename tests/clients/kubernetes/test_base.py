@@ -1,3 +1,8 @@
+import os
+import tempfile
+import threading
+import time
+from jinja2 import Environment
 from kubernetes.client import ApiException
 from unittest import TestCase, mock
 
@@ -23,14 +28,127 @@ class KubernetesSpecFileAPIServiceTestCase(TestCase):
         assert output == get_file('job-default.yaml')
 
 
+class KubernetesSpecFileAPIServiceCacheTestCase(TestCase):
+
+    def setUp(self):
+        KubernetesSpecFileAPIService.clear_cache()
+        self.template_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.template_dir.cleanup)
+        patcher = mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', self.template_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(KubernetesSpecFileAPIService.clear_cache)
+
+    def write_template(self, content, mtime_ns=None):
+        path = os.path.join(self.template_dir.name, 'job.yaml.template')
+        with open(path, 'w') as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    @mock.patch('jinja2.Environment.from_string', autospec=True, side_effect=Environment.from_string)
+    def test_template_compiled_once(self, mock_compile):
+        self.write_template('uuid: <% runner_uuid %>')
+
+        outputs = [KubernetesSpecFileAPIService.generate_kube_spec_file({'runner_uuid': i}) for i in range(3)]
+
+        self.assertEqual(outputs, ['uuid: 0', 'uuid: 1', 'uuid: 2'])
+        mock_compile.assert_called_once()
+
+    def test_template_changed(self):
+        self.write_template('uuid: <% runner_uuid %>', mtime_ns=1)
+        KubernetesSpecFileAPIService.generate_kube_spec_file({'runner_uuid': 'foo'})
+
+        self.write_template('runner: <% runner_uuid %>', mtime_ns=2)
+
+        self.assertEqual(KubernetesSpecFileAPIService.generate_kube_spec_file({'runner_uuid': 'foo'}), 'runner: foo')
+
+    @mock.patch('jinja2.Environment.from_string', autospec=True, side_effect=Environment.from_string)
+    def test_template_touched_not_compiled(self, mock_compile):
+        self.write_template('uuid: <% runner_uuid %>', mtime_ns=1)
+        KubernetesSpecFileAPIService.generate_kube_spec_file({'runner_uuid': 'foo'})
+
+        # same content written again, e.g. ConfigMap remounted
+        self.write_template('uuid: <% runner_uuid %>', mtime_ns=2)
+        output = KubernetesSpecFileAPIService.generate_kube_spec_file({'runner_uuid': 'foo'})
+
+        self.assertEqual(output, 'uuid: foo')
+        mock_compile.assert_called_once()
+
+    def test_template_not_read_when_not_changed(self):
+        self.write_template('uuid: <% runner_uuid %>')
+        KubernetesSpecFileAPIService.generate_kube_spec_file({'runner_uuid': 'foo'})
+
+        with mock.patch('builtins.open') as mock_open:
+            KubernetesSpecFileAPIService.generate_kube_spec_file({'runner_uuid': 'foo'})
+
+        mock_open.assert_not_called()
+
+
 class KubernetesPythonAPIServiceTestCase(TestCase):
 
+    def setUp(self):
+        KubernetesPythonAPIService.reset()
+
+    def tearDown(self):
+        KubernetesPythonAPIService.reset()
+
     @mock.patch('kubernetes.config.load_incluster_config')
     def test_load_config(self, mock_config):
         KubernetesPythonAPIService()
 
+        mock_config.assert_not_called()
+
+        KubernetesPythonAPIService().get_api_client()
+
         mock_config.assert_called_once()
 
+    @mock.patch('kubernetes.config.load_incluster_config')
+    @mock.patch('kubernetes.client.CoreV1Api.read_namespace')
+    @mock.patch('kubernetes.client.BatchV1Api.create_namespaced_job')
+    def test_api_client_shared(self, mock_create, mock_get, mock_config):
+        first_api = KubernetesPythonAPIService()
+        second_api = KubernetesPythonAPIService()
+
+        first_api.get_kubernetes_namespace('foo')
+        second_api.create_job('foo', 'bar')
+        second_api.create_job('foo', 'bar')
+
+        mock_config.assert_called_once()
+        self.assertIs(first_api.get_api_client(), second_api.get_api_client())
+        self.assertIs(first_api.core_v1_api().api_client, second_api.batch_v1_api().api_client)
+
+    @mock.patch('kubernetes.config.load_incluster_config')
+    @mock.patch('autoscaler.core.constants.KUBERNETES_POOL_MAXSIZE', 7)
+    def test_api_client_pool_maxsize(self, mock_config):
+        api_client = KubernetesPythonAPIService().get_api_client()
+
+        self.assertEqual(api_client.configuration.connection_pool_maxsize, 7)
+        self.assertEqual(api_client.rest_client.pool_manager.connection_pool_kw['maxsize'], 7)
+
+    @mock.patch('kubernetes.config.load_incluster_config')
+    def test_api_client_loaded_once_concurrently(self, mock_config):
+        mock_config.side_effect = lambda: time.sleep(0.05)
+
+        threads = [threading.Thread(target=KubernetesPythonAPIService().get_api_client) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_config.assert_called_once()
+
+    @mock.patch('kubernetes.config.load_incluster_config')
+    @mock.patch('kubernetes.client.CoreV1Api.read_namespace')
+    def test_rate_limited(self, mock_get, mock_config):
+        api = KubernetesPythonAPIService()
+
+        with mock.patch.object(KubernetesPythonAPIService, 'rate_limiter') as mock_rate_limiter:
+            api.get_kubernetes_namespace('foo')
+            api.get_kubernetes_namespace('foo')
+
+        self.assertEqual(mock_rate_limiter.acquire.call_count, 2)
+
     @mock.patch('kubernetes.config.load_incluster_config')
     @mock.patch('kubernetes.client.CoreV1Api.create_namespaced_secret')
     def test_create_secret(self, mock_create, mock_config):
@@ -40,6 +158,15 @@ class KubernetesPythonAPIServiceTestCase(TestCase):
 
         mock_create.assert_called_once_with(body='foo', namespace='bar')
 
+    @mock.patch('kubernetes.config.load_incluster_config')
+    @mock.patch('kubernetes.client.CoreV1Api.create_namespaced_secret')
+    def test_create_secret_namespace_not_found(self, mock_create, mock_config):
+        mock_create.side_effect = ApiException(status=404)
+        api = KubernetesPythonAPIService()
+
+        with self.assertRaises(core_exc.NamespaceNotFoundError):
+            api.create_secret('foo', 'bar')
+
     @mock.patch('kubernetes.config.load_incluster_config')
     @mock.patch('kubernetes.client.BatchV1Api.create_namespaced_job')
     def test_create_job(self, mock_create, mock_config):
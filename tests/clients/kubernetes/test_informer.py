@@ -0,0 +1,150 @@
+from datetime import datetime, timezone
+from unittest import TestCase, mock
+
+from kubernetes import client as k8s_client
+from kubernetes.client import ApiException
+
+from autoscaler.clients.kubernetes.informer import Informer, RunnersInformer
+
+
+def get_pod(name, runner_uuid, phase='Running', resource_version='1', created_at=None, conditions=None,
+            container_statuses=None, node_name=None):
+    return k8s_client.V1Pod(
+        metadata=k8s_client.V1ObjectMeta(
+            name=name,
+            namespace='runners',
+            resource_version=resource_version,
+            creation_timestamp=created_at,
+            labels={'runner_uuid': runner_uuid, 'account_uuid': 'account', 'runner_namespace': 'runners'},
+        ),
+        spec=k8s_client.V1PodSpec(containers=[], node_name=node_name),
+        status=k8s_client.V1PodStatus(phase=phase, conditions=conditions, container_statuses=container_statuses),
+    )
+
+
+def get_pod_list(pods, resource_version='10'):
+    return k8s_client.V1PodList(items=pods, metadata=k8s_client.V1ListMeta(resource_version=resource_version))
+
+
+class FakeWatch:
+    """Streams the given events and records the watch arguments."""
+
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    def __call__(self):
+        return self
+
+    def stream(self, func, **kwargs):
+        self.calls.append(kwargs)
+        for event in self.events.pop(0):
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+    def stop(self):
+        pass
+
+
+class InformerTestCase(TestCase):
+
+    def test_list(self):
+        list_func = mock.Mock(return_value=get_pod_list([get_pod('runner-1', 'uuid-1'), get_pod('runner-2', 'uuid-2')]))
+        informer = Informer('pods', lambda: list_func)
+
+        informer.list()
+
+        list_func.assert_called_once_with(label_selector='runner_uuid')
+        self.assertTrue(informer.synced)
+        self.assertEqual(informer.resource_version, '10')
+        self.assertEqual(informer.count(), 2)
+        self.assertEqual([p.metadata.name for p in informer.get_by_label('runner_uuid', 'uuid-1')], ['runner-1'])
+        self.assertEqual(len(informer.get_by_label('runner_namespace', 'runners')), 2)
+
+    def test_watch(self):
+        list_func = mock.Mock(return_value=get_pod_list([get_pod('runner-1', 'uuid-1')]))
+        fake_watch = FakeWatch([[
+            {'type': 'ADDED', 'object': get_pod('runner-2', 'uuid-2', phase='Pending', resource_version='11')},
+            {'type': 'MODIFIED', 'object': get_pod('runner-2', 'uuid-2', resource_version='12')},
+            {'type': 'DELETED', 'object': get_pod('runner-1', 'uuid-1', resource_version='13')},
+            {'type': 'BOOKMARK', 'object': {}, 'raw_object': {'metadata': {'resourceVersion': '14'}}},
+        ]])
+        informer = Informer('pods', lambda: list_func, watch_timeout=60, watch_factory=fake_watch)
+
+        informer.list()
+        informer.watch()
+
+        self.assertEqual(fake_watch.calls[0]['resource_version'], '10')
+        self.assertEqual(fake_watch.calls[0]['timeout_seconds'], 60)
+        self.assertEqual(informer.resource_version, '14')
+        self.assertEqual(informer.get_by_label('runner_uuid', 'uuid-1'), [])
+        self.assertEqual([p.status.phase for p in informer.get_by_label('runner_uuid', 'uuid-2')], ['Running'])
+        self.assertEqual(informer.events_count, 4)
+
+    def test_run_watch_expired(self):
+        list_func = mock.Mock(side_effect=[
+            get_pod_list([get_pod('runner-1', 'uuid-1')]),
+            get_pod_list([get_pod('runner-2', 'uuid-2')], resource_version='20'),
+        ])
+        fake_watch = FakeWatch([[ApiException(status=410)], []])
+        informer = Informer('pods', lambda: list_func, watch_factory=fake_watch)
+
+        def stream(func, **kwargs):
+            # stop the informer loop after the second watch
+            if len(fake_watch.calls) == 1:
+                informer._stopped.set()
+            return FakeWatch.stream(fake_watch, func, **kwargs)
+
+        with mock.patch.object(fake_watch, 'stream', side_effect=stream):
+            informer.run()
+
+        self.assertEqual(informer.lists_count, 2)
+        self.assertEqual(fake_watch.calls[1]['resource_version'], '20')
+        self.assertEqual(informer.get_by_label('runner_uuid', 'uuid-1'), [])
+
+
+class RunnersInformerTestCase(TestCase):
+
+    def get_informer(self, pods):
+        pods_informer = Informer('pods', lambda: mock.Mock(return_value=get_pod_list(pods)))
+        pods_informer.list()
+        return RunnersInformer({'pods': pods_informer})
+
+    def test_get_pod(self):
+        informer = self.get_informer([
+            get_pod('runner-1-a', 'uuid-1', phase='Failed', created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)),
+            get_pod('runner-1-b', 'uuid-1', node_name='node-1', created_at=datetime(2026, 1, 2, tzinfo=timezone.utc)),
+        ])
+
+        self.assertEqual(informer.get_pod('uuid-1').metadata.name, 'runner-1-b')
+        self.assertEqual(informer.get_pod_phase('uuid-1'), 'Running')
+        self.assertEqual(informer.get_node_name('uuid-1'), 'node-1')
+        self.assertIsNone(informer.get_pod_phase('uuid-2'))
+        self.assertTrue(informer.synced)
+
+    def test_get_pending_reasons(self):
+        informer = self.get_informer([
+            get_pod(
+                'runner-1', 'uuid-1', phase='Pending',
+                conditions=[k8s_client.V1PodCondition(type='PodScheduled', status='False', reason='Unschedulable')],
+            ),
+            get_pod(
+                'runner-2', 'uuid-2', phase='Pending',
+                conditions=[k8s_client.V1PodCondition(type='PodScheduled', status='True')],
+                container_statuses=[k8s_client.V1ContainerStatus(
+                    name='runner', image='runner', image_id='', ready=False, restart_count=0,
+                    state=k8s_client.V1ContainerState(waiting=k8s_client.V1ContainerStateWaiting(reason='ImagePullBackOff')),
+                )],
+            ),
+            get_pod('runner-3', 'uuid-3'),
+        ])
+
+        self.assertEqual(informer.get_pending_reasons('uuid-1'), ['Unschedulable'])
+        self.assertEqual(informer.get_pending_reasons('uuid-2'), ['ImagePullBackOff'])
+        self.assertEqual(informer.get_pending_reasons('uuid-3'), [])
+
+    @mock.patch('autoscaler.clients.kubernetes.informer.KubernetesPythonAPIService')
+    def test_informers_kinds(self, _):
+        # runner OAuth secrets are not cached, so secrets are not listed or watched
+        self.assertEqual(set(RunnersInformer().informers), {'jobs', 'pods'})
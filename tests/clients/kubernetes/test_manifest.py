@@ -0,0 +1,106 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from autoscaler.clients.kubernetes.base import KubernetesSpecFileAPIService
+from autoscaler.clients.kubernetes.manifest import KubernetesManifestBuilder
+from autoscaler.core.validators import JobTemplate
+from tests.helpers import get_job_template
+
+
+class KubernetesManifestBuilderTestCase(TestCase):
+
+    def setUp(self):
+        KubernetesSpecFileAPIService.clear_cache()
+        self.template_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.template_dir.cleanup)
+        patcher = mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', self.template_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(KubernetesSpecFileAPIService.clear_cache)
+
+        self.write_template(get_job_template())
+        self.builder = KubernetesManifestBuilder()
+        self.runner_data = {
+            'account_uuid': 'account-uuid',
+            'repository_uuid': 'repository-uuid',
+            'runner_uuid': 'runner-uuid',
+            'oauth_client_id_base64': 'b2F1dGgtaWQ=',
+            'oauth_client_secret_base64': 'b2F1dGgtc2VjcmV0',
+            'runner_namespace': 'runner-namespace',
+            'requests_memory': '4Gi',
+            'requests_cpu': '1000m',
+            'limits_memory': '4Gi',
+            'limits_cpu': '1000m'
+        }
+
+    def write_template(self, content, mtime_ns=None):
+        path = os.path.join(self.template_dir.name, 'job.yaml.template')
+        with open(path, 'w') as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_build(self):
+        for runner_uuid in ('first-runner-uuid', 'second-runner-uuid'):
+            self.runner_data['runner_uuid'] = runner_uuid
+
+            manifest = self.builder.build(self.runner_data)
+
+            self.assertEqual(manifest, self.builder.render_text(self.runner_data))
+
+        self.assertEqual(manifest['items'][1]['metadata']['name'], 'runner-second-runner-uuid')
+        self.assertEqual(self.builder.stats(), {'built': 2, 'fallback': 0})
+        JobTemplate.parse_obj(manifest)
+
+    def test_build_without_repository(self):
+        self.builder.build(self.runner_data)
+        self.runner_data['repository_uuid'] = None
+
+        manifest = self.builder.build(self.runner_data)
+
+        self.assertEqual(manifest, self.builder.render_text(self.runner_data))
+        self.assertNotIn('repository_uuid', manifest['items'][0]['metadata']['labels'])
+        self.assertEqual(self.builder.stats(), {'built': 2, 'fallback': 0})
+
+    def test_build_quoted_number(self):
+        self.runner_data['requests_cpu'] = '2'
+
+        manifest = self.builder.build(self.runner_data)
+
+        self.assertEqual(manifest['items'][1]['spec']['template']['spec']['containers'][0]['resources']['requests']['cpu'], '2')
+        self.assertEqual(self.builder.stats(), {'built': 1, 'fallback': 0})
+
+    def test_build_unquoted_number(self):
+        self.runner_data['runner_namespace'] = '123'
+
+        manifest = self.builder.build(self.runner_data)
+
+        self.assertEqual(manifest['items'][0]['metadata']['labels']['runner_namespace'], 123)
+        self.assertEqual(self.builder.stats(), {'built': 0, 'fallback': 1})
+
+    def test_build_unsafe_value(self):
+        self.runner_data['limits_memory'] = '4 Gi'
+
+        manifest = self.builder.build(self.runner_data)
+
+        self.assertEqual(manifest['items'][1]['spec']['template']['spec']['containers'][0]['resources']['limits']['memory'], '4 Gi')
+        self.assertEqual(self.builder.stats(), {'built': 0, 'fallback': 1})
+
+    def test_build_template_expression(self):
+        self.write_template('name: runner-<% runner_uuid | upper %>')
+
+        manifest = self.builder.build(self.runner_data)
+        self.builder.build(self.runner_data)
+
+        self.assertEqual(manifest, {'name': 'runner-RUNNER-UUID'})
+        self.assertEqual(self.builder.stats(), {'built': 0, 'fallback': 2})
+
+    def test_build_template_changed(self):
+        self.write_template('name: runner-<% runner_uuid %>', mtime_ns=1)
+        self.builder.build(self.runner_data)
+
+        self.write_template('name: job-<% runner_uuid %>', mtime_ns=2)
+
+        self.assertEqual(self.builder.build(self.runner_data), {'name': 'job-runner-uuid'})
+        self.assertEqual(self.builder.stats(), {'built': 2, 'fallback': 0})
@@ -1,9 +1,10 @@
+import threading
 from json.decoder import JSONDecodeError
 from unittest import TestCase, mock
 
 import requests
 
-from autoscaler.clients.base import BaseAPIService, BearerAuth
+from autoscaler.clients.base import BaseAPIService, BearerAuth, HTTPSessionManager
 from autoscaler.core.exceptions import AutoscalerHTTPError
 
 
@@ -19,7 +20,7 @@ class BearerAuthTestCase(TestCase):
 
 class BaseAPIServiceTestCase(TestCase):
 
-    @mock.patch('requests.request')
+    @mock.patch('requests.Session.request')
     def test_make_http_request(self, mock_request):
         response_object = mock.MagicMock(status_code=201)
         response_object.json.return_value = {'key': 'value'}
@@ -33,7 +34,7 @@ class BaseAPIServiceTestCase(TestCase):
             'post', 'http://fake_url', auth=mock.ANY, json={'key': 'value'},
             headers={'Content-Application': 'json', 'User-Agent': 'Bitbucket Runners Autoscaler'}, timeout=5)
 
-    @mock.patch('requests.request')
+    @mock.patch('requests.Session.request')
     def test_make_http_request_not_found(self, mock_request):
         response_object = mock.MagicMock(status_code=404, text='')
         response_object.raise_for_status.side_effect = requests.exceptions.HTTPError
@@ -47,3 +48,59 @@ class BaseAPIServiceTestCase(TestCase):
         data, status = BaseAPIService().make_http_request('http://fake_url', ignore_exc=(404, ))
         self.assertEqual(status, 404)
         self.assertEqual(data, '')
+
+
+class HTTPSessionManagerTestCase(TestCase):
+
+    def test_session_per_thread_shared_adapter(self):
+        manager = HTTPSessionManager()
+        sessions = []
+
+        thread = threading.Thread(target=lambda: sessions.append(manager.session))
+        thread.start()
+        thread.join()
+
+        self.assertIs(manager.session, manager.session)
+        self.assertIsNot(manager.session, sessions[0])
+        self.assertIs(
+            manager.session.get_adapter('https://api.bitbucket.org'),
+            sessions[0].get_adapter('https://api.bitbucket.org')
+        )
+
+    @mock.patch('requests.Session.request')
+    def test_request_keep_alive_disabled(self, mock_request):
+        manager = HTTPSessionManager(keep_alive_timeout=0)
+        manager.request('get', 'http://fake_url', headers={'User-Agent': 'test'})
+
+        mock_request.assert_called_once_with(
+            'get', 'http://fake_url', headers={'User-Agent': 'test', 'Connection': 'close'})
+
+    @mock.patch('time.monotonic')
+    @mock.patch('requests.Session.request')
+    def test_request_idle_connections_expired(self, mock_request, mock_monotonic):
+        manager = HTTPSessionManager(keep_alive_timeout=60)
+        pool = manager._adapter.poolmanager.connection_from_url('https://api.bitbucket.org')
+        pool.num_connections, pool.num_requests = 1, 3
+
+        mock_monotonic.return_value = 100
+        manager.request('get', 'https://api.bitbucket.org')
+        mock_monotonic.return_value = 130
+        manager.request('get', 'https://api.bitbucket.org')
+        self.assertEqual(len(manager._adapter.poolmanager.pools), 1)
+
+        mock_monotonic.return_value = 200
+        manager.request('get', 'https://api.bitbucket.org')
+        self.assertEqual(len(manager._adapter.poolmanager.pools), 0)
+        self.assertEqual(manager.stats()['requests'], 3)
+
+    def test_stats(self):
+        manager = HTTPSessionManager()
+        self.assertEqual(manager.stats(), {'requests': 0, 'connections': 0, 'reused': 0, 'reuse_ratio': 0})
+
+        pool = manager._adapter.poolmanager.connection_from_url('https://api.bitbucket.org')
+        pool.num_connections, pool.num_requests = 2, 8
+        manager.close()
+        pool = manager._adapter.poolmanager.connection_from_url('https://bitbucket.org')
+        pool.num_connections, pool.num_requests = 1, 2
+
+        self.assertEqual(manager.stats(), {'requests': 10, 'connections': 3, 'reused': 7, 'reuse_ratio': 0.7})
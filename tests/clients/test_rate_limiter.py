@@ -0,0 +1,153 @@
+import threading
+from unittest import TestCase, mock
+
+import requests_mock
+
+from autoscaler.clients.base import BaseAPIService
+from autoscaler.clients.rate_limiter import RateLimiter
+from autoscaler.core.exceptions import AutoscalerHTTPError
+from tests.helpers import FakeClock, register_rate_limited_uri
+
+
+class RateLimiterTestCase(TestCase):
+
+    def test_acquire_burst(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, burst=3, clock=clock, sleep=clock.sleep)
+
+        for _ in range(3):
+            limiter.acquire()
+
+        self.assertEqual(clock.sleeps, [])
+        self.assertEqual(limiter.budget()['tokens'], 0)
+
+    def test_acquire_throttled(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=0.5, burst=1, clock=clock, sleep=clock.sleep)
+
+        limiter.acquire()
+        limiter.acquire()
+
+        self.assertEqual(clock.sleeps, [2])
+
+    @mock.patch('random.uniform', return_value=0)
+    def test_acquire_not_throttled(self, mock_uniform):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=0, burst=1, clock=clock, sleep=clock.sleep)
+
+        for _ in range(5):
+            limiter.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+        # still paused on 429
+        limiter.backoff(retry_after=10)
+        limiter.acquire()
+        self.assertEqual(clock.sleeps, [10])
+
+    def test_refill_up_to_burst(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, burst=5, clock=clock, sleep=clock.sleep)
+        for _ in range(5):
+            limiter.acquire()
+
+        clock.now += 2
+        self.assertEqual(limiter.budget()['tokens'], 2)
+        clock.now += 100
+        self.assertEqual(limiter.budget()['tokens'], 5)
+
+    @mock.patch('random.uniform', return_value=0)
+    def test_backoff_retry_after(self, mock_uniform):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, burst=5, clock=clock, sleep=clock.sleep)
+
+        delay = limiter.backoff(retry_after=30)
+
+        self.assertEqual(delay, 30)
+        self.assertEqual(limiter.budget(), {'tokens': 1, 'burst': 5, 'paused_for': 30, 'throttled': 1})
+
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual(clock.sleeps, [30, 1])
+
+    @mock.patch('random.uniform', return_value=0)
+    def test_backoff_exponential(self, mock_uniform):
+        limiter = RateLimiter(rate=1, burst=5, backoff_base=10, clock=FakeClock())
+
+        self.assertEqual(limiter.backoff(attempt=0), 10)
+        self.assertEqual(limiter.backoff(attempt=2), 40)
+
+    def test_backoff_jitter(self):
+        limiter = RateLimiter(rate=1, burst=5, jitter=0.5, clock=FakeClock())
+
+        delay = limiter.backoff(retry_after=10)
+
+        self.assertGreaterEqual(delay, 10)
+        self.assertLessEqual(delay, 15)
+
+    def test_acquire_thread_safe(self):
+        limiter = RateLimiter(rate=1, burst=50)
+
+        threads = [threading.Thread(target=limiter.acquire) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(limiter.budget()['tokens'], 0)
+
+
+@mock.patch('random.uniform', return_value=0)
+class RateLimitedAPIServiceTestCase(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.service = BaseAPIService()
+        self.service.rate_limiter = RateLimiter(rate=1, burst=10, clock=self.clock, sleep=self.clock.sleep)
+
+    @requests_mock.Mocker()
+    def test_retry_after_honoured(self, mock_uniform, requests):
+        register_rate_limited_uri(requests, 'GET', 'http://fake_url', limited=2, retry_after=7, json={'key': 'value'})
+
+        data, status = self.service.make_http_request('http://fake_url')
+
+        self.assertEqual((data, status), ({'key': 'value'}, 200))
+        self.assertEqual(requests.call_count, 3)
+        self.assertEqual(self.clock.sleeps, [7, 7])
+        self.assertEqual(self.service.rate_limiter.budget()['throttled'], 2)
+
+    @requests_mock.Mocker()
+    def test_retry_after_missing(self, mock_uniform, requests):
+        register_rate_limited_uri(requests, 'GET', 'http://fake_url', limited=2, json={'key': 'value'})
+
+        self.service.make_http_request('http://fake_url')
+
+        self.assertEqual(self.clock.sleeps, [10, 20])
+
+    @requests_mock.Mocker()
+    def test_retry_after_http_date(self, mock_uniform, requests):
+        register_rate_limited_uri(requests, 'GET', 'http://fake_url', retry_after='Wed, 21 Oct 2015 07:28:00 GMT',
+                                  json={'key': 'value'})
+
+        self.service.make_http_request('http://fake_url')
+
+        # date in the past means retry immediately
+        self.assertEqual(self.clock.sleeps, [])
+
+    @requests_mock.Mocker()
+    def test_retries_exhausted(self, mock_uniform, requests):
+        register_rate_limited_uri(requests, 'GET', 'http://fake_url', limited=BaseAPIService.MAX_RETRIES + 1,
+                                  retry_after=1, json={})
+
+        with self.assertRaises(AutoscalerHTTPError) as e:
+            self.service.make_http_request('http://fake_url')
+
+        self.assertEqual(e.exception.status_code, 429)
+        self.assertEqual(requests.call_count, BaseAPIService.MAX_RETRIES + 1)
+
+    @requests_mock.Mocker()
+    def test_no_rate_limiter(self, mock_uniform, requests):
+        register_rate_limited_uri(requests, 'GET', 'http://fake_url', json={})
+        self.service.rate_limiter = None
+
+        with self.assertRaises(AutoscalerHTTPError):
+            self.service.make_http_request('http://fake_url')
@@ -0,0 +1,75 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from autoscaler.core.history import RunnersHistory
+
+DAY = 24 * 60 * 60
+
+
+class RunnersHistoryTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 10 * DAY
+        self.history_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.history_dir.cleanup)
+        self.file_path = os.path.join(self.history_dir.name, 'runners_history.json')
+
+    def get_history(self, file_path=''):
+        return RunnersHistory(file_path=file_path, retention=2 * DAY, clock=lambda: self.now)
+
+    def test_get_ewma(self):
+        history = self.get_history()
+        self.assertIsNone(history.get_ewma('linux', 0.5))
+
+        for busy in (4, 0, 2):
+            history.add('linux', busy, 1)
+            self.now += 60
+
+        # 4 -> 0.5 * 0 + 0.5 * 4 = 2 -> 0.5 * 2 + 0.5 * 2 = 2
+        self.assertEqual(history.get_ewma('linux', 0.5), 2)
+        self.assertIsNone(history.get_ewma('linux,gpu', 0.5))
+        # only the last 2 samples
+        self.assertEqual(history.get_ewma('linux', 0.5, window=120), 1)
+
+    def test_get_seasonal(self):
+        history = self.get_history()
+
+        # a burst of busy runners the previous day, 10 minutes ahead of now
+        self.now -= DAY
+        for busy in (0, 8, 10, 0):
+            history.add('linux', busy, 0)
+            self.now += 300
+
+        self.now += DAY - 1200
+
+        self.assertEqual(history.get_seasonal('linux', ahead=600, window=300), 6)
+        self.assertIsNone(history.get_seasonal('linux', ahead=3600, window=300))
+
+    def test_retention(self):
+        history = self.get_history()
+
+        history.add('linux', 1, 0)
+        self.now += 2 * DAY
+        history.add('linux', 2, 0)
+
+        self.assertEqual(history.get('linux'), [(self.now, 2, 0)])
+
+    def test_persisted(self):
+        self.get_history(self.file_path).add('linux', 3, 1)
+
+        self.assertEqual(self.get_history(self.file_path).get('linux'), [(self.now, 3, 1)])
+
+        # expired samples are not loaded from the file
+        self.now += 2 * DAY
+        self.assertEqual(self.get_history(self.file_path).get('linux'), [])
+        self.assertEqual(os.listdir(self.history_dir.name), ['runners_history.json'])
+
+    def test_broken_file(self):
+        with open(self.file_path, 'w') as f:
+            f.write('{"linux":')
+
+        history = self.get_history(self.file_path)
+        history.add('linux', 1, 0)
+
+        self.assertEqual(history.get('linux'), [(self.now, 1, 0)])
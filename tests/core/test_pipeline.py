@@ -0,0 +1,135 @@
+import threading
+import time
+from unittest import TestCase
+
+from autoscaler.core.pipeline import Pipeline, Stage, start_rate_limiter
+
+
+class PipelineTestCase(TestCase):
+
+    def test_run(self):
+        pipeline = Pipeline([
+            Stage('double', lambda x: x * 2, concurrency=2),
+            Stage('increment', lambda x: x + 1, concurrency=2),
+        ])
+
+        results = pipeline.run(range(5))
+
+        self.assertEqual([r.value for r in results], [1, 3, 5, 7, 9])
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(pipeline.metrics['double']['succeeded'], 5)
+        self.assertEqual(pipeline.metrics['increment']['succeeded'], 5)
+
+    def test_run_concurrency_bounded(self):
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def work(x):
+            with lock:
+                running.append(x)
+                max_running.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(x)
+            return x
+
+        Pipeline([Stage('work', work, concurrency=3)]).run(range(10))
+
+        self.assertEqual(max(max_running), 3)
+
+    def test_run_next_stage_started_early(self):
+        order = []
+
+        def first(x):
+            time.sleep(0.05 * x)
+            order.append(('first', x))
+            return x
+
+        def second(x):
+            order.append(('second', x))
+            return x
+
+        Pipeline([Stage('first', first, concurrency=3), Stage('second', second)]).run(range(3))
+
+        # the first item reaches the second stage before the last item leaves the first stage
+        self.assertLess(order.index(('second', 0)), order.index(('first', 2)))
+
+    def test_run_stage_error(self):
+        def register(x):
+            if x == 1:
+                raise ValueError('failed')
+            return x
+
+        pipeline = Pipeline([Stage('register', register), Stage('setup', lambda x: x)])
+
+        results = pipeline.run(range(3))
+
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertEqual(results[1].stage, 'register')
+        self.assertEqual(str(results[1].error), 'failed')
+        self.assertEqual(pipeline.metrics['register']['failed'], 1)
+        self.assertEqual(pipeline.metrics['setup']['succeeded'], 2)
+
+    def test_run_retries(self):
+        calls = []
+
+        def flaky(x):
+            calls.append(x)
+            if len(calls) < 3:
+                raise ValueError('failed')
+            return x
+
+        pipeline = Pipeline([Stage('flaky', flaky, retries=2)])
+
+        results = pipeline.run([1])
+
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[0].attempts, {'flaky': 3})
+        self.assertEqual(pipeline.metrics['flaky']['retried'], 2)
+
+    def test_run_retries_exhausted(self):
+        def failing(x):
+            raise ValueError('failed')
+
+        results = Pipeline([Stage('failing', failing, retries=1)]).run([1])
+
+        self.assertFalse(results[0].ok)
+        self.assertEqual(results[0].attempts, {'failing': 2})
+
+    def test_run_skipped(self):
+        second_calls = []
+
+        pipeline = Pipeline([
+            Stage('first', lambda x: x or None),
+            Stage('second', lambda x: second_calls.append(x)),
+        ])
+
+        results = pipeline.run([0, 1])
+
+        self.assertEqual([r.skipped for r in results], [True, False])
+        self.assertEqual(second_calls, [1])
+        self.assertEqual(Pipeline.summary(results)['skipped'], 1)
+        self.assertEqual(Pipeline.summary(results)['succeeded'], 1)
+
+    def test_summary(self):
+        def register(x):
+            if x == 2:
+                raise ValueError('failed')
+            return x
+
+        results = Pipeline([Stage('register', register)]).run(range(3))
+
+        summary = Pipeline.summary(results)
+
+        self.assertEqual(summary['succeeded'], 2)
+        self.assertEqual(summary['failed'], 1)
+        self.assertGreaterEqual(summary['max_duration'], summary['avg_duration'])
+
+    def test_start_rate_limiter(self):
+        self.assertIsNone(start_rate_limiter(0, 2))
+
+        rate_limiter = start_rate_limiter(10, 2)
+
+        self.assertEqual(rate_limiter.rate, 0.2)
+        self.assertEqual(rate_limiter.burst, 2)
@@ -0,0 +1,70 @@
+from unittest import TestCase, mock
+
+from autoscaler.core.runner_ledger import RunnerLedger
+
+
+RUNNERS = [
+    {'uuid': '{runner-1}', 'labels': ['test'], 'state': {'status': 'ONLINE'}},
+    {'uuid': '{runner-2}', 'labels': ['test'], 'state': {'status': 'OFFLINE'}},
+]
+
+
+class RunnerLedgerTestCase(TestCase):
+
+    def test_get_runners_seeded(self):
+        load = mock.Mock()
+        ledger = RunnerLedger(load)
+
+        ledger.seed(RUNNERS)
+
+        self.assertEqual(ledger.get_runners(), RUNNERS)
+        load.assert_not_called()
+
+    def test_get_runners_not_seeded(self):
+        load = mock.Mock(return_value=RUNNERS)
+        ledger = RunnerLedger(load)
+
+        self.assertEqual(ledger.count(), 2)
+        self.assertEqual(ledger.count(), 2)
+        load.assert_called_once()
+
+    def test_add_runner(self):
+        ledger = RunnerLedger(mock.Mock())
+        ledger.seed(RUNNERS)
+
+        ledger.add_runner('{runner-3}', {'test'})
+
+        self.assertEqual(ledger.count(), 3)
+        self.assertEqual(ledger.stats(), {'ONLINE': 1, 'OFFLINE': 1, 'UNREGISTERED': 1})
+
+    def test_disable_runner(self):
+        ledger = RunnerLedger(mock.Mock())
+        ledger.seed(RUNNERS)
+
+        ledger.disable_runner('{runner-1}')
+
+        self.assertEqual(ledger.count(), 2)
+        self.assertEqual(ledger.stats(), {'DISABLED': 1, 'OFFLINE': 1})
+        self.assertEqual(RUNNERS[0]['state']['status'], 'ONLINE')
+
+    def test_delete_runner(self):
+        ledger = RunnerLedger(mock.Mock())
+        ledger.seed(RUNNERS)
+
+        ledger.delete_runner('{runner-1}')
+
+        self.assertEqual(ledger.stats(), {'OFFLINE': 1})
+
+    def test_resync_after_interval(self):
+        load = mock.Mock(return_value=RUNNERS)
+        ledger = RunnerLedger(load, resync_interval=2)
+        ledger.seed(RUNNERS)
+
+        ledger.add_runner('{runner-3}', {'test'})
+        self.assertEqual(ledger.count(), 3)
+        load.assert_not_called()
+
+        ledger.add_runner('{runner-4}', {'test'})
+        self.assertEqual(ledger.count(), 2)
+        load.assert_called_once()
+        self.assertEqual(ledger.resync_count, 1)
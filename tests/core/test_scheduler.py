@@ -0,0 +1,135 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import pytest
+
+from autoscaler.core.scheduler import AdaptiveInterval, GroupScheduler, PollingActivity
+from tests.helpers import FakeClock
+
+
+class GroupSchedulerTestCase(TestCase):
+
+    @pytest.fixture(autouse=True)
+    def inject_fixtures(self, caplog):
+        self.caplog = caplog
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+        self.scheduler = GroupScheduler(self.executor, clock=self.clock)
+
+    def test_run_pending(self):
+        calls = []
+        self.scheduler.schedule({
+            'fast': ('fast', 60, lambda: calls.append('fast')),
+            'slow': ('slow', 600, lambda: calls.append('slow')),
+        })
+
+        self.assertEqual(sorted(self.scheduler.run_pending()), ['fast', 'slow'])
+        self.scheduler.wait()
+        self.assertEqual(self.scheduler.get_wait_time(), 60)
+
+        self.clock.sleep(60)
+        self.assertEqual(self.scheduler.run_pending(), ['fast'])
+        self.scheduler.wait()
+
+        self.clock.sleep(540)
+        self.assertEqual(sorted(self.scheduler.run_pending()), ['fast', 'slow'])
+        self.scheduler.wait()
+
+        self.assertEqual(sorted(calls), ['fast'] * 3 + ['slow'] * 2)
+
+    def test_overrun_skipped(self):
+        release = threading.Event()
+        calls = []
+        self.scheduler.schedule({
+            'slow': ('slow', 60, lambda: release.wait()),
+            'fast': ('fast', 60, lambda: calls.append('fast')),
+        })
+        self.scheduler.run_pending()
+
+        self.clock.sleep(130)
+        with self.caplog.at_level(logging.WARNING):
+            started = self.scheduler.run_pending()
+
+        # the slow group does not delay the fast one
+        self.assertEqual(started, ['fast'])
+        self.assertIn(
+            '[slow] Previous attempt is running for 130 seconds, longer than the interval 60 seconds. Attempts skipped: 2',
+            self.caplog.text
+        )
+
+        release.set()
+        self.scheduler.wait()
+
+        # the slow group is due on its schedule, not right after its overrun completes
+        self.clock.sleep(60)
+        self.assertEqual(sorted(self.scheduler.run_pending()), ['fast', 'slow'])
+        self.scheduler.wait()
+        self.assertEqual(self.scheduler.stats()['slow'], {'interval': 60, 'runs': 2, 'overruns': 1, 'running': False})
+
+    def test_schedule_changed(self):
+        self.scheduler.schedule({'group': ('group', 600, lambda: None)})
+        self.scheduler.run_pending()
+        self.scheduler.wait()
+
+        self.clock.sleep(100)
+        self.scheduler.schedule({
+            'group': ('group', 120, lambda: None),
+            'new-group': ('new-group', 600, lambda: None),
+        })
+
+        self.assertEqual(self.scheduler.get_wait_time(), 0)
+        self.assertEqual(self.scheduler.run_pending(), ['new-group'])
+        self.assertEqual(self.scheduler.get_wait_time(), 20)
+
+        self.scheduler.schedule({'new-group': ('new-group', 600, lambda: None)})
+        self.assertEqual(list(self.scheduler.stats()), ['new-group'])
+
+    def test_error_raised(self):
+        def fail():
+            raise SystemExit(1)
+
+        self.scheduler.schedule({'group': ('group', 60, fail)})
+        self.scheduler.run_pending()
+
+        with pytest.raises(SystemExit):
+            self.scheduler.wait()
+
+    def test_adaptive_interval(self):
+        activities = iter([
+            PollingActivity(scale_up_threshold=0.8, busy_ratio=0.2),
+            PollingActivity(scale_up_threshold=0.8, busy_ratio=0.2),
+            PollingActivity(scale_up_threshold=0.8, busy_ratio=0.2),
+            PollingActivity(scale_up_threshold=0.8, busy_ratio=0.75),
+            PollingActivity(scale_up_threshold=0.8, busy_ratio=0.2, in_flight=True),
+        ])
+        self.scheduler.schedule({'group': ('group', AdaptiveInterval(min_interval=60, max_interval=300), lambda: next(activities))})
+
+        intervals = []
+        for _ in range(5):
+            self.clock.sleep(self.scheduler.get_wait_time())
+            self.scheduler.run_pending()
+            self.scheduler.wait()
+            intervals.append(self.scheduler.stats()['group']['interval'])
+
+        # stable group backs off up to the max interval, near the threshold or scaling it is polled fast again
+        self.assertEqual(intervals, [120, 240, 300, 60, 60])
+        self.assertEqual(self.scheduler.get_wait_time(), 60)
+
+    def test_adaptive_interval_bounds_changed(self):
+        activity = PollingActivity(scale_up_threshold=0.8)
+        self.scheduler.schedule({'group': ('group', AdaptiveInterval(min_interval=60, max_interval=600), lambda: activity)})
+        for _ in range(3):
+            self.clock.sleep(self.scheduler.get_wait_time())
+            self.scheduler.run_pending()
+            self.scheduler.wait()
+
+        self.assertEqual(self.scheduler.stats()['group']['interval'], 480)
+
+        self.scheduler.schedule({'group': ('group', AdaptiveInterval(min_interval=60, max_interval=120), lambda: activity)})
+        self.assertEqual(self.scheduler.stats()['group']['interval'], 120)
+        self.assertEqual(self.scheduler.get_wait_time(), 120)
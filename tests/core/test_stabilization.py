@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+from autoscaler.core.stabilization import SCALE_UP, FlapDetector, ScalingDecisions
+
+
+class ScalingDecisionsTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 1000
+
+    def test_get_stabilized(self):
+        decisions = ScalingDecisions(clock=lambda: self.now)
+
+        decisions.record('group', 10, window=300)
+        self.now += 60
+        decisions.record('group', 2, window=300)
+        decisions.record('other group', 2, window=300)
+
+        self.assertEqual(decisions.get_stabilized('group', window=300), 10)
+        self.assertEqual(decisions.get_stabilized('other group', window=300), 2)
+        self.assertIsNone(decisions.get_stabilized('new group', window=300))
+
+        # the desired runners count of 10 is out of the window
+        self.now += 240
+        decisions.record('group', 4, window=300)
+        self.assertEqual(decisions.get_stabilized('group', window=300), 4)
+
+    def test_get_stabilized_not_recorded(self):
+        decisions = ScalingDecisions(clock=lambda: self.now)
+
+        decisions.record('group', 10, window=300)
+
+        # reading does not record the desired runners count
+        self.assertEqual(decisions.get_stabilized('group', window=300), 10)
+        self.assertEqual(decisions.get_stabilized('group', window=300), 10)
+        self.now += 300
+        self.assertIsNone(decisions.get_stabilized('group', window=300))
+
+    def test_get_stabilized_disabled(self):
+        decisions = ScalingDecisions(clock=lambda: self.now)
+
+        decisions.record('group', 10, window=0)
+
+        self.assertIsNone(decisions.get_stabilized('group', window=0))
+        self.assertIsNone(decisions.get_stabilized('group', window=300))
+
+
+class FlapDetectorTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 1000
+        self.detector = FlapDetector(clock=lambda: self.now)
+
+    def scale_down(self, max_reversals=2):
+        self.now += 60
+        return self.detector.suppress_scale_down('group', window=600, max_reversals=max_reversals)
+
+    def scale_up(self):
+        self.now += 60
+        self.detector.add('group', SCALE_UP, window=600)
+
+    def test_suppress_scale_down(self):
+        self.assertFalse(self.scale_down())
+        self.scale_up()
+        self.assertFalse(self.scale_down())
+        self.scale_up()
+
+        # down, up, down, up and down again is the 4th reversal
+        self.assertTrue(self.scale_down())
+        self.assertTrue(self.scale_down())
+        self.assertEqual(self.detector.get_suppressed_count('group'), 2)
+        self.assertEqual(self.detector.stats(), {'group': 2})
+
+    def test_suppress_scale_down_window(self):
+        for _ in range(2):
+            self.scale_down()
+            self.scale_up()
+
+        self.now += 600
+
+        self.assertFalse(self.scale_down())
+        self.assertEqual(self.detector.stats(), {})
+
+    def test_suppress_scale_down_disabled(self):
+        for _ in range(3):
+            self.detector.add('group', SCALE_UP, window=0)
+            self.assertFalse(self.detector.suppress_scale_down('group', window=0, max_reversals=1))
@@ -3,6 +3,8 @@ import sys
 import importlib.resources as pkg_resources
 from contextlib import contextmanager
 
+import yaml
+
 
 @contextmanager
 def capture_output():
@@ -18,3 +20,33 @@ def capture_output():
 
 def get_file(filename: str) -> str:
     return pkg_resources.read_text('tests.resources', filename)
+
+
+def get_job_template() -> str:
+    """Job template shipped in the job template ConfigMap."""
+    with open('config/runners-autoscaler-cm-job.template.yaml') as f:
+        return yaml.safe_load(f)['data']['job.yaml.template']
+
+
+class FakeClock:
+    """Monotonic clock for tests. Sleep moves the time forward instead of blocking."""
+
+    def __init__(self, now=0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def register_rate_limited_uri(requests_mocker, method, url, limited=1, retry_after=None, **response):
+    """Register url answering 429 Too Many Requests `limited` times before the regular response."""
+    headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+    requests_mocker.register_uri(method, url, [
+        *[{'status_code': 429, 'headers': headers, 'text': 'Rate limit for this resource has been exceeded'}] * limited,
+        {'status_code': 200, **response},
+    ])
@@ -4,7 +4,9 @@ from unittest import TestCase, mock
 import pytest
 
 from autoscaler.core.validators import NameUUIDData
+from autoscaler.core.exceptions import AutoscalerHTTPError
 from autoscaler.services.bitbucket import BitbucketService, BitbucketServiceData
+from autoscaler.services.uuid_cache import UUIDCache
 
 
 @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test', 'DEBUG': 'true'})
@@ -14,6 +16,11 @@ class BitbucketServiceTestCase(TestCase):
     def inject_fixtures(self, caplog):
         self.caplog = caplog
 
+    def setUp(self):
+        uuid_cache_patcher = mock.patch.object(BitbucketService, 'uuid_cache', UUIDCache(file_path=''))
+        uuid_cache_patcher.start()
+        self.addCleanup(uuid_cache_patcher.stop)
+
     @mock.patch('autoscaler.clients.bitbucket.base.BitbucketRepositoryRunner.get_runners')
     def test_get_bitbucket_runners(self, get_runners_request):
         get_runners_request.return_value = [
@@ -323,3 +330,33 @@ class BitbucketServiceTestCase(TestCase):
             result,
             ({'uuid': '{test-workspace-uuid}', 'name': 'test-workspace'}, {'uuid': '{test-repo-uuid}', 'name': 'test-repo'})
         )
+
+    @mock.patch('autoscaler.clients.bitbucket.base.BitbucketWorkspace.get_workspace')
+    @mock.patch('autoscaler.clients.bitbucket.base.BitbucketRepository.get_repository')
+    def test_get_bitbucket_workspace_repository_uuids_cached(self, mock_get_repo, mock_get_workspace):
+        mock_get_repo.side_effect = AutoscalerHTTPError('Repository not found', status_code=404)
+        mock_get_workspace.return_value = {'uuid': '{test-workspace-uuid}', 'slug': 'test-workspace'}
+
+        for _ in range(2):
+            self.assertEqual(
+                BitbucketService.get_bitbucket_workspace_repository_uuids('test-workspace', None),
+                ({'uuid': '{test-workspace-uuid}', 'name': 'test-workspace'}, None)
+            )
+            with pytest.raises(AutoscalerHTTPError, match='Repository not found'):
+                BitbucketService.get_bitbucket_workspace_repository_uuids('test-workspace', 'test-repo')
+
+        mock_get_workspace.assert_called_once_with('test-workspace')
+        mock_get_repo.assert_called_once_with('test-workspace', 'test-repo')
+
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.get_bitbucket_workspace_repository_uuids')
+    def test_prefetch_workspace_repository_uuids(self, mock_get_uuids):
+        mock_get_uuids.side_effect = AutoscalerHTTPError('Not found', status_code=404)
+
+        BitbucketService.prefetch_workspace_repository_uuids([
+            ('test-workspace', None), ('test-workspace', 'test-repo'), ('test-workspace', None)
+        ])
+
+        self.assertEqual(
+            sorted(mock_get_uuids.call_args_list, key=str),
+            [mock.call('test-workspace', 'test-repo'), mock.call('test-workspace', None)]
+        )
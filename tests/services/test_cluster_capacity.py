@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+from kubernetes import client as k8s_client
+
+from autoscaler.services.cluster_capacity import ClusterCapacity
+
+RUNNER_POD_SPEC = {
+    'containers': [
+        {'name': 'runner', 'resources': {'requests': {'memory': '4Gi', 'cpu': '1000m'}}},
+        {'name': 'docker'},
+    ],
+    'nodeSelector': {'customer': 'shared'},
+}
+
+
+def get_node(name, cpu='4', memory='16Gi', pods='110', labels=None, ready='True', unschedulable=None, taints=None):
+    return k8s_client.V1Node(
+        metadata=k8s_client.V1ObjectMeta(name=name, labels={'customer': 'shared'} if labels is None else labels),
+        spec=k8s_client.V1NodeSpec(unschedulable=unschedulable, taints=taints),
+        status=k8s_client.V1NodeStatus(
+            allocatable={'cpu': cpu, 'memory': memory, 'pods': pods},
+            conditions=[k8s_client.V1NodeCondition(type='Ready', status=ready)],
+        ),
+    )
+
+
+def get_pod(node_name, cpu='1', memory='1Gi', labels=None, node_selector=None):
+    return k8s_client.V1Pod(
+        metadata=k8s_client.V1ObjectMeta(name='pod', labels=labels),
+        spec=k8s_client.V1PodSpec(
+            node_name=node_name,
+            node_selector=node_selector,
+            containers=[k8s_client.V1Container(
+                name='main',
+                resources=k8s_client.V1ResourceRequirements(requests={'cpu': cpu, 'memory': memory}),
+            )],
+        ),
+    )
+
+
+class ClusterCapacityTestCase(TestCase):
+
+    def test_get_pod_requests(self):
+        requests = ClusterCapacity.get_pod_requests({
+            **RUNNER_POD_SPEC,
+            'initContainers': [{'resources': {'requests': {'memory': '8Gi'}}}],
+        })
+
+        self.assertEqual(requests, {'cpu': 1, 'memory': 8 * 1024 ** 3})
+
+    def test_count_fits(self):
+        capacity = ClusterCapacity(
+            [get_node('node-1'), get_node('node-2', cpu='2')],
+            [get_pod('node-1', cpu='1', memory='6Gi')],
+        )
+
+        # node-1: 3 cpu and 10Gi free, node-2: 2 cpu and 16Gi free
+        self.assertEqual(capacity.count_fits(RUNNER_POD_SPEC), 4)
+
+    def test_count_fits_nodes_filtered(self):
+        capacity = ClusterCapacity(
+            [
+                get_node('other-node', labels={}),
+                get_node('not-ready', ready='False'),
+                get_node('cordoned', unschedulable=True),
+                get_node('tainted', taints=[k8s_client.V1Taint(key='dedicated', value='ci', effect='NoSchedule')]),
+                get_node('node-1', cpu='1'),
+            ],
+            [],
+        )
+
+        self.assertEqual(capacity.count_fits(RUNNER_POD_SPEC), 1)
+
+        tolerated = {**RUNNER_POD_SPEC, 'tolerations': [{'key': 'dedicated', 'operator': 'Equal', 'value': 'ci'}]}
+        self.assertEqual(capacity.count_fits(tolerated), 5)
+
+    def test_count_fits_unscheduled_runners(self):
+        capacity = ClusterCapacity(
+            [get_node('node-1')],
+            [get_pod(None, labels={'runner_uuid': 'runner-1'}), get_pod(None, labels={'app': 'other'})],
+        )
+
+        self.assertEqual(capacity.count_fits(RUNNER_POD_SPEC), 3)
+
+    def test_count_fits_unscheduled_runners_node_pools(self):
+        capacity = ClusterCapacity(
+            [get_node('shared-node'), get_node('gpu-node', labels={'customer': 'gpu'})],
+            [
+                # pending runners of the gpu pool, the last one waits for a new gpu node
+                *[get_pod(None, cpu='2', labels={'runner_uuid': f'gpu-runner-{i}'}, node_selector={'customer': 'gpu'})
+                  for i in range(3)],
+                get_pod(None, cpu='2', labels={'runner_uuid': 'shared-runner-1'}, node_selector={'customer': 'shared'}),
+            ],
+        )
+
+        # the gpu runners take only the gpu node
+        self.assertEqual(capacity.count_fits(RUNNER_POD_SPEC), 2)
+        self.assertEqual(capacity.count_fits({**RUNNER_POD_SPEC, 'nodeSelector': {'customer': 'gpu'}}), 0)
+
+    def test_count_fits_pods_limit(self):
+        capacity = ClusterCapacity([get_node('node-1', pods='2')], [get_pod('node-1', cpu='0', memory='0')])
+
+        self.assertEqual(capacity.count_fits(RUNNER_POD_SPEC), 1)
+
+    def test_count_fits_placeholders_preempted(self):
+        capacity = ClusterCapacity(
+            [get_node('node-1')],
+            [get_pod('node-1', cpu='2', labels={'runner_placeholder': 'runner-placeholder-group-1'})],
+        )
+
+        self.assertEqual(capacity.count_fits(RUNNER_POD_SPEC), 4)
@@ -0,0 +1,128 @@
+import logging
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import pytest
+from kubernetes import client as k8s_client
+from kubernetes.client import ApiException
+
+from autoscaler.services.image_prepull import ImagePrepull, get_images, get_prepull_spec, normalize_image
+from tests.helpers import get_job_template
+
+RUNNER_IMAGE = 'docker-public.packages.atlassian.com/sox/atlassian/bitbucket-pipelines-runner:1'
+
+
+def get_node(name, images, labels=None):
+    return k8s_client.V1Node(
+        metadata=k8s_client.V1ObjectMeta(name=name, labels={'customer': 'shared'} if labels is None else labels),
+        spec=k8s_client.V1NodeSpec(),
+        status=k8s_client.V1NodeStatus(
+            conditions=[k8s_client.V1NodeCondition(type='Ready', status='True')],
+            images=[k8s_client.V1ContainerImage(names=names) for names in images],
+        ),
+    )
+
+
+class ImagePrepullTestCase(TestCase):
+
+    @pytest.fixture(autouse=True)
+    def inject_fixtures(self, caplog):
+        self.caplog = caplog
+
+    def setUp(self):
+        template_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(template_dir.cleanup)
+        with open(os.path.join(template_dir.name, 'job.yaml.template'), 'w') as f:
+            f.write(get_job_template())
+
+        patcher = mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', template_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.image_prepull = ImagePrepull(namespace='control-plane')
+        self.image_prepull.kube_python_api = mock.Mock()
+
+    def test_normalize_image(self):
+        self.assertEqual(normalize_image('docker:dind'), 'docker.io/library/docker:dind')
+        self.assertEqual(normalize_image('atlassian/runner'), 'docker.io/atlassian/runner:latest')
+        self.assertEqual(normalize_image('localhost:5000/runner:1'), 'localhost:5000/runner:1')
+        self.assertEqual(normalize_image(RUNNER_IMAGE), RUNNER_IMAGE)
+        self.assertEqual(normalize_image('docker@sha256:abc'), 'docker.io/library/docker@sha256:abc')
+
+    def test_get_prepull_spec(self):
+        pod_spec = {
+            'initContainers': [{'name': 'init', 'image': 'busybox'}],
+            'containers': [
+                {'name': 'runner', 'image': 'runner:1', 'imagePullPolicy': 'Always'},
+                {'name': 'docker', 'image': 'docker:dind'},
+                {'name': 'sidecar', 'image': 'busybox'},
+            ],
+            'nodeSelector': {'customer': 'shared'},
+        }
+
+        self.assertEqual(get_images(pod_spec), {'busybox': None, 'runner:1': 'Always', 'docker:dind': None})
+
+        spec = get_prepull_spec(pod_spec, pause_image='pause')
+        daemon_set_pod_spec = spec['spec']['template']['spec']
+        self.assertEqual(
+            [(c['image'], c.get('imagePullPolicy')) for c in daemon_set_pod_spec['initContainers']],
+            [('busybox', None), ('runner:1', 'Always'), ('docker:dind', None)]
+        )
+        self.assertEqual(daemon_set_pod_spec['containers'][0]['image'], 'pause')
+        self.assertEqual(daemon_set_pod_spec['nodeSelector'], {'customer': 'shared'})
+
+    def test_reconcile(self):
+        with self.caplog.at_level(logging.INFO):
+            self.image_prepull.reconcile()
+            self.image_prepull.reconcile()
+
+        self.image_prepull.kube_python_api.apply_daemon_set.assert_called_once()
+        spec, namespace = self.image_prepull.kube_python_api.apply_daemon_set.call_args.args
+        self.assertEqual(namespace, 'control-plane')
+        self.assertEqual(
+            [c['image'] for c in spec['spec']['template']['spec']['initContainers']],
+            [RUNNER_IMAGE, 'docker:dind']
+        )
+        self.assertIn(f"Runner images pre-pull DaemonSet updated: ['{RUNNER_IMAGE}', 'docker:dind']", self.caplog.text)
+
+    def test_reconcile_failed(self):
+        self.image_prepull.kube_python_api.apply_daemon_set.side_effect = [
+            ApiException(status=403, reason='Forbidden'), mock.Mock()
+        ]
+
+        with self.caplog.at_level(logging.WARNING):
+            self.image_prepull.reconcile()
+        self.image_prepull.reconcile()
+
+        # not applied DaemonSet is applied again by the next reconcile
+        self.assertEqual(self.image_prepull.kube_python_api.apply_daemon_set.call_count, 2)
+        self.assertIn('Runner images pre-pull DaemonSet not updated: 403 Forbidden', self.caplog.text)
+
+    def test_reconcile_deleted(self):
+        self.image_prepull.kube_python_api.daemon_set_exists.return_value = False
+
+        self.image_prepull.reconcile()
+        self.image_prepull.reconcile()
+
+        # the DaemonSet deleted after it was applied is applied again
+        self.assertEqual(self.image_prepull.kube_python_api.apply_daemon_set.call_count, 2)
+        self.image_prepull.kube_python_api.daemon_set_exists.assert_called_once_with(
+            'runner-image-prepull', 'control-plane'
+        )
+
+    def test_report(self):
+        self.image_prepull.kube_python_api.list_nodes.return_value = [
+            get_node('node-1', [[f'{RUNNER_IMAGE}', 'runner@sha256:abc'], ['docker.io/library/docker:dind']]),
+            get_node('node-2', [['docker.io/library/docker:dind']]),
+            get_node('other-node', [], labels={}),
+        ]
+        self.image_prepull.reconcile()
+
+        self.assertEqual(self.image_prepull.get_nodes_readiness(), {'node-1': [], 'node-2': [RUNNER_IMAGE]})
+
+        with self.caplog.at_level(logging.INFO):
+            self.image_prepull.report()
+
+        self.assertIn('Runner images ready on nodes: 1/2', self.caplog.text)
+        self.assertIn(f"Runner images missing on nodes: {{'node-2': ['{RUNNER_IMAGE}']}}", self.caplog.text)
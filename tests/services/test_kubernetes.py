@@ -1,11 +1,16 @@
 import logging
 import os
+import tempfile
 from unittest import TestCase, mock
 
 import pytest
+from kubernetes.client import ApiException
 
+from autoscaler.clients.kubernetes.base import KubernetesPythonAPIService
 from autoscaler.services.kubernetes import KubernetesService, KubernetesServiceData
+from autoscaler.services.placeholders import get_placeholder_name
 from autoscaler.core.exceptions import NamespaceNotFoundError
+from tests.helpers import get_job_template
 
 
 @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test', 'DEBUG': 'true'})
@@ -15,6 +20,11 @@ class KubernetesServiceTestCase(TestCase):
     def inject_fixtures(self, caplog):
         self.caplog = caplog
 
+    def setUp(self):
+        KubernetesPythonAPIService.reset()
+        KubernetesService.clear_cache()
+        self.addCleanup(KubernetesService.clear_cache)
+
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.get_kubernetes_namespace')
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.load_config')
     def test_init_namespace_found(self, mock_config, mock_get):
@@ -44,6 +54,50 @@ class KubernetesServiceTestCase(TestCase):
         mock_get.assert_called_once_with(**runner_data)
         mock_create.assert_called_once_with(**runner_data)
 
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.get_kubernetes_namespace')
+    def test_init_namespace_cached(self, mock_get):
+        KubernetesService('test').init('test')
+        KubernetesService('test-2').init('test')
+
+        mock_get.assert_called_once_with(namespace='test')
+
+        KubernetesService.invalidate_namespace('test')
+        KubernetesService('test').init('test')
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.get_kubernetes_namespace')
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_kubernetes_namespace')
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_secret')
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_job')
+    def test_setup_job_namespace_not_found(self, mock_create, mock_secret, mock_create_namespace, mock_get):
+        mock_secret.side_effect = [NamespaceNotFoundError('namespaces "test-namespace" not found'), mock.Mock()]
+
+        runner_data = KubernetesServiceData(
+            account_uuid='test-workspace-uuid',
+            runner_uuid='test-uuid',
+            oauth_client_id_base64='test-oauth',
+            oauth_client_secret_base64='test-secret',
+            runner_namespace='test-namespace',
+            repository_uuid=None,
+            requests_memory='4Gi',
+            requests_cpu='1000m',
+            limits_memory='4Gi',
+            limits_cpu='1000m'
+        )
+
+        service: KubernetesService = KubernetesService('test')
+        service.init('test-namespace')
+
+        mock_get.side_effect = NamespaceNotFoundError
+        service.setup_job(runner_data)
+
+        self.assertEqual(mock_get.call_count, 2)
+        mock_create_namespace.assert_called_once_with(namespace='test-namespace')
+        self.assertEqual(mock_secret.call_count, 2)
+        mock_create.assert_called_once()
+        self.assertIn('Namespace test-namespace not found. Creating it again...', self.caplog.text)
+
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_secret')
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_job')
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.load_config')
@@ -71,9 +125,46 @@ class KubernetesServiceTestCase(TestCase):
             service.setup_job(runner_data)
 
         mock_create.assert_called_once()
-        mock_config.assert_called_once()
+        # config is loaded lazily by the first request to Kubernetes API
+        mock_config.assert_not_called()
         mock_secret.assert_called_once()
 
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_secret')
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_job')
+    def test_setup_job_manifest_builder(self, mock_create, mock_secret):
+        runner_data = KubernetesServiceData(
+            account_uuid='test-workspace-uuid',
+            runner_uuid='test-uuid',
+            oauth_client_id_base64='test-oauth',
+            oauth_client_secret_base64='test-secret',
+            runner_namespace='test-namespace',
+            repository_uuid=None,
+            requests_memory='4Gi',
+            requests_cpu='1000m',
+            limits_memory='4Gi',
+            limits_cpu='1000m'
+        )
+
+        with tempfile.TemporaryDirectory() as template_dir:
+            with open(os.path.join(template_dir, 'job.yaml.template'), 'w') as f:
+                f.write(get_job_template())
+
+            with mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', template_dir):
+                service: KubernetesService = KubernetesService('test')
+
+                with mock.patch('autoscaler.core.constants.KUBERNETES_MANIFEST_BUILDER', False):
+                    service.setup_job(runner_data)
+                with mock.patch('autoscaler.core.constants.KUBERNETES_MANIFEST_BUILDER', True):
+                    service.setup_job(runner_data)
+
+        text_secret, built_secret = mock_secret.call_args_list
+        text_job, built_job = mock_create.call_args_list
+        self.assertEqual(text_secret, built_secret)
+        self.assertEqual(text_job, built_job)
+        self.assertEqual(built_job.args, ({
+            **built_job.args[0], 'metadata': {'name': 'runner-test-uuid'}
+        }, 'test-namespace'))
+
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.delete_secret')
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.delete_job')
     @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.load_config')
@@ -88,3 +179,94 @@ class KubernetesServiceTestCase(TestCase):
         service.delete_job(**runner_data)
 
         mock_delete_job.assert_called_once_with('test-uuid', 'test-namespace')
+
+    def test_get_runners_informer(self):
+        self.assertIsNone(KubernetesService.get_runners_informer())
+
+        with mock.patch('autoscaler.core.constants.KUBERNETES_INFORMER', True):
+            with mock.patch('autoscaler.services.kubernetes.runners_informer') as mock_informer:
+                mock_informer.synced = False
+                self.assertIsNone(KubernetesService.get_runners_informer())
+
+                mock_informer.synced = True
+                self.assertIs(KubernetesService.get_runners_informer(), mock_informer)
+
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.list_active_pods')
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.list_nodes')
+    def test_get_schedulable_runners_count(self, mock_nodes, mock_pods):
+        mock_nodes.return_value = []
+        mock_pods.return_value = []
+
+        runner_data = KubernetesServiceData(
+            account_uuid='test-workspace-uuid',
+            runner_uuid='test-uuid',
+            oauth_client_id_base64='test-oauth',
+            oauth_client_secret_base64='test-secret',
+            runner_namespace='test-namespace',
+            repository_uuid=None,
+            requests_memory='4Gi',
+            requests_cpu='1000m',
+            limits_memory='4Gi',
+            limits_cpu='1000m'
+        )
+
+        with tempfile.TemporaryDirectory() as template_dir:
+            with open(os.path.join(template_dir, 'job.yaml.template'), 'w') as f:
+                f.write(get_job_template())
+
+            with mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', template_dir):
+                service: KubernetesService = KubernetesService('test')
+
+                with mock.patch('autoscaler.services.kubernetes.ClusterCapacity.count_fits') as mock_count_fits:
+                    mock_count_fits.return_value = 3
+                    self.assertEqual(service.get_schedulable_runners_count(runner_data), 3)
+
+                pod_spec = mock_count_fits.call_args.args[0]
+                self.assertEqual(pod_spec['containers'][0]['resources']['requests'], {'memory': '4Gi', 'cpu': '1000m'})
+
+                mock_nodes.side_effect = ApiException(status=403, reason='Forbidden')
+                with self.caplog.at_level(logging.WARNING):
+                    self.assertIsNone(service.get_schedulable_runners_count(runner_data))
+
+        self.assertIn('Cluster capacity not checked: 403 Forbidden', self.caplog.text)
+
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.apply_deployment')
+    @mock.patch('autoscaler.clients.kubernetes.base.KubernetesPythonAPIService.create_priority_class')
+    def test_set_placeholders(self, mock_priority_class, mock_apply):
+        runner_data = KubernetesServiceData(
+            account_uuid='test-workspace-uuid',
+            runner_uuid='placeholder',
+            oauth_client_id_base64='',
+            oauth_client_secret_base64='',
+            runner_namespace='test-namespace',
+            repository_uuid=None,
+            requests_memory='4Gi',
+            requests_cpu='1000m',
+            limits_memory='4Gi',
+            limits_cpu='1000m'
+        )
+
+        with tempfile.TemporaryDirectory() as template_dir:
+            with open(os.path.join(template_dir, 'job.yaml.template'), 'w') as f:
+                f.write(get_job_template())
+
+            with mock.patch('autoscaler.clients.kubernetes.base.DEST_TEMPLATE_FILE_PATH', template_dir):
+                service: KubernetesService = KubernetesService('test')
+                service.set_placeholders('test[linux]', runner_data, 2)
+                service.set_placeholders('test[linux]', runner_data, 0)
+
+                mock_apply.side_effect = ApiException(status=403, reason='Forbidden')
+                with self.caplog.at_level(logging.WARNING):
+                    service.set_placeholders('test[linux]', runner_data, 1)
+
+        mock_priority_class.assert_called_once()
+        spec, namespace = mock_apply.call_args_list[0].args
+        self.assertEqual(namespace, 'test-namespace')
+        self.assertEqual(spec['metadata']['name'], get_placeholder_name('test[linux]'))
+        self.assertEqual(spec['spec']['replicas'], 2)
+        self.assertEqual(
+            spec['spec']['template']['spec']['containers'][0]['resources']['requests'],
+            {'memory': '4Gi', 'cpu': '1000m'}
+        )
+        self.assertEqual(mock_apply.call_args_list[1].args[0]['spec']['replicas'], 0)
+        self.assertIn('Runner placeholders not updated: 403 Forbidden', self.caplog.text)
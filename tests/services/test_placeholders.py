@@ -0,0 +1,210 @@
+import math
+from unittest import TestCase, mock
+
+from autoscaler.core.helpers import get_group_key
+from autoscaler.services.kubernetes import KubernetesService, KubernetesServiceData
+from autoscaler.services.placeholders import (
+    PRIORITY_CLASS_NAME, ScaleUpHistory, get_placeholder_name, get_placeholder_spec
+)
+
+RUNNER_POD_SPEC = {
+    'containers': [
+        {'name': 'runner', 'image': 'runner', 'resources': {'requests': {'memory': '4Gi', 'cpu': '1000m'}}},
+        {'name': 'docker', 'image': 'docker'},
+    ],
+    'nodeSelector': {'customer': 'shared'},
+}
+
+
+class FakeCluster:
+    """Nodes with room for `node_slots` runner-sized pods, scaled by a cluster autoscaler.
+
+    A node is ready `node_startup` seconds after pods could not be scheduled and removed when it is empty.
+    Pods with a higher priority preempt lower priority pods, as the Kubernetes scheduler does.
+    Preempted placeholder pods are created again by their deployment.
+    """
+
+    def __init__(self, node_slots=2, node_startup=120, pod_startup=5, job_duration=300):
+        self.node_slots = node_slots
+        self.node_startup = node_startup
+        self.pod_startup = pod_startup
+        self.job_duration = job_duration
+        self.now = 0
+        self.nodes = []
+        # ready times of the nodes being added
+        self.provisioning = []
+        self.pending = []
+        self.priority_classes = {}
+        self.placeholders = []
+        # runner name -> (created time, running time)
+        self.runners = {}
+
+    def create_priority_class(self, spec):
+        self.priority_classes[spec['metadata']['name']] = spec['value']
+
+    def apply_deployment(self, spec, namespace):
+        pod_spec = spec['spec']['template']['spec']
+        priority = self.priority_classes[pod_spec['priorityClassName']]
+
+        while len(self.placeholders) < spec['spec']['replicas']:
+            pod = {'name': f'placeholder-{len(self.placeholders)}', 'priority': priority}
+            self.placeholders.append(pod)
+            self.pending.append(pod)
+
+        while len(self.placeholders) > spec['spec']['replicas']:
+            pod = self.placeholders.pop()
+            for pods in [self.pending, *self.nodes]:
+                if pod in pods:
+                    pods.remove(pod)
+
+    def create_runner(self, name):
+        self.runners[name] = (self.now, None)
+        self.pending.append({'name': name, 'priority': 0})
+
+    def find_node(self, pod):
+        for node in self.nodes:
+            if len(node) < self.node_slots:
+                return node
+
+        for node in self.nodes:
+            for victim in node:
+                if victim['priority'] < pod['priority']:
+                    node.remove(victim)
+                    self.pending.append(victim)
+                    return node
+
+        return None
+
+    def schedule(self):
+        for pod in sorted(self.pending, key=lambda p: -p['priority']):
+            node = self.find_node(pod)
+            if node is None:
+                continue
+
+            self.pending.remove(pod)
+            node.append(pod)
+            if pod['name'] in self.runners:
+                self.runners[pod['name']] = (self.runners[pod['name']][0], self.now + self.pod_startup)
+
+        nodes_needed = math.ceil(len(self.pending) / self.node_slots) - len(self.provisioning)
+        self.provisioning.extend([self.now + self.node_startup] * max(nodes_needed, 0))
+
+    def tick(self, seconds):
+        for _ in range(seconds):
+            self.nodes.extend([] for ready_at in self.provisioning if ready_at <= self.now)
+            self.provisioning = [ready_at for ready_at in self.provisioning if ready_at > self.now]
+
+            for node in self.nodes:
+                node[:] = [
+                    pod for pod in node
+                    if pod['name'] not in self.runners
+                    or self.runners[pod['name']][1] + self.job_duration > self.now
+                ]
+
+            self.schedule()
+            self.nodes = [node for node in self.nodes if node]
+
+            self.now += 1
+
+    def get_time_to_running(self, names):
+        return [self.runners[name][1] - self.runners[name][0] for name in names]
+
+
+class ScaleUpHistoryTestCase(TestCase):
+
+    def test_get_headroom(self):
+        now = [0]
+        history = ScaleUpHistory(window=600, clock=lambda: now[0])
+
+        self.assertEqual(history.get_headroom('group-1'), 0)
+
+        history.add('group-1', 3)
+        now[0] = 300
+        history.add('group-1', 1)
+        history.add('group-2', 5)
+        history.add('group-1', 0)
+
+        self.assertEqual(history.get_headroom('group-1'), 3)
+        self.assertEqual(history.get_headroom('group-2'), 5)
+
+        now[0] = 600
+        self.assertEqual(history.get_headroom('group-1'), 1)
+
+        now[0] = 900
+        self.assertEqual(history.get_headroom('group-1'), 0)
+
+
+class PlaceholdersTestCase(TestCase):
+
+    def test_get_placeholder_name(self):
+        name = get_placeholder_name('Runner group 1 with a very long name, longer than the labels allow')
+
+        self.assertRegex(name, r'^runner-placeholder-runner-group-1-with-a-very-lon-[0-9a-f]{8}$')
+        self.assertLessEqual(len(name), 63)
+        self.assertNotEqual(get_placeholder_name('group 1'), get_placeholder_name('group-1'))
+
+    def test_get_placeholder_name_groups_same_name(self):
+        name = get_placeholder_name(get_group_key('group-1', {'linux', 'self.hosted'}))
+
+        self.assertRegex(name, r'^runner-placeholder-group-1-linux-self-hosted-[0-9a-f]{8}$')
+        self.assertNotEqual(name, get_placeholder_name(get_group_key('group-1', {'linux', 'gpu'})))
+
+    def test_get_placeholder_spec(self):
+        spec = get_placeholder_spec('group-1[linux]', RUNNER_POD_SPEC, 3, image='pause')
+
+        pod_spec = spec['spec']['template']['spec']
+        self.assertEqual(spec['spec']['replicas'], 3)
+        self.assertEqual(pod_spec['priorityClassName'], PRIORITY_CLASS_NAME)
+        self.assertEqual(pod_spec['nodeSelector'], {'customer': 'shared'})
+        self.assertEqual(pod_spec['containers'], [
+            {'name': 'placeholder-0', 'image': 'pause', 'resources': {'requests': {'memory': '4Gi', 'cpu': '1000m'}}},
+            {'name': 'placeholder-1', 'image': 'pause', 'resources': {'requests': {}}},
+        ])
+        self.assertEqual(spec['spec']['selector']['matchLabels'], spec['spec']['template']['metadata']['labels'])
+
+
+class PlaceholdersFakeClusterTestCase(TestCase):
+
+    def setUp(self):
+        KubernetesService.clear_cache()
+        self.addCleanup(KubernetesService.clear_cache)
+
+    def run_scale_ups(self, headroom, scale_ups=4, runners_count=3, interval=600):
+        """Time in seconds from the runner job creation to its pod Running, for every scale up."""
+        cluster = FakeCluster()
+        history = ScaleUpHistory(window=3600, clock=lambda: cluster.now)
+
+        service = KubernetesService('group-1')
+        service.kube_python_api = mock.Mock(
+            create_priority_class=cluster.create_priority_class, apply_deployment=cluster.apply_deployment
+        )
+        runner_spec = {'items': [{}, {'spec': {'template': {'spec': RUNNER_POD_SPEC}}}]}
+        data = KubernetesServiceData(
+            account_uuid='workspace', repository_uuid=None, runner_uuid='placeholder', oauth_client_id_base64='',
+            oauth_client_secret_base64='', runner_namespace='runners', requests_memory='4Gi', requests_cpu='1000m',
+            limits_memory='4Gi', limits_cpu='1000m'
+        )
+
+        times = []
+        with mock.patch.object(service, 'get_runner_spec', return_value=runner_spec):
+            for scale_up in range(scale_ups):
+                names = [f'runner-{scale_up}-{i}' for i in range(runners_count)]
+                history.add('group-1[linux]', runners_count)
+                for name in names:
+                    cluster.create_runner(name)
+
+                if headroom:
+                    service.set_placeholders('group-1[linux]', data, history.get_headroom('group-1[linux]'))
+
+                cluster.tick(interval)
+                times.append(max(cluster.get_time_to_running(names)))
+
+        return times
+
+    def test_time_to_running(self):
+        without_headroom = self.run_scale_ups(headroom=False)
+        with_headroom = self.run_scale_ups(headroom=True)
+
+        # the first scale up waits for new nodes, the placeholders are sized by it
+        self.assertEqual(without_headroom, [125, 125, 125, 125])
+        self.assertEqual(with_headroom, [125, 5, 5, 5])
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from unittest import TestCase, mock
+
+from autoscaler.core.validators import NameUUIDData
+from autoscaler.services.bitbucket import BitbucketService
+from autoscaler.services.runners_snapshot import RunnersSnapshot
+
+from tests.helpers import FakeClock
+
+
+class RunnersSnapshotTestCase(TestCase):
+
+    def test_get_key(self):
+        workspace = NameUUIDData(name='workspace-test', uuid='{workspace-test-uuid}')
+        repository = NameUUIDData(name='repository-test', uuid='{repository-test-uuid}')
+
+        self.assertEqual(RunnersSnapshot.get_key(workspace), ('{workspace-test-uuid}', None))
+        self.assertEqual(
+            RunnersSnapshot.get_key(workspace, repository),
+            ('{workspace-test-uuid}', '{repository-test-uuid}')
+        )
+
+    def test_get_loaded_once(self):
+        snapshot = RunnersSnapshot()
+        load = mock.Mock(return_value=[{'uuid': 'foo'}])
+
+        self.assertEqual(snapshot.get(('ws', None), load), [{'uuid': 'foo'}])
+        self.assertEqual(snapshot.get(('ws', None), load), [{'uuid': 'foo'}])
+
+        load.assert_called_once()
+        self.assertEqual(snapshot.stats(), {'loads': 1, 'hits': 1})
+
+    def test_get_keys_separated(self):
+        snapshot = RunnersSnapshot()
+
+        snapshot.get(('ws', None), lambda: ['foo'])
+
+        self.assertEqual(snapshot.get(('ws', 'repo'), lambda: ['bar']), ['bar'])
+
+    def test_get_returns_copy(self):
+        snapshot = RunnersSnapshot()
+
+        runners = snapshot.get(('ws', None), lambda: ['foo'])
+        runners.append('bar')
+
+        self.assertEqual(snapshot.get(('ws', None), lambda: []), ['foo'])
+
+    def test_get_single_flight(self):
+        snapshot = RunnersSnapshot()
+        load = mock.Mock(side_effect=lambda: time.sleep(0.1) or ['foo'])
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(snapshot.get(('ws', None), load))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        load.assert_called_once()
+        self.assertEqual(results, [['foo']] * 5)
+
+    def test_invalidate(self):
+        snapshot = RunnersSnapshot()
+        snapshot.get(('ws', None), lambda: ['foo'])
+
+        snapshot.invalidate(('ws', None))
+
+        self.assertEqual(snapshot.get(('ws', None), lambda: ['foo', 'bar']), ['foo', 'bar'])
+
+    def test_get_expired(self):
+        clock = FakeClock()
+        snapshot = RunnersSnapshot(ttl=60, clock=clock)
+        load = mock.Mock(return_value=['foo'])
+
+        snapshot.get(('ws', None), load)
+        clock.sleep(59)
+        snapshot.get(('ws', None), load)
+        self.assertEqual(load.call_count, 1)
+
+        clock.sleep(1)
+        snapshot.get(('ws', None), load)
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(snapshot.stats(), {'loads': 2, 'hits': 1})
+
+    def test_invalidate_before_expired(self):
+        clock = FakeClock()
+        snapshot = RunnersSnapshot(ttl=60, clock=clock)
+        snapshot.get(('ws', None), lambda: ['foo'])
+
+        clock.sleep(10)
+        snapshot.invalidate(('ws', None))
+
+        self.assertEqual(snapshot.get(('ws', None), lambda: ['foo', 'bar']), ['foo', 'bar'])
+
+    def test_invalidate_while_loading(self):
+        snapshot = RunnersSnapshot()
+
+        def load():
+            # runner created by another group while the list is being loaded
+            snapshot.invalidate(('ws', None))
+            return ['foo']
+
+        self.assertEqual(snapshot.get(('ws', None), load), ['foo'])
+        self.assertEqual(snapshot.get(('ws', None), lambda: ['foo', 'bar']), ['foo', 'bar'])
+
+
+@mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
+class BitbucketServiceRunnersSnapshotTestCase(TestCase):
+
+    def setUp(self):
+        self.workspace = NameUUIDData(name='workspace-test', uuid='{workspace-test-uuid}')
+        self.snapshot = RunnersSnapshot()
+
+    @mock.patch('autoscaler.clients.bitbucket.base.BitbucketWorkspaceRunner.get_runners')
+    def test_groups_share_runners(self, mock_get_runners):
+        mock_get_runners.return_value = [{'uuid': 'foo'}]
+
+        first_group_runners = BitbucketService('group1', self.snapshot).get_bitbucket_runners(self.workspace)
+        second_group_runners = BitbucketService('group2', self.snapshot).get_bitbucket_runners(self.workspace)
+
+        self.assertEqual(first_group_runners, second_group_runners)
+        mock_get_runners.assert_called_once_with(self.workspace.uuid)
+
+    @mock.patch('autoscaler.clients.bitbucket.base.BitbucketWorkspaceRunner.create_runner')
+    @mock.patch('autoscaler.clients.bitbucket.base.BitbucketWorkspaceRunner.get_runners')
+    def test_invalidated_after_create(self, mock_get_runners, mock_create_runner):
+        mock_get_runners.side_effect = [[{'uuid': 'foo'}], [{'uuid': 'foo'}, {'uuid': 'bar'}]]
+        mock_create_runner.return_value = {'uuid': 'bar', 'oauth_client': {'id': 'id', 'secret': 'secret'}}
+
+        BitbucketService('group1', self.snapshot).get_bitbucket_runners(self.workspace)
+        BitbucketService('group1', self.snapshot).create_bitbucket_runner(self.workspace, 'group1', {'label'})
+        runners = BitbucketService('group2', self.snapshot).get_bitbucket_runners(self.workspace)
+
+        self.assertEqual(runners, [{'uuid': 'foo'}, {'uuid': 'bar'}])
+
+    @mock.patch('autoscaler.clients.bitbucket.base.BitbucketWorkspaceRunner.disable_runner')
+    @mock.patch('autoscaler.clients.bitbucket.base.BitbucketWorkspaceRunner.get_runners')
+    def test_invalidated_after_disable(self, mock_get_runners, mock_disable_runner):
+        mock_get_runners.return_value = [{'uuid': 'foo'}]
+
+        service = BitbucketService('group1', self.snapshot)
+        service.get_bitbucket_runners(self.workspace)
+        service.disable_bitbucket_runner(self.workspace, 'foo')
+        service.get_bitbucket_runners(self.workspace)
+
+        self.assertEqual(mock_get_runners.call_count, 2)
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+
+import pytest
+
+from autoscaler.core.exceptions import AutoscalerHTTPError
+from autoscaler.services.uuid_cache import UUIDCache
+
+WORKSPACE_DATA = {'uuid': '{workspace-uuid}', 'name': 'workspace'}
+
+
+class UUIDCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 1000
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.file_path = os.path.join(self.cache_dir.name, 'uuid_cache.json')
+
+    def get_cache(self, **kwargs):
+        return UUIDCache(file_path=self.file_path, ttl=60, negative_ttl=10, clock=lambda: self.now, **kwargs)
+
+    def test_get(self):
+        load = mock.Mock(return_value=WORKSPACE_DATA)
+        cache = self.get_cache()
+
+        self.assertEqual(cache.get('workspace:workspace', load), WORKSPACE_DATA)
+        self.assertEqual(cache.get('workspace:workspace', load), WORKSPACE_DATA)
+
+        load.assert_called_once()
+        self.assertEqual(cache.stats(), {'loads': 1, 'hits': 1})
+
+    def test_get_expired(self):
+        load = mock.Mock(return_value=WORKSPACE_DATA)
+        cache = self.get_cache()
+
+        cache.get('workspace:workspace', load)
+        self.now += 60
+        cache.get('workspace:workspace', load)
+
+        self.assertEqual(load.call_count, 2)
+
+    def test_get_not_found(self):
+        load = mock.Mock(side_effect=AutoscalerHTTPError('Not found', status_code=404))
+        cache = self.get_cache()
+
+        for _ in range(2):
+            with pytest.raises(AutoscalerHTTPError) as e:
+                cache.get('workspace:workspace', load)
+            self.assertEqual(e.value.status_code, 404)
+
+        load.assert_called_once()
+
+        self.now += 10
+        with pytest.raises(AutoscalerHTTPError):
+            cache.get('workspace:workspace', load)
+
+        self.assertEqual(load.call_count, 2)
+
+    def test_get_error_not_cached(self):
+        load = mock.Mock(side_effect=[AutoscalerHTTPError('Bad gateway', status_code=502), WORKSPACE_DATA])
+        cache = self.get_cache()
+
+        with pytest.raises(AutoscalerHTTPError):
+            cache.get('workspace:workspace', load)
+
+        self.assertEqual(cache.get('workspace:workspace', load), WORKSPACE_DATA)
+
+    def test_get_single_load(self):
+        def load():
+            time.sleep(0.05)
+            return WORKSPACE_DATA
+
+        load = mock.Mock(side_effect=load)
+        cache = self.get_cache()
+
+        threads = [threading.Thread(target=cache.get, args=('workspace:workspace', load)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        load.assert_called_once()
+
+    def test_persisted(self):
+        self.get_cache().get('workspace:workspace', lambda: WORKSPACE_DATA)
+
+        load = mock.Mock(return_value=WORKSPACE_DATA)
+        self.assertEqual(self.get_cache().get('workspace:workspace', load), WORKSPACE_DATA)
+        load.assert_not_called()
+
+        # expired entries are not loaded from the file
+        self.now += 60
+        cache = self.get_cache()
+        cache.get('workspace:workspace', load)
+        load.assert_called_once()
+        self.assertEqual(os.listdir(self.cache_dir.name), ['uuid_cache.json'])
+
+    def test_broken_file(self):
+        with open(self.file_path, 'w') as f:
+            f.write('{"workspace:')
+
+        self.assertEqual(self.get_cache().get('workspace:workspace', lambda: WORKSPACE_DATA), WORKSPACE_DATA)
@@ -1,14 +1,18 @@
 import logging
 import os
+from datetime import datetime, timedelta, timezone
 from unittest import TestCase, mock
 
 import pytest
 
+from autoscaler.core.exceptions import AutoscalerHTTPError
+from autoscaler.core.stabilization import SCALE_UP, FlapDetector, ScalingDecisions
 from autoscaler.core.validators import Constants, NameUUIDData, PctRunnersIdleParameters, KubernetesJobResources
 from autoscaler.services.kubernetes import KubernetesInMemoryService
 from autoscaler.services.bitbucket import BitbucketServiceData
+from autoscaler.services.placeholders import ScaleUpHistory
 from autoscaler.strategy.pct_runners_idle import PctRunnersIdleScaler, PctRunnersIdleData
-from tests.helpers import capture_output
+from tests.helpers import FakeClock, capture_output
 
 
 @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test', 'DEBUG': 'true'})
@@ -584,6 +588,489 @@ class BitbucketRunnerAutoscalerTestCase(TestCase):
         )
 
         with self.caplog.at_level(logging.WARNING):
-            service.create_runner(2)
+            service.register_runner(2)
 
         self.assertIn('Max Runners count limit reached 1 per workspace workspace-test repository: repository-test', self.caplog.text)
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.get_runners')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.create_bitbucket_runner')
+    def test_create_additional_runners_single_listing(self, mock_create_runner, mock_get_runners):
+        mock_get_runners.return_value = [
+            {
+                'created_on': '2021-09-29T23:28:04.683210Z',
+                'labels': ['test', 'self.hosted', 'linux'],
+                'name': 'good',
+                'state': {
+                    'status': 'ONLINE',
+                    'updated_on': '2021-09-29T23:55:14.857790Z',
+                    'step': 'busy'
+                },
+                'uuid': '{670ea89c-e64d-5923-8ccc-06d67fae8039}'}
+        ]
+
+        runner_data = PctRunnersIdleData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            labels={'self.hosted', 'test', 'linux'},
+            strategy='percentageRunnersIdle',
+            parameters=PctRunnersIdleParameters(
+                min=1,
+                max=10,
+                scale_up_threshold=0.5,
+                scale_down_threshold=0.2,
+                scale_up_multiplier=4,
+                scale_down_multiplier=0.5
+            ),
+            resources=KubernetesJobResources()
+        )
+
+        service = PctRunnersIdleScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_setup=0),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+
+        mock_create_runner.side_effect = [
+            BitbucketServiceData(
+                account_uuid='{workspace-test-uuid}',
+                repository_uuid=None,
+                runner_uuid=f'test-runner-uuid-{i}',
+                oauth_client_id_base64='testbase64=',
+                oauth_client_secret_base64='testsecret=='
+            ) for i in range(3)
+        ]
+
+        with capture_output():
+            service.run()
+
+        self.assertEqual(mock_create_runner.call_count, 3)
+        mock_get_runners.assert_called_once()
+        self.assertEqual(service.runner_ledger.stats(), {'ONLINE': 1, 'UNREGISTERED': 3})
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.MAX_RUNNERS_COUNT', 2)
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.get_runners')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.create_bitbucket_runner')
+    def test_create_additional_runners_ledger_limit(self, mock_create_runner, mock_get_runners):
+        mock_get_runners.return_value = [
+            {
+                'created_on': '2021-09-29T23:28:04.683210Z',
+                'labels': ['test', 'self.hosted', 'linux'],
+                'name': 'good',
+                'state': {
+                    'status': 'ONLINE',
+                    'updated_on': '2021-09-29T23:55:14.857790Z',
+                    'step': 'busy'
+                },
+                'uuid': '{670ea89c-e64d-5923-8ccc-06d67fae8039}'}
+        ]
+
+        runner_data = PctRunnersIdleData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            labels={'self.hosted', 'test', 'linux'},
+            strategy='percentageRunnersIdle',
+            parameters=PctRunnersIdleParameters(
+                min=1,
+                max=10,
+                scale_up_threshold=0.5,
+                scale_down_threshold=0.2,
+                scale_up_multiplier=4,
+                scale_down_multiplier=0.5
+            ),
+            resources=KubernetesJobResources()
+        )
+
+        service = PctRunnersIdleScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_setup=0),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+
+        mock_create_runner.return_value = BitbucketServiceData(
+            account_uuid='{workspace-test-uuid}',
+            repository_uuid=None,
+            runner_uuid='test-runner-uuid',
+            oauth_client_id_base64='testbase64=',
+            oauth_client_secret_base64='testsecret=='
+        )
+
+        with capture_output():
+            with self.caplog.at_level(logging.WARNING):
+                service.run()
+
+        mock_create_runner.assert_called_once()
+        self.assertIn('Max Runners count limit reached 2 per workspace workspace-test', self.caplog.text)
+
+    @mock.patch('autoscaler.services.kubernetes.KubernetesInMemoryService.setup_job')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.create_bitbucket_runner')
+    def test_create_runners_stage_failed(self, mock_create_runner, mock_setup_job):
+        runner_data = PctRunnersIdleData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            labels={'self.hosted', 'test', 'linux'},
+            strategy='percentageRunnersIdle',
+            parameters=PctRunnersIdleParameters(
+                min=3,
+                max=10,
+                scale_up_threshold=0.5,
+                scale_down_threshold=0.2,
+                scale_up_multiplier=1.5,
+                scale_down_multiplier=0.5
+            ),
+            resources=KubernetesJobResources()
+        )
+
+        service = PctRunnersIdleScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_setup=0, runner_setup_concurrency=3),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+        service.runner_ledger.seed([])
+
+        mock_create_runner.side_effect = [
+            BitbucketServiceData(
+                account_uuid='{workspace-test-uuid}',
+                repository_uuid=None,
+                runner_uuid=f'test-runner-uuid-{i}',
+                oauth_client_id_base64='testbase64=',
+                oauth_client_secret_base64='testsecret=='
+            ) for i in range(3)
+        ]
+        mock_setup_job.side_effect = lambda data: data.runner_uuid.endswith('1') and 1 / 0
+
+        with capture_output() as out:
+            with self.caplog.at_level(logging.INFO):
+                service.create_runners(3)
+
+        self.assertEqual(out.getvalue().count('Successfully setup runner UUID'), 2)
+        self.assertIn('setup failed on kubernetes stage: division by zero', self.caplog.text)
+        self.assertIn("'succeeded': 2, 'failed': 1", self.caplog.text)
+        self.assertEqual(service.runner_ledger.count(), 3)
+
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.disable_bitbucket_runner')
+    def test_disable_runners_partial_failure(self, mock_disable_runner):
+        runners_idle = [
+            {
+                'created_on': '2021-09-29T23:28:04.683210Z',
+                'labels': ['test', 'self.hosted', 'linux'],
+                'state': {'status': 'ONLINE'},
+                'uuid': f'{{runner-{i}}}'
+            } for i in range(4)
+        ]
+
+        runner_data = PctRunnersIdleData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            labels={'self.hosted', 'test', 'linux'},
+            strategy='percentageRunnersIdle',
+            parameters=PctRunnersIdleParameters(
+                min=0,
+                max=10,
+                scale_up_threshold=0.5,
+                scale_down_threshold=0.2,
+                scale_up_multiplier=1.5,
+                scale_down_multiplier=0.5
+            ),
+            resources=KubernetesJobResources()
+        )
+
+        service = PctRunnersIdleScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_delete=0, runner_delete_concurrency=4),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+        service.runner_ledger.seed(runners_idle)
+
+        attempts = {}
+
+        def disable_runner(workspace, runner_uuid, repository):
+            attempts[runner_uuid] = attempts.get(runner_uuid, 0) + 1
+            # runner-1 fails once, runner-2 fails always
+            if runner_uuid == '{runner-2}' or (runner_uuid == '{runner-1}' and attempts[runner_uuid] == 1):
+                raise AutoscalerHTTPError('Bad gateway', status_code=502)
+
+        mock_disable_runner.side_effect = disable_runner
+
+        with capture_output() as out:
+            with self.caplog.at_level(logging.INFO):
+                summary = service.disable_runners(runners_idle)
+
+        self.assertEqual(summary, {
+            '{runner-0}': 'disabled',
+            '{runner-1}': 'disabled',
+            '{runner-2}': 'failed: Status code: 502. Bad gateway',
+            '{runner-3}': 'disabled',
+        })
+        self.assertEqual(attempts, {'{runner-0}': 1, '{runner-1}': 2, '{runner-2}': 3, '{runner-3}': 1})
+        self.assertEqual(out.getvalue().count('Successfully disabled runner UUID'), 3)
+        self.assertIn('Runner UUID {runner-2} disabling failed after 3 attempts', self.caplog.text)
+        self.assertEqual(service.runner_ledger.stats(), {'DISABLED': 3, 'ONLINE': 1})
+
+    def get_scaler(self, kubernetes_service=None, labels=None, **constants):
+        runner_data = PctRunnersIdleData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            labels=labels or {'self.hosted', 'test', 'linux'},
+            strategy='percentageRunnersIdle',
+            parameters=PctRunnersIdleParameters(
+                min=1,
+                max=10,
+                scale_up_threshold=0.5,
+                scale_down_threshold=0.2,
+                scale_up_multiplier=1.5,
+                scale_down_multiplier=0.5
+            ),
+            resources=KubernetesJobResources()
+        )
+
+        return PctRunnersIdleScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_setup=0, **constants),
+            kubernetes_service=kubernetes_service or KubernetesInMemoryService()
+        )
+
+    @staticmethod
+    def get_runner(uuid, status, created_on='2021-09-29T23:28:04.683210Z', step=None, labels=('test', 'self.hosted', 'linux')):
+        state = {'status': status}
+        if step is not None:
+            state['step'] = step
+
+        return {'created_on': created_on, 'labels': list(labels), 'state': state, 'uuid': uuid}
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.get_runners')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.create_bitbucket_runner')
+    def test_run_pending_runners_counted(self, mock_create_runner, mock_get_runners):
+        created_recently = (datetime.now(timezone.utc) - timedelta(seconds=60)).isoformat()
+        mock_get_runners.return_value = [
+            self.get_runner('{runner-1}', 'ONLINE', step='busy'),
+            self.get_runner('{runner-2}', 'UNREGISTERED', created_on=created_recently),
+            # created long ago, not provisioning anymore
+            self.get_runner('{runner-3}', 'OFFLINE'),
+        ]
+
+        service = self.get_scaler()
+
+        with self.caplog.at_level(logging.INFO):
+            service.run()
+
+        # 1 busy runner of 2 online and pending is not above the scale up threshold
+        mock_create_runner.assert_not_called()
+        self.assertIn('Found PENDING runners with labels', self.caplog.text)
+        self.assertIn('current: 1, pending: 1', self.caplog.text)
+        self.assertIn('Current runners threshold: 0.5', self.caplog.text)
+
+    def test_get_pending_runners_informer(self):
+        created_recently = (datetime.now(timezone.utc) - timedelta(seconds=60)).isoformat()
+        runners_informer = mock.Mock()
+        runners_informer.get_pod_phase.side_effect = lambda runner_uuid: 'Failed' if runner_uuid == 'runner-2' else 'Pending'
+        runners_informer.get_pending_reasons.return_value = ['Unschedulable']
+        kubernetes_service = KubernetesInMemoryService()
+        kubernetes_service.get_runners_informer = mock.Mock(return_value=runners_informer)
+
+        service = self.get_scaler(kubernetes_service)
+
+        with self.caplog.at_level(logging.INFO):
+            pending_runners = service.get_pending_runners([
+                self.get_runner('{runner-1}', 'UNREGISTERED', created_on=created_recently),
+                self.get_runner('{runner-2}', 'UNREGISTERED', created_on=created_recently),
+            ])
+
+        self.assertEqual([r['uuid'] for r in pending_runners], ['{runner-1}'])
+        self.assertIn("PENDING runners reasons: {'Unschedulable': 1}", self.caplog.text)
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.KUBERNETES_CAPACITY_GATE', True)
+    def test_limit_to_cluster_capacity(self):
+        kubernetes_service = KubernetesInMemoryService()
+        kubernetes_service.get_schedulable_runners_count = mock.Mock(return_value=2)
+
+        service = self.get_scaler(kubernetes_service)
+
+        with self.caplog.at_level(logging.WARNING):
+            self.assertEqual(service.limit_to_cluster_capacity(5), 2)
+            self.assertEqual(service.limit_to_cluster_capacity(1), 1)
+
+        self.assertIn(
+            'Cluster capacity is enough for 2 of 5 new runners. Runners blocked by cluster capacity: 3',
+            self.caplog.text
+        )
+        data = kubernetes_service.get_schedulable_runners_count.call_args[0][0]
+        self.assertEqual(data.runner_namespace, 'test')
+
+    def test_limit_to_cluster_capacity_disabled(self):
+        kubernetes_service = KubernetesInMemoryService()
+        kubernetes_service.get_schedulable_runners_count = mock.Mock(return_value=0)
+
+        service = self.get_scaler(kubernetes_service)
+
+        self.assertEqual(service.limit_to_cluster_capacity(5), 5)
+        kubernetes_service.get_schedulable_runners_count.assert_not_called()
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.RUNNER_HEADROOM', True)
+    @mock.patch('autoscaler.strategy.pct_runners_idle.scale_up_history', ScaleUpHistory())
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.get_runners')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.create_bitbucket_runner')
+    def test_process_headroom(self, mock_create_runner, mock_get_runners):
+        mock_get_runners.return_value = [self.get_runner('{runner-1}', 'ONLINE', step='busy')]
+        mock_create_runner.return_value = BitbucketServiceData(
+            account_uuid='{workspace-test-uuid}',
+            repository_uuid=None,
+            runner_uuid='{runner-2}',
+            oauth_client_id_base64='',
+            oauth_client_secret_base64=''
+        )
+        kubernetes_service = KubernetesInMemoryService()
+        kubernetes_service.set_placeholders = mock.Mock()
+
+        service = self.get_scaler(kubernetes_service)
+        service.process()
+
+        # 1 busy runner is scaled up by 1.5 to 2 runners
+        group_key, data, headroom = kubernetes_service.set_placeholders.call_args.args
+        self.assertEqual((group_key, headroom), ('good[linux,self.hosted,test]', 1))
+        self.assertEqual(data.runner_namespace, 'test')
+        self.assertEqual(data.requests_memory, service.runner_data.resources.requests.memory)
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.get_runners')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.create_bitbucket_runner')
+    def test_process_polling_activity(self, mock_create_runner, mock_get_runners):
+        mock_get_runners.return_value = [
+            self.get_runner('{runner-1}', 'ONLINE', step='busy'),
+            self.get_runner('{runner-2}', 'ONLINE'),
+            self.get_runner('{runner-3}', 'ONLINE'),
+            self.get_runner('{runner-4}', 'ONLINE'),
+        ]
+
+        activity = self.get_scaler().process()
+
+        # 1 busy runner of 4 is stable, nothing to scale
+        mock_create_runner.assert_not_called()
+        self.assertEqual((activity.busy_ratio, activity.scale_up_threshold, activity.in_flight), (0.25, 0.5, False))
+
+        mock_get_runners.return_value = [self.get_runner('{runner-1}', 'ONLINE', step='busy')]
+
+        activity = self.get_scaler().process()
+
+        mock_create_runner.assert_called_once()
+        self.assertEqual((activity.busy_ratio, activity.in_flight), (1.0, True))
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.get_runners')
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.disable_runners')
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.create_runners')
+    def test_run_scale_down_stabilized(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        clock = FakeClock()
+        busy_runners = [self.get_runner(f'{{runner-{i}}}', 'ONLINE', step='busy') for i in range(4)]
+        idle_runners = [self.get_runner(f'{{runner-{i}}}', 'ONLINE') for i in range(6)]
+
+        with mock.patch('autoscaler.strategy.pct_runners_idle.scaling_decisions', ScalingDecisions(clock)):
+            mock_get_runners.return_value = busy_runners
+            self.get_scaler(scale_down_stabilization_window=300).run()
+
+            # 4 busy runners are scaled up to 6
+            mock_create_runners.assert_called_once_with(2)
+
+            clock.sleep(60)
+            mock_get_runners.return_value = idle_runners
+            with self.caplog.at_level(logging.INFO):
+                self.get_scaler(scale_down_stabilization_window=300).run()
+
+            mock_disable_runners.assert_not_called()
+            self.assertIn(
+                'Scale down to 3 runners limited to 6 runners, the max desired runners count within the last 300 seconds.',
+                self.caplog.text
+            )
+
+            clock.sleep(240)
+            self.get_scaler(scale_down_stabilization_window=300).run()
+
+            self.assertEqual(len(mock_disable_runners.call_args.args[0]), 3)
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.get_runners')
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.disable_runners')
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.create_runners')
+    def test_run_scale_down_stabilized_groups_same_name(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        clock = FakeClock()
+
+        with mock.patch('autoscaler.strategy.pct_runners_idle.scaling_decisions', ScalingDecisions(clock)):
+            mock_get_runners.return_value = [
+                self.get_runner(f'{{runner-{i}}}', 'ONLINE', step='busy', labels=('self.hosted', 'gpu')) for i in range(4)
+            ]
+            self.get_scaler(labels={'self.hosted', 'gpu'}, scale_down_stabilization_window=300).run()
+
+            mock_create_runners.assert_called_once_with(2)
+
+            # the group with the same name and other labels is not limited by the scale up of the first group
+            clock.sleep(60)
+            mock_get_runners.return_value = [self.get_runner(f'{{runner-{i}}}', 'ONLINE') for i in range(6)]
+            self.get_scaler(scale_down_stabilization_window=300).run()
+
+            self.assertEqual(len(mock_disable_runners.call_args.args[0]), 3)
+
+    def test_group_key(self):
+        self.assertEqual(self.get_scaler().group_key, 'good[linux,self.hosted,test]')
+        self.assertNotEqual(self.get_scaler().group_key, self.get_scaler(labels={'self.hosted', 'gpu'}).group_key)
+
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.disable_bitbucket_runner')
+    def test_disable_runners_flapping(self, mock_disable_runner):
+        clock = FakeClock()
+        detector = FlapDetector(clock)
+        runners_idle = [self.get_runner('{runner-1}', 'ONLINE')]
+
+        with mock.patch('autoscaler.strategy.pct_runners_idle.flap_detector', detector):
+            service = self.get_scaler(flap_detection_window=600, flap_max_reversals=1)
+
+            detector.add(service.group_key, SCALE_UP, window=600)
+            clock.sleep(60)
+            self.assertEqual(service.disable_runners(runners_idle), {'{runner-1}': 'disabled'})
+
+            clock.sleep(60)
+            detector.add(service.group_key, SCALE_UP, window=600)
+            clock.sleep(60)
+            with self.caplog.at_level(logging.WARNING):
+                self.assertEqual(service.disable_runners(runners_idle), {})
+
+            # the group with the same name and other labels is not flapping
+            other_service = self.get_scaler(labels={'self.hosted', 'gpu'}, flap_detection_window=600, flap_max_reversals=1)
+            self.assertEqual(other_service.disable_runners(runners_idle), {'{runner-1}': 'disabled'})
+
+        self.assertEqual(mock_disable_runner.call_count, 2)
+        self.assertIn(
+            'Scale down suppressed. Scaling actions are flapping between scale up and scale down '
+            'more than 1 times within 600 seconds. Scale downs suppressed: 1',
+            self.caplog.text
+        )
+
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.disable_bitbucket_runner')
+    def test_disable_runners_not_found(self, mock_disable_runner):
+        mock_disable_runner.side_effect = AutoscalerHTTPError('Runner not found', status_code=404)
+        service = self.get_scaler(default_sleep_time_runner_delete=0)
+
+        with capture_output():
+            summary = service.disable_runners([self.get_runner('{runner-1}', 'ONLINE')])
+
+        self.assertEqual(summary, {'{runner-1}': 'disabled'})
+        mock_disable_runner.assert_called_once()
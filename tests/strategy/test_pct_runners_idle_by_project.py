@@ -0,0 +1,157 @@
+import logging
+import os
+from unittest import TestCase, mock
+
+import pytest
+
+from autoscaler.core.exceptions import AutoscalerHTTPError
+from autoscaler.core.validators import Constants, NameUUIDData, PctRunnersIdleParameters, KubernetesJobResources
+from autoscaler.services.bitbucket_by_project import BitbucketByProjectServiceData, RepositoryData
+from autoscaler.services.kubernetes import KubernetesInMemoryService
+from autoscaler.strategy.pct_runners_idle_by_project import PctRunnersIdleByProjectData, PctRunnersIdleByProjectScaler
+
+
+@mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
+@mock.patch('autoscaler.services.bitbucket_by_project.BitbucketByProjectService.get_bitbucket_workspace_repository_uuids')
+@mock.patch('autoscaler.services.bitbucket_by_project.BitbucketByProjectService.get_bitbucket_runners')
+class PctRunnersIdleByProjectScalerTestCase(TestCase):
+
+    @pytest.fixture(autouse=True)
+    def inject_fixtures(self, caplog):
+        self.caplog = caplog
+
+    def setUp(self):
+        self.repositories = [
+            RepositoryData(uuid='{repository-1-uuid}', name='repository-1'),
+            RepositoryData(uuid='{repository-2-uuid}', name='repository-2'),
+        ]
+        self.kubernetes_service = KubernetesInMemoryService()
+
+    def get_scaler(self, **parameters):
+        runner_data = PctRunnersIdleByProjectData(
+            workspace=NameUUIDData(name='workspace-test', uuid='{workspace-test-uuid}'),
+            project=NameUUIDData(name='project-test', uuid='{project-test-uuid}'),
+            name='good',
+            namespace='test',
+            labels={'self.hosted', 'test', 'linux'},
+            strategy='percentageRunnersIdleByProject',
+            parameters=PctRunnersIdleParameters(**{
+                'min': 1,
+                'max': 10,
+                'scale_up_threshold': 0.5,
+                'scale_down_threshold': 0.2,
+                'scale_up_multiplier': 1.5,
+                'scale_down_multiplier': 0.5,
+                **parameters,
+            }),
+            resources=KubernetesJobResources()
+        )
+
+        return PctRunnersIdleByProjectScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_setup=0, default_sleep_time_runner_delete=0),
+            kubernetes_service=self.kubernetes_service
+        )
+
+    @staticmethod
+    def get_runners(busy, idle, prefix='runner'):
+        return [
+            {
+                'created_on': '2021-09-29T23:28:04.683210Z',
+                'labels': ['test', 'self.hosted', 'linux'],
+                'state': {'status': 'ONLINE', **({'step': 'busy'} if i < busy else {})},
+                'uuid': f'{{{prefix}-{i}}}',
+            }
+            for i in range(busy + idle)
+        ]
+
+    @staticmethod
+    def get_runner_data(runner_uuid, repository):
+        return BitbucketByProjectServiceData(
+            account_uuid='{workspace-test-uuid}',
+            project=repository.uuid,
+            runner_uuid=runner_uuid,
+            oauth_client_id_base64='id',
+            oauth_client_secret_base64='secret'
+        )
+
+    @mock.patch('autoscaler.services.bitbucket_by_project.BitbucketByProjectService.create_bitbucket_runner')
+    def test_run_create_runners_in_every_repository(self, mock_create_runner, mock_get_runners, mock_get_repositories):
+        mock_get_repositories.return_value = None, self.repositories
+        mock_get_runners.return_value = []
+        mock_create_runner.side_effect = lambda workspace, name, labels, repository: self.get_runner_data(
+            f'{{{repository.name}-runner}}', repository
+        )
+
+        with self.caplog.at_level(logging.INFO):
+            self.get_scaler(min=1).run()
+
+        self.assertEqual(
+            [call.kwargs['repository'] for call in mock_create_runner.call_args_list], self.repositories
+        )
+        self.assertEqual(
+            {uuid: data.repository_uuid for uuid, data in self.kubernetes_service.running_jobs.items()},
+            {'repository-1-runner': 'repository-1-uuid', 'repository-2-runner': 'repository-2-uuid'}
+        )
+        self.assertIn(
+            'Found 0 runners on workspace workspace-test project: {project-test-uuid}, repository: {repository-2-uuid}',
+            self.caplog.text
+        )
+
+    @mock.patch('autoscaler.services.bitbucket_by_project.BitbucketByProjectService.disable_bitbucket_runner')
+    def test_run_disable_runners_in_repository(self, mock_disable_runner, mock_get_runners, mock_get_repositories):
+        mock_get_repositories.return_value = None, self.repositories
+        mock_get_runners.side_effect = lambda workspace, repository: (
+            self.get_runners(busy=0, idle=4) if repository.name == 'repository-2' else self.get_runners(busy=1, idle=0)
+        )
+
+        self.get_scaler(min=1).run()
+
+        # 4 idle runners of the second repository are scaled down to 2
+        self.assertEqual(mock_disable_runner.call_count, 2)
+        for call in mock_disable_runner.call_args_list:
+            self.assertEqual(call.kwargs['repository'], self.repositories[1])
+
+    @mock.patch('autoscaler.services.bitbucket_by_project.BitbucketByProjectService.disable_bitbucket_runner')
+    def test_disable_runner_not_found(self, mock_disable_runner, mock_get_runners, mock_get_repositories):
+        mock_disable_runner.side_effect = AutoscalerHTTPError('Not found', status_code=404)
+        mock_get_runners.return_value = self.get_runners(busy=0, idle=1)
+
+        scaler = self.get_scaler()
+        scaler.select_repository(self.repositories[0])
+
+        with self.caplog.at_level(logging.WARNING):
+            self.assertEqual(scaler.disable_runner('{runner-0}'), '{runner-0}')
+
+        self.assertIn('Runner UUID {runner-0} not found on Bitbucket, already deleted.', self.caplog.text)
+
+    @mock.patch('autoscaler.strategy.pct_runners_idle.MAX_RUNNERS_COUNT', 2)
+    @mock.patch('autoscaler.services.bitbucket_by_project.BitbucketByProjectService.create_bitbucket_runner')
+    def test_register_runner_limit_per_repository(self, mock_create_runner, mock_get_runners, mock_get_repositories):
+        mock_get_runners.side_effect = lambda workspace, repository: (
+            self.get_runners(busy=2, idle=0) if repository.name == 'repository-1' else []
+        )
+        mock_create_runner.side_effect = lambda workspace, name, labels, repository: self.get_runner_data(
+            '{new-runner}', repository
+        )
+
+        scaler = self.get_scaler()
+
+        scaler.select_repository(self.repositories[0])
+        with self.caplog.at_level(logging.WARNING):
+            self.assertIsNone(scaler.register_runner(0))
+
+        # runners of the other repository are counted separately
+        scaler.select_repository(self.repositories[1])
+        self.assertEqual(scaler.register_runner(0).runner_uuid, '{new-runner}')
+
+        self.assertIn('Max Runners count limit reached 2 per workspace workspace-test repository: repository-1', self.caplog.text)
+
+    def test_process_failed(self, mock_get_runners, mock_get_repositories):
+        mock_get_repositories.side_effect = AutoscalerHTTPError('Bitbucket API error', status_code=500)
+
+        with self.caplog.at_level(logging.ERROR):
+            activity = self.get_scaler().process()
+
+        self.assertIsNotNone(activity)
+        self.assertIn('Bitbucket API error', self.caplog.text)
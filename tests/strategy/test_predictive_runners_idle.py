@@ -0,0 +1,159 @@
+import logging
+import os
+from unittest import TestCase, mock
+
+import pytest
+
+from autoscaler.core.history import RunnersHistory
+from autoscaler.core.stabilization import ScalingDecisions
+from autoscaler.core.validators import (
+    Constants, NameUUIDData, KubernetesJobResources, PredictiveRunnersIdleParameters,
+)
+from autoscaler.services.kubernetes import KubernetesInMemoryService
+from autoscaler.strategy.pct_runners_idle import PctRunnersIdleData
+from autoscaler.strategy.predictive_runners_idle import PredictiveRunnersIdleScaler
+
+DAY = 24 * 60 * 60
+
+
+@mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test', 'DEBUG': 'true'})
+@mock.patch('autoscaler.strategy.predictive_runners_idle.PredictiveRunnersIdleScaler.get_runners')
+@mock.patch('autoscaler.strategy.predictive_runners_idle.PredictiveRunnersIdleScaler.disable_runners')
+@mock.patch('autoscaler.strategy.predictive_runners_idle.PredictiveRunnersIdleScaler.create_runners')
+class PredictiveRunnersIdleScalerTestCase(TestCase):
+
+    @pytest.fixture(autouse=True)
+    def inject_fixtures(self, caplog):
+        self.caplog = caplog
+
+    def setUp(self):
+        self.now = 10 * DAY
+        self.history = RunnersHistory(file_path='', retention=2 * DAY, clock=lambda: self.now)
+        patcher = mock.patch('autoscaler.strategy.predictive_runners_idle.runners_history', self.history)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_scaler(self, constants=None, **parameters):
+        runner_data = PctRunnersIdleData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            labels={'self.hosted', 'test', 'linux'},
+            strategy='predictiveRunnersIdle',
+            parameters=PredictiveRunnersIdleParameters(**{
+                'min': 1,
+                'max': 10,
+                'scale_up_threshold': 0.5,
+                'scale_down_threshold': 0.2,
+                'scale_up_multiplier': 1.5,
+                'scale_down_multiplier': 0.5,
+                **parameters,
+            }),
+            resources=KubernetesJobResources()
+        )
+
+        return PredictiveRunnersIdleScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_setup=0, **(constants or {})),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+
+    @staticmethod
+    def get_runners(busy, idle):
+        return [
+            {
+                'created_on': '2021-09-29T23:28:04.683210Z',
+                'labels': ['test', 'self.hosted', 'linux'],
+                'state': {'status': 'ONLINE', **({'step': 'busy'} if i < busy else {})},
+                'uuid': f'{{runner-{i}}}',
+            }
+            for i in range(busy + idle)
+        ]
+
+    def test_run_nothing_to_do(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=1, idle=1)
+
+        with self.caplog.at_level(logging.INFO):
+            self.get_scaler().run()
+
+        mock_create_runners.assert_not_called()
+        mock_disable_runners.assert_not_called()
+        self.assertIn('forecast: 1 busy in 600 seconds (ewma: 1, seasonal: None), desired: 2.', self.caplog.text)
+        self.assertIn('Action: nothing to do.', self.caplog.text)
+        self.assertEqual(self.history.get('linux,self.hosted,test'), [(self.now, 1, 1)])
+
+    def test_run_create_runners_ahead_of_burst(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        # 8 busy runners 10 minutes later the previous day
+        self.now -= DAY - 600
+        self.history.add('linux,self.hosted,test', 8, 0)
+        self.now += DAY - 600
+
+        mock_get_runners.return_value = self.get_runners(busy=1, idle=1)
+
+        with self.caplog.at_level(logging.INFO):
+            self.get_scaler().run()
+
+        # (0.5 * 1 + 0.5 * 8) / 0.5 = 9 desired runners
+        mock_create_runners.assert_called_once_with(7)
+        mock_disable_runners.assert_not_called()
+        self.assertIn('seasonal: 8.0), desired: 9. Action: create 7 runners.', self.caplog.text)
+
+    def test_run_create_runners_max(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=3, idle=0)
+
+        self.get_scaler(max=4).run()
+
+        mock_create_runners.assert_called_once_with(1)
+
+    def test_run_disable_runners(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=1, idle=9)
+
+        with self.caplog.at_level(logging.INFO):
+            self.get_scaler().run()
+
+        # 1 busy runner of 10 is below the scale down threshold, 2 runners are enough
+        mock_create_runners.assert_not_called()
+        self.assertEqual(len(mock_disable_runners.call_args.args[0]), 8)
+        self.assertIn('Action: disable 8 runners.', self.caplog.text)
+
+    def test_run_disable_runners_kept_for_forecast(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        # runners were busy recently, the moving average keeps them
+        for busy in (6, 6):
+            self.history.add('linux,self.hosted,test', busy, 0)
+            self.now += 60
+
+        mock_get_runners.return_value = self.get_runners(busy=1, idle=9)
+
+        self.get_scaler(ewma_alpha=0.5).run()
+
+        # ewma: 0.5 * 1 + 0.5 * 6 = 3.5, 7 desired runners
+        self.assertEqual(len(mock_disable_runners.call_args.args[0]), 3)
+
+    def test_run_disable_runners_stabilized(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        constants = {'scale_down_stabilization_window': 300}
+
+        with mock.patch('autoscaler.strategy.pct_runners_idle.scaling_decisions', ScalingDecisions(lambda: self.now)):
+            mock_get_runners.return_value = self.get_runners(busy=4, idle=0)
+            self.get_scaler(constants, ewma_alpha=1).run()
+
+            mock_create_runners.assert_called_once_with(4)
+
+            self.now += 60
+            mock_get_runners.return_value = self.get_runners(busy=1, idle=9)
+            with self.caplog.at_level(logging.INFO):
+                self.get_scaler(constants, ewma_alpha=1).run()
+
+        # 2 desired runners, not below the 8 desired runners a minute ago
+        self.assertEqual(len(mock_disable_runners.call_args.args[0]), 2)
+        self.assertIn(
+            'Scale down to 2 runners limited to 8 runners, the max desired runners count within the last 300 seconds.',
+            self.caplog.text
+        )
+
+    def test_scale_up_threshold_positive(self, *_):
+        with pytest.raises(ValueError, match='scale_up_threshold should be greater than 0'):
+            self.get_scaler(scale_up_threshold=0)
@@ -0,0 +1,165 @@
+import logging
+import os
+from unittest import TestCase, mock
+
+import pytest
+from pydantic import ValidationError
+
+from autoscaler.core.stabilization import ScalingDecisions
+from autoscaler.core.validators import Constants, NameUUIDData, KubernetesJobResources, TargetTrackingParameters
+from autoscaler.services.kubernetes import KubernetesInMemoryService
+from autoscaler.strategy.pct_runners_idle import PctRunnersIdleData
+from autoscaler.strategy.target_tracking import TargetTrackingScaler
+
+from tests.helpers import FakeClock
+
+
+@mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test', 'DEBUG': 'true'})
+@mock.patch('autoscaler.strategy.target_tracking.TargetTrackingScaler.get_runners')
+@mock.patch('autoscaler.strategy.target_tracking.TargetTrackingScaler.disable_runners')
+@mock.patch('autoscaler.strategy.target_tracking.TargetTrackingScaler.create_runners')
+class TargetTrackingScalerTestCase(TestCase):
+
+    @pytest.fixture(autouse=True)
+    def inject_fixtures(self, caplog):
+        self.caplog = caplog
+
+    def get_scaler(self, constants=None, **parameters):
+        runner_data = PctRunnersIdleData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            labels={'self.hosted', 'test', 'linux'},
+            strategy='targetTracking',
+            parameters=TargetTrackingParameters(**{'min': 1, 'max': 50, 'target_utilization': 0.5, **parameters}),
+            resources=KubernetesJobResources()
+        )
+
+        return TargetTrackingScaler(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_setup=0, **(constants or {})),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+
+    @staticmethod
+    def get_runners(busy, idle):
+        return [
+            {
+                'created_on': '2021-09-29T23:28:04.683210Z',
+                'labels': ['test', 'self.hosted', 'linux'],
+                'state': {'status': 'ONLINE', **({'step': 'busy'} if i < busy else {})},
+                'uuid': f'{{runner-{i}}}',
+            }
+            for i in range(busy + idle)
+        ]
+
+    def test_run_create_runners_one_step(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        # 2 runners busy, 20 pipelines are waiting and take the new runners on the next attempt
+        mock_get_runners.return_value = self.get_runners(busy=20, idle=0)
+
+        with self.caplog.at_level(logging.INFO):
+            self.get_scaler().run()
+
+        mock_create_runners.assert_called_once_with(20)
+        mock_disable_runners.assert_not_called()
+        self.assertIn('busy: 20, target: 0.5, desired: 40. Action: create 20 runners.', self.caplog.text)
+
+    def test_run_create_runners_from_zero(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = []
+
+        self.get_scaler(min=2).run()
+
+        mock_create_runners.assert_called_once_with(2)
+
+    def test_run_create_runners_max(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=20, idle=0)
+
+        self.get_scaler(max=30).run()
+
+        mock_create_runners.assert_called_once_with(10)
+
+    def test_run_create_runners_max_surge(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=20, idle=0)
+
+        self.get_scaler(max_surge=5).run()
+
+        mock_create_runners.assert_called_once_with(5)
+
+    def test_run_within_tolerance(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        # 0.53 busy runners ratio is within 0.1 of the 0.5 target
+        mock_get_runners.return_value = self.get_runners(busy=8, idle=7)
+
+        with self.caplog.at_level(logging.INFO):
+            self.get_scaler().run()
+
+        mock_create_runners.assert_not_called()
+        mock_disable_runners.assert_not_called()
+        self.assertIn('desired: 15. Action: nothing to do.', self.caplog.text)
+
+    def test_run_disable_runners(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=2, idle=18)
+
+        with self.caplog.at_level(logging.INFO):
+            self.get_scaler().run()
+
+        mock_create_runners.assert_not_called()
+        self.assertEqual(len(mock_disable_runners.call_args.args[0]), 16)
+        self.assertIn('desired: 4. Action: disable 16 runners.', self.caplog.text)
+
+    def test_run_disable_runners_min(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=0, idle=5)
+
+        self.get_scaler(min=3).run()
+
+        self.assertEqual(len(mock_disable_runners.call_args.args[0]), 2)
+
+    def test_run_disable_runners_max_unavailable(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=2, idle=18)
+
+        self.get_scaler(max_unavailable=3).run()
+
+        self.assertEqual(len(mock_disable_runners.call_args.args[0]), 3)
+
+    def test_run_disable_runners_stabilized(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        clock = FakeClock()
+        constants = {'scale_down_stabilization_window': 300}
+
+        with mock.patch('autoscaler.strategy.pct_runners_idle.scaling_decisions', ScalingDecisions(clock)):
+            mock_get_runners.return_value = self.get_runners(busy=20, idle=0)
+            self.get_scaler(constants).run()
+
+            mock_create_runners.assert_called_once_with(20)
+
+            clock.sleep(60)
+            mock_get_runners.return_value = self.get_runners(busy=2, idle=18)
+            with self.caplog.at_level(logging.INFO):
+                self.get_scaler(constants).run()
+
+            mock_disable_runners.assert_not_called()
+            self.assertIn(
+                'Scale down to 4 runners limited to 40 runners, the max desired runners count within the last 300 seconds.',
+                self.caplog.text
+            )
+            self.assertIn('desired: 4. Action: nothing to do.', self.caplog.text)
+
+            # the desired runners count of 40 is out of the window
+            clock.sleep(240)
+            self.get_scaler(constants).run()
+
+            self.assertEqual(len(mock_disable_runners.call_args.args[0]), 16)
+
+    def test_process_polling_activity(self, mock_create_runners, mock_disable_runners, mock_get_runners):
+        mock_get_runners.return_value = self.get_runners(busy=1, idle=1)
+
+        activity = self.get_scaler(target_utilization=0.6).process()
+
+        self.assertEqual((activity.busy_ratio, activity.scale_up_threshold), (0.5, 0.6))
+
+    def test_target_utilization_validated(self, *_):
+        for target_utilization in (0, 1.5):
+            with pytest.raises(ValidationError):
+                self.get_scaler(target_utilization=target_utilization)
@@ -3,9 +3,11 @@ import os
 from unittest import TestCase, mock
 
 import pytest
+import requests
 
 from autoscaler.cleaner.pct_runner_idle_cleaner import Cleaner, PctRunnersIdleCleanerData
 from autoscaler.core.constants import DEFAULT_RUNNER_KUBERNETES_NAMESPACE
+from autoscaler.core.exceptions import AutoscalerHTTPError, KubernetesJobError
 from autoscaler.core.validators import Constants, NameUUIDData
 from autoscaler.services.kubernetes import KubernetesInMemoryService
 from autoscaler.start_cleaner import StartCleaner
@@ -445,3 +447,84 @@ class CleanerTestCase(TestCase):
             cleaner.run()
 
         self.assertIn('Nothing to do...\n', self.caplog.text)
+
+    @mock.patch('autoscaler.services.kubernetes.KubernetesInMemoryService.delete_job')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.delete_bitbucket_runner')
+    def test_delete_runners_concurrent(self, mock_delete_runner, mock_delete_job):
+        runner_data = PctRunnersIdleCleanerData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            strategy='percentageRunnersIdle'
+        )
+
+        cleaner = Cleaner(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_delete=0, runner_delete_concurrency=3),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+
+        def delete_runner(workspace, runner_uuid, repository):
+            if runner_uuid == '{runner-0}':
+                raise AutoscalerHTTPError('Bad gateway', status_code=502)
+
+        jobs_attempts = []
+
+        def delete_job(runner_uuid, namespace):
+            jobs_attempts.append(runner_uuid)
+            # the first attempt to delete runner-1 job fails
+            if jobs_attempts.count('runner-1') == 1 and runner_uuid == 'runner-1':
+                raise KubernetesJobError('Connection reset')
+
+        mock_delete_runner.side_effect = delete_runner
+        mock_delete_job.side_effect = delete_job
+
+        with capture_output() as out:
+            with self.caplog.at_level(logging.INFO):
+                results = cleaner.delete_runners([{'uuid': f'{{runner-{i}}}'} for i in range(3)])
+
+        self.assertEqual([r.ok for r in results], [False, True, True])
+        self.assertEqual(results[0].stage, 'bitbucket')
+        self.assertEqual(sorted(jobs_attempts), ['runner-1', 'runner-1', 'runner-2'])
+        self.assertEqual(out.getvalue().count('Successfully deleted runner UUID'), 2)
+        self.assertIn('Runner UUID {runner-0} deletion failed on bitbucket stage after 3 attempts', self.caplog.text)
+        self.assertIn("'kubernetes': {'succeeded': 2, 'failed': 0, 'retried': 1", self.caplog.text)
+
+    @mock.patch('autoscaler.services.kubernetes.KubernetesInMemoryService.delete_job')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.delete_bitbucket_runner')
+    def test_delete_runners_deleted_by_timed_out_attempt(self, mock_delete_runner, mock_delete_job):
+        runner_data = PctRunnersIdleCleanerData(
+            workspace=NameUUIDData(
+                name='workspace-test',
+                uuid='{workspace-test-uuid}'
+            ),
+            repository=None,
+            name='good',
+            namespace='test',
+            strategy='percentageRunnersIdle'
+        )
+
+        cleaner = Cleaner(
+            runner_data=runner_data,
+            runner_constants=Constants(default_sleep_time_runner_delete=0),
+            kubernetes_service=KubernetesInMemoryService()
+        )
+
+        # the first attempt deletes the runner, but its response times out
+        mock_delete_runner.side_effect = [
+            requests.exceptions.ReadTimeout('Read timed out'),
+            AutoscalerHTTPError('Runner not found', status_code=404),
+        ]
+
+        with capture_output():
+            with self.caplog.at_level(logging.WARNING):
+                results = cleaner.delete_runners([{'uuid': '{runner-0}'}])
+
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[0].attempts['bitbucket'], 2)
+        mock_delete_job.assert_called_once_with('runner-0', 'test')
+        self.assertIn('Runner UUID {runner-0} not found on Bitbucket, already deleted.', self.caplog.text)
@@ -1,11 +1,21 @@
 import os
+import shutil
+import tempfile
 from unittest import TestCase, mock
 
 import pytest
 from autoscaler.start import StartPoller
+from autoscaler.core.scheduler import AdaptiveInterval, GroupScheduler
+from autoscaler.core.validators import Constants
 from autoscaler.core.constants import DEFAULT_RUNNER_KUBERNETES_NAMESPACE
+from autoscaler.services.bitbucket import BitbucketService
+from autoscaler.services.runners_snapshot import RunnersSnapshot
 
-from tests.helpers import capture_output
+from tests.helpers import FakeClock, capture_output
+
+
+class StopPolling(Exception):
+    pass
 
 
 class ScaleTestCase(TestCase):
@@ -76,6 +86,106 @@ class ScaleTestCase(TestCase):
 
         self.assertEqual(mock_process.call_count, 2)
 
+    @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.get_bitbucket_workspace_repository_uuids')
+    @mock.patch('autoscaler.strategy.pct_runners_idle.PctRunnersIdleScaler.process')
+    @mock.patch('autoscaler.start.GroupScheduler.schedule', autospec=True, side_effect=GroupScheduler.schedule)
+    def test_main_group_polling_interval(self, mock_schedule, mock_process, mock_get_uuids):
+        mock_get_uuids.return_value = {'name': 'test', 'uuid': 'test'}, {'name': 'test', 'uuid': 'test'}
+
+        with tempfile.TemporaryDirectory() as config_dir:
+            config_file_path = os.path.join(config_dir, 'runners_config.yaml')
+            with open('tests/resources/test_config.yaml') as f:
+                config = f.read()
+            with open(config_file_path, 'w') as f:
+                f.write(config.replace(
+                    '    namespace: test-namespace-2\n',
+                    '    namespace: test-namespace-2\n    runner_api_polling_interval: 30\n'
+                ))
+
+            poller = StartPoller(
+                config_file_path=config_file_path,
+                template_file_path='tests/resources/job-default.yaml',
+                poll=False
+            )
+            poller.start()
+
+        groups = mock_schedule.call_args.args[1]
+        self.assertEqual(
+            sorted((name, interval) for name, interval, _ in groups.values()),
+            [('Runner repository group', 1), ('Runner repository group 2', 30)]
+        )
+        self.assertEqual(mock_process.call_count, 2)
+
+    @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.get_bitbucket_workspace_repository_uuids')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.fetch_bitbucket_runners', return_value=[])
+    @mock.patch('autoscaler.start.StartPoller.process_group')
+    def test_main_runners_snapshot_shared_within_tick(self, mock_process_group, mock_fetch_runners, mock_get_uuids):
+        mock_get_uuids.return_value = {'name': 'test', 'uuid': 'test'}, None
+        mock_process_group.side_effect = lambda runner_data, runner_constants, runners_snapshot: BitbucketService(
+            runner_data.name, runners_snapshot
+        ).get_bitbucket_runners(runner_data.workspace, runner_data.repository)
+
+        clock = FakeClock()
+        schedulers = []
+
+        def get_scheduler(executor):
+            schedulers.append(GroupScheduler(executor, clock))
+            return schedulers[-1]
+
+        def sleep(seconds):
+            schedulers[0].wait()
+            if clock.now >= 100:
+                raise StopPolling
+            clock.sleep(seconds)
+
+        with tempfile.TemporaryDirectory() as config_dir:
+            config_file_path = os.path.join(config_dir, 'runners_config.yaml')
+            with open('tests/resources/test_config.yaml') as f:
+                config = f.read()
+            with open(config_file_path, 'w') as f:
+                f.write(config.replace(
+                    '  runner_api_polling_interval: 1\n', '  runner_api_polling_interval: 60\n'
+                ).replace(
+                    '    namespace: test-namespace-2\n', '    namespace: test-namespace-2\n    runner_api_polling_interval: 90\n'
+                ))
+
+            with mock.patch('autoscaler.start.RunnersSnapshot', side_effect=lambda ttl: RunnersSnapshot(ttl, clock)):
+                poller = StartPoller(
+                    config_file_path=config_file_path,
+                    template_file_path='tests/resources/job-default.yaml',
+                )
+
+            with mock.patch('autoscaler.start.GroupScheduler', side_effect=get_scheduler), \
+                    mock.patch('autoscaler.start.sleep', side_effect=sleep):
+                with pytest.raises(StopPolling):
+                    poller.start()
+
+        # both groups share the list loaded at 0, the first one started again at 60
+        # and the second one at 90 get a fresh list on their own ticks
+        self.assertEqual(mock_process_group.call_count, 4)
+        self.assertEqual(mock_fetch_runners.call_count, 3)
+        self.assertEqual(poller._runners_snapshot.stats(), {'loads': 3, 'hits': 1})
+
+    def test_get_polling_interval(self):
+        runner_data = mock.Mock(runner_api_polling_interval=None)
+        runner_constants = Constants(runner_api_polling_interval=600, runner_api_polling_interval_min=30)
+
+        self.assertEqual(StartPoller.get_polling_interval(runner_data, runner_constants), 600)
+
+        runner_constants.adaptive_polling = True
+        self.assertEqual(
+            StartPoller.get_polling_interval(runner_data, runner_constants),
+            AdaptiveInterval(min_interval=30, max_interval=600)
+        )
+
+        runner_data.runner_api_polling_interval = 120
+        self.assertEqual(
+            StartPoller.get_polling_interval(runner_data, runner_constants),
+            AdaptiveInterval(min_interval=30, max_interval=120)
+        )
+
     @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
     @mock.patch('autoscaler.services.bitbucket.BitbucketService.get_bitbucket_workspace_repository_uuids')
     def test_main_namespace_required(self, mock_skip_update):
@@ -174,3 +284,118 @@ class ScaleTestCase(TestCase):
             'Label errors',
             out.getvalue()
         )
+
+    def test_copy_template_not_changed(self):
+        poller = StartPoller(
+            config_file_path='tests/resources/test_config.yaml',
+            template_file_path='tests/resources/job-default.yaml',
+            poll=False
+        )
+
+        poller.copy_template()
+        with mock.patch('shutil.copy') as mock_copy:
+            poller.copy_template()
+
+        mock_copy.assert_not_called()
+
+        poller.template_file_path = 'tests/resources/job-default_err.yaml'
+        with mock.patch('shutil.copy') as mock_copy:
+            poller.copy_template()
+
+        mock_copy.assert_called_once()
+
+    @mock.patch('autoscaler.core.validators.validate_kubernetes_manifest')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.get_bitbucket_workspace_repository_uuids')
+    def test_read_config_not_changed(self, mock_get_uuids, mock_validate_manifest):
+        mock_get_uuids.return_value = {'name': 'test', 'uuid': 'test'}, {'name': 'test', 'uuid': 'test'}
+
+        poller = StartPoller(
+            config_file_path='tests/resources/test_config.yaml',
+            template_file_path='tests/resources/job-default.yaml',
+            poll=False
+        )
+
+        groups, _ = poller.read_config()
+        resolved_count = mock_get_uuids.call_count
+        groups_not_changed, _ = poller.read_config()
+
+        self.assertIs(groups_not_changed, groups)
+        self.assertEqual(mock_get_uuids.call_count, resolved_count)
+        mock_validate_manifest.assert_called_once()
+
+    @mock.patch.dict(os.environ, {'BITBUCKET_USERNAME': 'test', 'BITBUCKET_APP_PASSWORD': 'test'})
+    @mock.patch('autoscaler.core.constants.KUBERNETES_IMAGE_PREPULL', True)
+    @mock.patch('autoscaler.start.image_prepull')
+    @mock.patch('autoscaler.start.StartPoller.process_group')
+    @mock.patch('autoscaler.core.validators.validate_kubernetes_manifest')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.get_bitbucket_workspace_repository_uuids')
+    def test_main_image_prepull(self, mock_get_uuids, mock_validate_manifest, mock_process_group, mock_image_prepull):
+        mock_get_uuids.return_value = {'name': 'test', 'uuid': 'test'}, {'name': 'test', 'uuid': 'test'}
+
+        poller = StartPoller(
+            config_file_path='tests/resources/test_config.yaml',
+            template_file_path='tests/resources/job-default.yaml',
+            poll=False
+        )
+
+        poller.start()
+        poller.start()
+
+        # the DaemonSet is reconciled on every tick, not only when the template changes
+        mock_validate_manifest.assert_called_once()
+        self.assertEqual(mock_image_prepull.reconcile.call_count, 2)
+
+    @mock.patch('autoscaler.core.validators.validate_kubernetes_manifest')
+    @mock.patch('autoscaler.services.bitbucket.BitbucketService.get_bitbucket_workspace_repository_uuids')
+    def test_read_config_group_changed(self, mock_get_uuids, mock_validate_manifest):
+        mock_get_uuids.return_value = {'name': 'test', 'uuid': 'test'}, {'name': 'test', 'uuid': 'test'}
+
+        with tempfile.TemporaryDirectory() as config_dir:
+            config_file_path = os.path.join(config_dir, 'runners_config.yaml')
+            shutil.copy('tests/resources/test_config.yaml', config_file_path)
+
+            poller = StartPoller(
+                config_file_path=config_file_path,
+                template_file_path='tests/resources/job-default.yaml',
+                poll=False
+            )
+
+            groups, _ = poller.read_config()
+            resolved_count = mock_get_uuids.call_count
+
+            with open(config_file_path) as f:
+                config = f.read()
+            with open(config_file_path, 'w') as f:
+                f.write(config.replace('name: Runner repository group 2', 'name: Runner repository group three'))
+
+            changed_groups, _ = poller.read_config()
+
+        self.assertEqual(changed_groups[0], groups[0])
+        self.assertEqual(changed_groups[1].name, 'Runner repository group three')
+        # only the changed group is prefetched and validated again
+        self.assertEqual(mock_get_uuids.call_count - resolved_count, 2)
+        mock_validate_manifest.assert_called_once()
+        self.assertIn('Autoscaler groups validated: 1, reused: 1', self.caplog.text)
+
+    def test_file_changed(self):
+        poller = StartPoller(
+            config_file_path='tests/resources/test_config.yaml',
+            template_file_path='tests/resources/job-default.yaml',
+            poll=False
+        )
+
+        with tempfile.TemporaryDirectory() as config_dir:
+            file_path = os.path.join(config_dir, 'runners_config.yaml')
+            with open(file_path, 'w') as f:
+                f.write('groups: []')
+
+            self.assertTrue(poller.file_changed(file_path))
+            self.assertFalse(poller.file_changed(file_path))
+
+            # modification time changed, content is the same
+            os.utime(file_path, ns=(0, 0))
+            self.assertFalse(poller.file_changed(file_path))
+
+            with open(file_path, 'w') as f:
+                f.write('groups: [1]')
+            self.assertTrue(poller.file_changed(file_path))